@@ -0,0 +1,77 @@
+"""Compares the pandas and the streaming classifier of aktlister on large generated workbooks.
+
+Run from the root of the repository:
+    python -m benchmarks.benchmark_check_excel_file
+"""
+
+import io
+import time
+
+import openpyxl
+
+from robot_framework.aktindsigt_aktlister import check_excel_file, check_excel_file_streaming
+
+ROW_COUNTS = (1_000, 10_000, 50_000)
+COLUMN_COUNT = 15
+REPEATS = 3
+
+
+# pylint: disable-next = too-few-public-methods
+class _SilentConnection:
+    """Stands in for OrchestratorConnection so the classifiers can log without a database."""
+
+    def log_error(self, message: str) -> None:
+        """Ignore the message."""
+
+
+def create_aktliste(row_count: int, answers: str) -> bytes:
+    """Create an aktliste workbook in memory.
+
+    Args:
+        row_count: The number of document rows in the workbook.
+        answers: 'ja' for only 'Ja' answers, which makes both classifiers read every row,
+            or 'mixed' for a 'Nej' in the third row, which lets the streaming classifier stop early.
+
+    Returns:
+        The workbook as bytes.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    header = [f"Kolonne {i}" for i in range(COLUMN_COUNT - 1)]
+    sheet.append(header[:3] + [" Gives der aktindsigt? "] + header[3:])
+    for row in range(row_count):
+        answer = "Nej" if answers == "mixed" and row == 2 else "Ja"
+        values = [f"Dokument {row} felt {i}" for i in range(COLUMN_COUNT - 1)]
+        sheet.append(values[:3] + [answer] + values[3:])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def time_classifier(classifier, workbook: bytes) -> tuple[float, str]:
+    """Time the best of REPEATS runs of a classifier on a workbook and return the time and result."""
+    best = float("inf")
+    result = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = classifier(io.BytesIO(workbook), _SilentConnection())
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    """Run the benchmark and print a table of the results."""
+    print(f"{'rows':>8} {'answers':>8} {'pandas (s)':>11} {'streaming (s)':>14} {'speedup':>8}  result")
+    for row_count in ROW_COUNTS:
+        for answers in ("ja", "mixed"):
+            workbook = create_aktliste(row_count, answers)
+            pandas_time, pandas_result = time_classifier(check_excel_file, workbook)
+            streaming_time, streaming_result = time_classifier(check_excel_file_streaming, workbook)
+            if pandas_result != streaming_result:
+                raise RuntimeError(f"The classifiers disagree: {pandas_result} != {streaming_result}")
+            print(f"{row_count:>8} {answers:>8} {pandas_time:>11.3f} {streaming_time:>14.3f} {pandas_time / streaming_time:>7.1f}x  {streaming_result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Measures crawling and file transfers against a local SharePoint stand-in.
+
+For each tree size and latency the benchmark reports the number of round trips,
+the wall time and the peak memory of tjek_for_aktindsigt (sequential, pipelined and by query),
+download_file_from_sharepoint, upload_and_archive and sharepoint.download_files
+with both I/O backends.
+
+Run from the root of the repository:
+    python -m benchmarks.benchmark_sharepoint
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable
+
+from office365.runtime.auth.token_response import TokenResponse
+from office365.sharepoint.client_context import ClientContext
+
+from benchmarks.sharepoint_stand_in import CONTROL_PATH, SITE_PATH, TREE_ROOT_URL, UPLOAD_FOLDER_URL, running_stand_in
+from robot_framework import aktindsigt_aktlister, config, process_laura, sharepoint
+
+# (depth, width) of the generated trees. The number of case folders is width ** depth.
+TREE_SIZES = ((2, 5), (3, 5), (3, 8))
+# Seconds added to each request by the stand-in
+LATENCIES = (0.0, 0.02)
+# Sizes in bytes of the files transferred
+FILE_SIZES = (1024 * 1024, 32 * 1024 * 1024)
+# The number of files downloaded at once in the bulk download benchmark
+BULK_DOWNLOAD_COUNTS = (1000,)
+
+
+class _SilentConnection:
+    """Stands in for OrchestratorConnection so the process can log without a database."""
+
+    def log_trace(self, message: str) -> None:
+        """Ignore the message."""
+
+    def log_info(self, message: str) -> None:
+        """Ignore the message."""
+
+    def log_error(self, message: str) -> None:
+        """Ignore the message."""
+
+
+@dataclass
+class Measurement:
+    """The cost of a single benchmarked action."""
+    round_trips: int
+    seconds: float
+    peak_memory: int
+    bytes_transferred: int
+
+
+def create_client(site_url: str) -> ClientContext:
+    """Create a client for the stand-in. The stand-in accepts any access token."""
+    return ClientContext(site_url).with_access_token(lambda: TokenResponse("stand-in", "Bearer"))
+
+
+def measure(site_url: str, action: Callable[[ClientContext], object]) -> Measurement:
+    """Run an action with a new client and measure it.
+    The action is run twice: once for the wall time and round trips, and once with
+    tracemalloc for the peak memory, since tracing allocations slows Python down a lot.
+
+    Args:
+        site_url: The url of the stand-in site.
+        action: A function taking the client as its only argument.
+
+    Returns:
+        The round trips, wall time, peak memory and bytes transferred of the action.
+    """
+    _control(site_url, "reset")
+    start = time.perf_counter()
+    action(create_client(site_url))
+    seconds = time.perf_counter() - start
+    stats = _control(site_url, "stats")
+
+    client = create_client(site_url)
+    tracemalloc.start()
+    action(client)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return Measurement(stats["requests"], seconds, peak_memory, stats["bytes_sent"] + stats["bytes_received"])
+
+
+def _control(site_url: str, command: str) -> dict:
+    """Read or reset the counters of the stand-in."""
+    server_url = site_url[:-len(SITE_PATH)]
+    with urllib.request.urlopen(f"{server_url}{CONTROL_PATH}/{command}") as response:
+        return json.load(response)
+
+
+def _print_row(label: str, latency: float, name: str, measurement: Measurement) -> None:
+    print(
+        f"{label:>14} {latency * 1000:>8.0f} {name:>22} {measurement.round_trips:>11} {measurement.seconds:>9.2f} "
+        f"{measurement.peak_memory / 1024 / 1024:>8.1f} {measurement.bytes_transferred / 1024 / 1024:>8.1f}"
+    )
+
+
+def benchmark_crawl(depth: int, width: int, latency: float) -> None:
+    """Benchmark tjek_for_aktindsigt on a generated tree, sequentially, pipelined and with query discovery."""
+    connection = _SilentConnection()
+    with running_stand_in(depth, width, latency) as site_url:
+        runs = (("tjek (sequential)", False, "crawl"), ("tjek (pipelined)", True, "crawl"), ("tjek (query)", True, "query"))
+        for name, pipeline, discovery in runs:
+            measurement = measure(
+                site_url,
+                lambda client, pipeline=pipeline, discovery=discovery: aktindsigt_aktlister.tjek_for_aktindsigt(
+                    client, TREE_ROOT_URL, connection, pipeline=pipeline, use_cache=False, discovery=discovery
+                )
+            )
+            _print_row(f"{width ** depth} cases", latency, name, measurement)
+
+
+def benchmark_transfers(file_size: int, latency: float) -> None:
+    """Benchmark uploading a file with upload_and_archive and downloading it again."""
+    connection = _SilentConnection()
+    file_name = "benchmark.xlsx"
+    with running_stand_in(1, 1, latency) as site_url, tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.xlsx")
+        with open(source_path, "wb") as source_file:
+            source_file.write(os.urandom(file_size))
+
+        # upload_and_archive deletes the local file afterwards, so each run uploads a new copy
+        upload_path = os.path.join(temp_dir, file_name)
+        sharepoint_file_url = f"{UPLOAD_FOLDER_URL.removeprefix(SITE_PATH + '/')}/{file_name}"
+        measurement = measure(
+            site_url,
+            lambda client: process_laura.upload_and_archive(client, sharepoint_file_url, shutil.copy(source_path, upload_path), None, connection)
+        )
+        _print_row(f"{file_size // 1024 // 1024} MB", latency, "upload_file", measurement)
+
+        # An absolute local file name makes download_file_from_sharepoint save outside the working directory
+        download_path = os.path.join(temp_dir, "download.xlsx")
+        measurement = measure(
+            site_url,
+            lambda client: process_laura.download_file_from_sharepoint(client, f"{UPLOAD_FOLDER_URL}/{file_name}", connection, download_path)
+        )
+        _print_row(f"{file_size // 1024 // 1024} MB", latency, "download_file", measurement)
+
+
+def benchmark_bulk_downloads(count: int, latency: float) -> None:
+    """Benchmark downloading many small files at once with sharepoint.download_files on each I/O backend."""
+    with running_stand_in(1, 1, latency) as site_url, tempfile.TemporaryDirectory() as temp_dir:
+        case_url = f"{TREE_ROOT_URL}/GEO-2024-000001"
+        files = [(f"{case_url}/Bilag.pdf", os.path.join(temp_dir, f"{i}.pdf")) for i in range(count)]
+        original_backend = config.SHAREPOINT_IO_BACKEND
+        try:
+            for backend in ("office365", "async"):
+                config.SHAREPOINT_IO_BACKEND = backend
+                measurement = measure(site_url, lambda client: sharepoint.download_files(client, files))
+                _print_row(f"{count} files", latency, f"download_files {backend}", measurement)
+        finally:
+            config.SHAREPOINT_IO_BACKEND = original_backend
+            sharepoint.close_connections()
+
+
+def main():
+    """Run the benchmark and print a table of the results."""
+    print(f"{'size':>14} {'ms/req':>8} {'action':>22} {'round trips':>11} {'wall (s)':>9} {'peak MB':>8} {'net MB':>8}")
+    for latency in LATENCIES:
+        for depth, width in TREE_SIZES:
+            benchmark_crawl(depth, width, latency)
+        for file_size in FILE_SIZES:
+            benchmark_transfers(file_size, latency)
+        for count in BULK_DOWNLOAD_COUNTS:
+            benchmark_bulk_downloads(count, latency)
+    sharepoint.close_connections()
+
+
+if __name__ == "__main__":
+    main()
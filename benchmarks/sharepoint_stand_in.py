@@ -0,0 +1,645 @@
+"""A local stand-in for SharePoint used to benchmark the robot without touching production.
+
+The server speaks the subset of the SharePoint REST API (odata=verbose) used through
+ClientContext in this repository: folders with expanded files and subfolders, $batch,
+downloads, single and chunked uploads, copy, move, delete, library root folders and
+paged RenderListDataAsStream queries.
+All content is kept in memory. Every HTTP request is delayed by a configurable latency
+and counted, so round trips and network effects can be measured.
+
+Start a server by hand from the root of the repository:
+    python -m benchmarks.sharepoint_stand_in --depth 3 --width 5 --latency 0.02
+"""
+
+import argparse
+import email
+import itertools
+import json
+import multiprocessing
+import multiprocessing.queues
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+
+from benchmarks.benchmark_check_excel_file import create_aktliste
+
+SITE_PATH = "/sites/bench"
+LIBRARY_TITLE = "Dokumenter"
+LIBRARY_URL = f"{SITE_PATH}/Delte dokumenter"
+TREE_ROOT_URL = f"{LIBRARY_URL}/Aktindsigter"
+UPLOAD_FOLDER_URL = f"{LIBRARY_URL}/Upload"
+
+# Requests to paths starting with this are controlled by the benchmark and never delayed or counted
+CONTROL_PATH = "/_stand_in"
+
+
+class NotFound(Exception):
+    """Raised when a requested file or folder doesn't exist."""
+
+
+@dataclass
+class StoredFile:
+    """A file in the stand-in."""
+    url: str
+    content: bytes
+    item_id: int = 0
+    unique_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    version: int = 1
+    modified: str = field(default_factory=lambda: datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"))
+
+    def properties(self) -> dict:
+        """The properties of the file as returned by SharePoint."""
+        return {
+            "__metadata": {"type": "SP.File"},
+            "Name": self.url.rsplit("/", 1)[-1],
+            "ServerRelativeUrl": self.url,
+            "Length": str(len(self.content)),
+            "UniqueId": self.unique_id,
+            "ETag": f"\"{{{self.unique_id}}},{self.version}\"",
+            "TimeLastModified": self.modified
+        }
+
+
+@dataclass
+class StoredFolder:
+    """A folder in the stand-in."""
+    url: str
+    item_id: int = 0
+    unique_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    files: dict[str, StoredFile] = field(default_factory=dict)
+    folders: dict[str, "StoredFolder"] = field(default_factory=dict)
+
+    def properties(self, expand: tuple[str, ...] = ()) -> dict:
+        """The properties of the folder as returned by SharePoint, optionally with files and subfolders."""
+        properties = {
+            "__metadata": {"type": "SP.Folder"},
+            "Name": self.url.rsplit("/", 1)[-1],
+            "ServerRelativeUrl": self.url,
+            "ItemCount": len(self.files) + len(self.folders),
+            "UniqueId": self.unique_id
+        }
+        if "files" in expand:
+            properties["Files"] = {"results": [file.properties() for file in self.files.values()]}
+        if "folders" in expand:
+            properties["Folders"] = {"results": [folder.properties() for folder in self.folders.values()]}
+        return properties
+
+
+class Store:
+    """The in-memory content of the stand-in. Urls are case-insensitive like in SharePoint."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._folders: dict[str, StoredFolder] = {}
+        self._files: dict[str, StoredFile] = {}
+        self._files_by_id: dict[str, StoredFile] = {}
+        self._upload_sessions: dict[str, bytearray] = {}
+        self._item_ids = itertools.count(1)
+        self.libraries = {LIBRARY_TITLE.lower(): LIBRARY_URL}
+        self.add_folder(SITE_PATH)
+
+    def add_folder(self, url: str) -> StoredFolder:
+        """Get a folder, creating it and its parents if needed."""
+        url = url.rstrip("/")
+        with self._lock:
+            folder = self._folders.get(url.lower())
+            if folder:
+                return folder
+            folder = StoredFolder(url, next(self._item_ids))
+            self._folders[url.lower()] = folder
+            parent_url, name = url.rsplit("/", 1)
+            if parent_url:
+                self.add_folder(parent_url).folders[name.lower()] = folder
+            return folder
+
+    def add_file(self, url: str, content: bytes) -> StoredFile:
+        """Create or replace a file. The parent folder must exist."""
+        parent_url, name = url.rsplit("/", 1)
+        with self._lock:
+            parent = self.get_folder(parent_url)
+            existing = self._files.get(url.lower())
+            if existing:
+                existing.content = content
+                existing.version += 1
+                return existing
+            stored_file = StoredFile(url, content, next(self._item_ids))
+            parent.files[name.lower()] = stored_file
+            self._files[url.lower()] = stored_file
+            self._files_by_id[stored_file.unique_id] = stored_file
+            return stored_file
+
+    def delete_file(self, url: str) -> None:
+        """Delete a file."""
+        with self._lock:
+            stored_file = self.get_file(url)
+            parent_url, name = stored_file.url.rsplit("/", 1)
+            del self.get_folder(parent_url).files[name.lower()]
+            del self._files[url.lower()]
+            del self._files_by_id[stored_file.unique_id]
+
+    def get_folder(self, url: str) -> StoredFolder:
+        """Get an existing folder."""
+        folder = self._folders.get(url.rstrip("/").lower())
+        if folder is None:
+            raise NotFound(url)
+        return folder
+
+    def get_file(self, url: str) -> StoredFile:
+        """Get an existing file."""
+        stored_file = self._files.get(url.lower())
+        if stored_file is None:
+            raise NotFound(url)
+        return stored_file
+
+    def get_file_by_id(self, unique_id: str) -> StoredFile:
+        """Get an existing file by its UniqueId."""
+        stored_file = self._files_by_id.get(unique_id.strip("{}").lower())
+        if stored_file is None:
+            raise NotFound(unique_id)
+        return stored_file
+
+    def list_items(self, folder_url: str) -> list[StoredFile | StoredFolder]:
+        """Get all files and folders under a folder, ordered by item id like a list view."""
+        with self._lock:
+            prefix = folder_url.rstrip("/").lower() + "/"
+            items = [item for url, item in [*self._folders.items(), *self._files.items()] if url.startswith(prefix)]
+        return sorted(items, key=lambda item: item.item_id)
+
+    def start_upload(self, upload_id: str, content: bytes) -> int:
+        """Start an upload session with its first chunk and return the new offset."""
+        with self._lock:
+            self._upload_sessions[upload_id] = bytearray(content)
+            return len(content)
+
+    def continue_upload(self, upload_id: str, offset: int, content: bytes) -> int:
+        """Add a chunk to an upload session and return the new offset."""
+        with self._lock:
+            session = self._upload_sessions[upload_id]
+            if offset != len(session):
+                raise ValueError(f"Wrong offset {offset}, expected {len(session)}.")
+            session.extend(content)
+            return len(session)
+
+    def finish_upload(self, upload_id: str, offset: int, content: bytes, url: str) -> StoredFile:
+        """Add the last chunk to an upload session and commit it to the file."""
+        with self._lock:
+            self.continue_upload(upload_id, offset, content)
+            return self.add_file(url, bytes(self._upload_sessions.pop(upload_id)))
+
+    def cancel_upload(self, upload_id: str) -> None:
+        """Forget an upload session."""
+        with self._lock:
+            self._upload_sessions.pop(upload_id, None)
+
+
+def generate_tree(store: Store, depth: int, width: int, aktliste_rows: int) -> int:
+    """Generate a tree of folders under TREE_ROOT_URL with case folders on the deepest level.
+    Each folder has 'width' subfolders. Case folders are named like 'GEO-2024-000001' and
+    most of them contain an aktliste workbook. Every tenth case folder has no aktliste.
+    Each case folder also has 'Bilag' and 'Kladder' subfolders like real cases, which a crawl can prune.
+
+    Returns:
+        The number of case folders.
+    """
+    workbooks = [create_aktliste(aktliste_rows, "ja"), create_aktliste(aktliste_rows, "mixed")]
+    level = [store.add_folder(TREE_ROOT_URL).url]
+    case_count = 0
+    for current_depth in range(1, depth + 1):
+        next_level = []
+        for parent_url in level:
+            for i in range(width):
+                if current_depth < depth:
+                    next_level.append(store.add_folder(f"{parent_url}/Mappe {current_depth}-{i}").url)
+                    continue
+
+                case_count += 1
+                case_url = store.add_folder(f"{parent_url}/GEO-2024-{case_count:06d}").url
+                store.add_file(f"{case_url}/Bilag.pdf", b"%PDF-1.4 stand-in")
+                store.add_file(f"{store.add_folder(f'{case_url}/Bilag').url}/Bilag 1.pdf", b"%PDF-1.4 stand-in")
+                store.add_file(f"{store.add_folder(f'{case_url}/Kladder').url}/Udkast.xlsx", b"")
+                if case_count % 10:
+                    store.add_file(f"{case_url}/Aktliste GEO-2024-{case_count:06d}.xlsx", workbooks[case_count % len(workbooks)])
+        level = next_level
+
+    store.add_folder(UPLOAD_FOLDER_URL)
+    store.add_folder(f"{LIBRARY_URL}/Historik")
+    return case_count
+
+
+def parse_segments(path: str) -> list[tuple[str, dict]]:
+    """Split the path of a REST call into segments like [('getfolderbyserverrelativeurl', {0: '/a/b'})].
+    Names are lower case. Arguments are keyed by their lower case name or their position.
+    """
+    segments = []
+    i = 0
+    while i < len(path):
+        j = i
+        while j < len(path) and path[j] not in "(/":
+            j += 1
+        name = path[i:j].lower()
+        args = {}
+        if j < len(path) and path[j] == "(":
+            k = j + 1
+            in_quote = False
+            while k < len(path):
+                if path[k] == "'":
+                    if in_quote and path[k + 1:k + 2] == "'":
+                        k += 2
+                        continue
+                    in_quote = not in_quote
+                elif path[k] == ")" and not in_quote:
+                    break
+                k += 1
+            args = _parse_args(path[j + 1:k])
+            j = k + 1
+        if name or args:
+            segments.append((name, args))
+        i = j + 1
+    return segments
+
+
+def _parse_args(text: str) -> dict:
+    """Parse the arguments of a REST call like "url='a.xlsx',overwrite=true"."""
+    parts = []
+    current = ""
+    in_quote = False
+    for char in text:
+        if char == "'":
+            in_quote = not in_quote
+        if char == "," and not in_quote:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        parts.append(current)
+
+    args = {}
+    for position, part in enumerate(parts):
+        key, separator, value = part.partition("=")
+        if not separator or key.startswith("'"):
+            key, value = position, part
+        value = value.strip()
+        if value.startswith("'"):
+            value = value[1:-1].replace("''", "'")
+        elif value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif value.lstrip("-").isdigit():
+            value = int(value)
+        args[key.lower() if isinstance(key, str) else key] = value
+    return args
+
+
+class StandInServer(ThreadingHTTPServer):
+    """The HTTP server holding the store, the latency and the request counter."""
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], store: Store, latency: float):
+        super().__init__(address, StandInHandler)
+        self.store = store
+        self.latency = latency
+        self.request_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.counter_lock = threading.Lock()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Handles the REST calls of ClientContext against the store."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which otherwise adds a delayed ACK to every request
+    disable_nagle_algorithm = True
+    server: StandInServer
+
+    # pylint: disable-next = invalid-name
+    def do_GET(self):
+        """Handle a GET request."""
+        self._handle()
+
+    # pylint: disable-next = invalid-name
+    def do_POST(self):
+        """Handle a POST request."""
+        self._handle()
+
+    # pylint: disable-next = invalid-name
+    def do_DELETE(self):
+        """Handle a DELETE request."""
+        self._handle()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Don't log every request."""
+
+    def _handle(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if self.path.startswith(CONTROL_PATH):
+            self._send(*self._control(self.path[len(CONTROL_PATH):]))
+            return
+
+        time.sleep(self.server.latency)
+        with self.server.counter_lock:
+            self.server.request_count += 1
+            self.server.bytes_received += len(body)
+
+        method = self.headers.get("X-HTTP-Method", self.command).upper()
+        if urlsplit(self.path).path.endswith("/_api/$batch"):
+            status, content_type, response_body = self._batch(body)
+        else:
+            status, content_type, response_body = dispatch(self.server.store, method, self.path, body)
+
+        with self.server.counter_lock:
+            self.server.bytes_sent += len(response_body)
+        self._send(status, content_type, response_body)
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _control(self, command: str) -> tuple[int, str, bytes]:
+        """Handle the requests of the benchmark itself: reading and resetting the counters."""
+        with self.server.counter_lock:
+            stats = {
+                "requests": self.server.request_count,
+                "bytes_sent": self.server.bytes_sent,
+                "bytes_received": self.server.bytes_received
+            }
+            if command == "/reset":
+                self.server.request_count = self.server.bytes_sent = self.server.bytes_received = 0
+        return 200, "application/json", json.dumps(stats).encode()
+
+    def _batch(self, body: bytes) -> tuple[int, str, bytes]:
+        """Run each request of a $batch and combine the responses in a multipart response."""
+        message = email.message_from_bytes(b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+        boundary = f"batchresponse_{uuid.uuid4()}"
+        parts = []
+        for part in _http_parts(message):
+            request_text, _, request_body = part.get_payload(decode=True).replace(b"\r\n", b"\n").partition(b"\n\n")
+            request_line = request_text.decode().split("\n", 1)[0]
+            # The url of a batched request isn't necessarily quoted, so it can contain spaces
+            method, url = request_line.split(" ", 1)
+            url = url.rsplit(" ", 1)[0]
+            status, content_type, response_body = dispatch(self.server.store, method, url, request_body.rstrip(b"\n"))
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-Transfer-Encoding: binary\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\nContent-Type: {content_type}\r\n\r\n".encode()
+                + response_body + b"\r\n"
+            )
+        response_body = b"".join(parts) + f"--{boundary}--\r\n".encode()
+        return 200, f"multipart/mixed; boundary={boundary}", response_body
+
+
+def _http_parts(message: email.message.Message) -> Iterator[email.message.Message]:
+    """Get the application/http parts of a batch request in order, including those in change sets."""
+    for part in message.get_payload():
+        if part.is_multipart():
+            yield from _http_parts(part)
+        elif part.get_content_type() == "application/http":
+            yield part
+
+
+JSON_TYPE = "application/json;odata=verbose;charset=utf-8"
+
+
+def dispatch(store: Store, method: str, url: str, body: bytes) -> tuple[int, str, bytes]:
+    """Run a single REST call against the store.
+
+    Returns:
+        The status code, content type and body of the response.
+    """
+    split_url = urlsplit(url)
+    path = unquote(split_url.path)
+    if "/_api/" not in path:
+        return _error(404, "Not an API call.")
+    site_path, api_path = path.split("/_api/", 1)
+    query = {key.lower(): values[0] for key, values in parse_qs(split_url.query).items()}
+    expand = tuple(name.strip().lower() for name in query.get("$expand", "").split(",") if name.strip())
+
+    try:
+        return _run(store, site_path, method, parse_segments(api_path), body, expand)
+    except NotFound as error:
+        return _error(404, f"File Not Found: {error}")
+    except (KeyError, ValueError) as error:
+        return _error(400, repr(error))
+
+
+# pylint: disable-next = too-many-return-statements, too-many-branches, too-many-statements, too-many-arguments, too-many-positional-arguments
+def _run(store: Store, site_path: str, method: str, segments: list[tuple[str, dict]], body: bytes, expand: tuple[str, ...]) -> tuple[int, str, bytes]:
+    """Resolve the segments of a REST call one by one and perform the call."""
+    def absolute(url: str) -> str:
+        return url if url.startswith("/") else f"{site_path}/{url}"
+
+    if segments and segments[0][0] == "contextinfo":
+        return _json({"GetContextWebInformation": {"FormDigestValue": "stand-in", "FormDigestTimeoutSeconds": 1800}})
+
+    target = ("web", None)
+    for name, args in segments:
+        kind, value = target
+        if name == "web":
+            continue
+        if kind == "web" and name == "getfolderbyserverrelativeurl":
+            target = ("folder", absolute(args[0]))
+        elif kind == "web" and name in ("getfilebyserverrelativeurl", "getfilebyserverrelativepath"):
+            target = ("file", absolute(args.get(0) or args.get("decodedurl")))
+        elif kind == "web" and name == "getfilebyid":
+            target = ("file", store.get_file_by_id(args[0]).url)
+        elif kind == "web" and name == "getlist":
+            target = ("list_by_url", absolute(args[0]))
+        elif kind == "list_by_url" and name == "renderlistdataasstream":
+            return _render_list_data(store, json.loads(body)["parameters"])
+        elif kind == "web" and name == "lists":
+            target = ("lists", None)
+        elif kind == "lists" and name == "getbytitle":
+            target = ("list", args[0].lower())
+        elif kind == "list" and name == "rootfolder":
+            target = ("folder", store.libraries[value])
+        elif kind in ("web", "folder") and name == "folders":
+            target = ("folders", value)
+        elif kind == "folder" and name == "files":
+            target = ("files", value)
+        elif kind == "folders" and name == "add":
+            folder_url = args.get(0) or args.get("url")
+            folder_url = folder_url if folder_url.startswith("/") or value is None else f"{value}/{folder_url}"
+            return _json(store.add_folder(absolute(folder_url)).properties())
+        elif kind == "files" and name == "add":
+            file_url = f"{value}/{args.get('url') or args.get(0)}"
+            if not args.get("overwrite") and _exists(store, file_url):
+                return _error(400, "A file with this name already exists.")
+            return _json(store.add_file(file_url, body).properties())
+        elif kind == "file" and name == "$value":
+            return 200, "application/octet-stream", store.get_file(value).content
+        elif kind == "file" and name == "startupload":
+            store.get_file(value)
+            return _json({"StartUpload": str(store.start_upload(args["uploadid"], body))})
+        elif kind == "file" and name == "continueupload":
+            return _json({"ContinueUpload": str(store.continue_upload(args["uploadid"], args["fileoffset"], body))})
+        elif kind == "file" and name == "finishupload":
+            return _json(store.finish_upload(args["uploadid"], args["fileoffset"], body, store.get_file(value).url).properties())
+        elif kind == "file" and name == "cancelupload":
+            store.cancel_upload(args["uploadid"])
+            return _json({})
+        elif kind == "file" and name == "copyto":
+            target_url = absolute(args["strnewurl"])
+            if not args.get("boverwrite") and _exists(store, target_url):
+                return _error(400, "A file with this name already exists.")
+            store.add_file(target_url, store.get_file(value).content)
+            return _json({})
+        elif kind == "file" and name == "moveto":
+            content = store.get_file(value).content
+            store.add_file(absolute(args["newurl"]), content)
+            store.delete_file(value)
+            return _json({})
+        else:
+            return _error(400, f"Unsupported segment '{name}' on {kind}.")
+
+    kind, value = target
+    if kind == "folder":
+        return _json(store.get_folder(value).properties(expand))
+    if kind == "file" and method == "DELETE":
+        store.delete_file(value)
+        return _json({})
+    if kind == "file":
+        return _json(store.get_file(value).properties())
+    if kind == "files":
+        return _json({"results": [file.properties() for file in store.get_folder(value).files.values()]})
+    if kind == "folders":
+        return _json({"results": [folder.properties() for folder in store.get_folder(value).folders.values()]})
+    return _error(400, f"Unsupported request on {kind}.")
+
+
+def _render_list_data(store: Store, parameters: dict) -> tuple[int, str, bytes]:
+    """Run a CAML view under FolderServerRelativeUrl. Only Where clauses with And, Or and Eq are supported."""
+    view = ElementTree.fromstring(parameters["ViewXml"])
+    where = view.find("Query/Where")
+    row_limit = int(view.findtext("RowLimit") or 30)
+    paging = parse_qs(parameters.get("Paging") or "")
+    after_id = int(paging["p_ID"][0]) if "p_ID" in paging else 0
+
+    rows = []
+    for item in store.list_items(parameters["FolderServerRelativeUrl"]):
+        if item.item_id <= after_id:
+            continue
+        row = _row(item)
+        if where is None or _matches(where[0], row):
+            rows.append(row)
+        if len(rows) > row_limit:
+            break
+
+    content = {"Row": rows[:row_limit], "FirstRow": 1, "LastRow": min(len(rows), row_limit)}
+    if len(rows) > row_limit:
+        content["NextHref"] = f"?Paged=TRUE&p_ID={rows[row_limit - 1]['ID']}"
+    return 200, "application/json;charset=utf-8", json.dumps(content).encode()
+
+
+def _row(item: StoredFile | StoredFolder) -> dict:
+    """The fields of a file or folder as returned by RenderListDataAsStream."""
+    parent_url, name = item.url.rsplit("/", 1)
+    is_folder = isinstance(item, StoredFolder)
+    return {
+        "ID": item.item_id,
+        "FileRef": item.url,
+        "FileLeafRef": name,
+        "FileDirRef": parent_url,
+        "FSObjType": "1" if is_folder else "0",
+        "File_x0020_Type": "" if is_folder else name.rsplit(".", 1)[-1],
+        "UniqueId": f"{{{item.unique_id.upper()}}}",
+        "Modified": "" if is_folder else item.modified,
+        "owshiddenversion": 1 if is_folder else item.version
+    }
+
+
+def _matches(condition: ElementTree.Element, row: dict) -> bool:
+    """Evaluate a CAML condition against a row."""
+    if condition.tag == "And":
+        return all(_matches(child, row) for child in condition)
+    if condition.tag == "Or":
+        return any(_matches(child, row) for child in condition)
+    if condition.tag == "Eq":
+        return str(row.get(condition.find("FieldRef").get("Name"))).lower() == condition.findtext("Value").lower()
+    raise ValueError(f"Unsupported CAML element {condition.tag}.")
+
+
+def _exists(store: Store, file_url: str) -> bool:
+    try:
+        store.get_file(file_url)
+        return True
+    except NotFound:
+        return False
+
+
+def _json(content: dict) -> tuple[int, str, bytes]:
+    return 200, JSON_TYPE, json.dumps({"d": content}).encode()
+
+
+def _error(status: int, message: str) -> tuple[int, str, bytes]:
+    content = {"error": {"code": f"{status}, Microsoft.SharePoint.StandIn", "message": {"lang": "en-US", "value": message}}}
+    return status, JSON_TYPE, json.dumps(content).encode()
+
+
+# pylint: disable-next = too-many-arguments, too-many-positional-arguments
+def serve(depth: int, width: int, latency: float, aktliste_rows: int, port_queue: multiprocessing.queues.Queue | None = None, port: int = 0) -> None:
+    """Generate a tree and serve it until the process is stopped.
+
+    Args:
+        depth: The depth of the generated tree.
+        width: The number of subfolders of each folder in the tree.
+        latency: The delay in seconds added to each request.
+        aktliste_rows: The number of document rows in each aktliste.
+        port_queue: If given, the port of the server is put on this queue when it is ready.
+        port: The port to listen on. 0 picks a free port.
+    """
+    store = Store()
+    generate_tree(store, depth, width, aktliste_rows)
+    server = StandInServer(("127.0.0.1", port), store, latency)
+    if port_queue is not None:
+        port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+@contextmanager
+def running_stand_in(depth: int, width: int, latency: float, aktliste_rows: int = 50) -> Iterator[str]:
+    """Run a stand-in in a separate process, so it doesn't count towards the memory of the benchmark.
+
+    Args:
+        depth: The depth of the generated tree.
+        width: The number of subfolders of each folder in the tree.
+        latency: The delay in seconds added to each request.
+        aktliste_rows: The number of document rows in each aktliste.
+
+    Yields:
+        The url of the SharePoint site.
+    """
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(depth, width, latency, aktliste_rows, port_queue), daemon=True)
+    process.start()
+    try:
+        yield f"http://127.0.0.1:{port_queue.get(timeout=120)}{SITE_PATH}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    """Run a stand-in in the foreground."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to each request.")
+    parser.add_argument("--rows", type=int, default=50, help="Document rows in each aktliste.")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    print(f"Serving http://127.0.0.1:{args.port}{SITE_PATH} with the tree at {TREE_ROOT_URL}")
+    serve(args.depth, args.width, args.latency, args.rows, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,100 @@
 """The main file of the robot which will install all requirements in
 a virtual environment and then start the actual process.
+
+The virtual environment is reused between runs as long as pyproject.toml and
+the Python version are unchanged. Otherwise a new environment is built in a
+temporary directory and swapped in when it is complete, so an interrupted
+install never leaves a broken .venv behind.
 """
 
-import subprocess
+import hashlib
 import os
+import shutil
+import subprocess
 import sys
+import tempfile
+import time
+
+VENV_DIRECTORY = ".venv"
+# The file in the virtual environment holding the hash it was built from
+HASH_FILE_NAME = "dependency_hash.txt"
+
+
+def dependency_hash() -> str:
+    """Hash pyproject.toml together with the Python version running the bootstrap."""
+    sha = hashlib.sha256()
+    with open("pyproject.toml", "rb") as file:
+        sha.update(file.read())
+    sha.update(sys.version.encode())
+    return sha.hexdigest()
+
+
+def venv_python(venv_directory: str) -> str:
+    """Get the path of the Python executable in a virtual environment."""
+    if os.name == "nt":
+        return os.path.join(venv_directory, "Scripts", "python.exe")
+    return os.path.join(venv_directory, "bin", "python")
+
+
+def read_venv_hash(venv_directory: str) -> str | None:
+    """Read the dependency hash a virtual environment was built from, if it is complete."""
+    hash_path = os.path.join(venv_directory, HASH_FILE_NAME)
+    if not os.path.isfile(hash_path) or not os.path.isfile(venv_python(venv_directory)):
+        return None
+    with open(hash_path, encoding="utf-8") as file:
+        return file.read().strip()
+
+
+def build_venv(expected_hash: str) -> None:
+    """Build a new virtual environment in a temporary directory and swap it in place of .venv.
+    The environment is only ever used through its Python executable, which keeps working after the move.
+    """
+    build_directory = tempfile.mkdtemp(prefix=".venv-build-", dir=".")
+    try:
+        subprocess.run([sys.executable, "-m", "venv", build_directory], check=True)
+        subprocess.run([venv_python(build_directory), "-m", "pip", "install", "."], check=True)
+        with open(os.path.join(build_directory, HASH_FILE_NAME), "w", encoding="utf-8") as file:
+            file.write(expected_hash)
+
+        old_directory = None
+        if os.path.exists(VENV_DIRECTORY):
+            old_directory = tempfile.mkdtemp(prefix=".venv-old-", dir=".")
+            os.rmdir(old_directory)
+            os.rename(VENV_DIRECTORY, old_directory)
+        os.rename(build_directory, VENV_DIRECTORY)
+        if old_directory:
+            shutil.rmtree(old_directory, ignore_errors=True)
+    finally:
+        shutil.rmtree(build_directory, ignore_errors=True)
+
+
+def bootstrap() -> None:
+    """Make sure .venv matches the current dependencies, rebuilding it only when they have changed."""
+    start = time.perf_counter()
+    expected_hash = dependency_hash()
+    current_hash = read_venv_hash(VENV_DIRECTORY)
+
+    if current_hash == expected_hash:
+        action = "Reused"
+    else:
+        try:
+            build_venv(expected_hash)
+            action = "Rebuilt"
+        except (subprocess.CalledProcessError, OSError) as error:
+            # Keep running on the old environment, e.g. if the package index is unreachable
+            if current_hash is None:
+                raise
+            print(f"Rebuilding the virtual environment failed, reusing the existing one: {error}")
+            action = "Failed to rebuild"
+
+    print(f"{action} virtual environment in {time.perf_counter() - start:.1f} seconds.")
+
 
 script_directory = os.path.dirname(os.path.realpath(__file__))
 os.chdir(script_directory)
 
-subprocess.run("python -m venv .venv", check=True)
-subprocess.run(r'.venv\Scripts\pip install .', check=True)
+bootstrap()
 
-command_args = [r".venv\Scripts\python", "-m", "robot_framework"] + sys.argv[1:]
+command_args = [venv_python(VENV_DIRECTORY), "-m", "robot_framework"] + sys.argv[1:]
 
 subprocess.run(command_args, check=True)
@@ -1,4 +1,13 @@
-"""The entry point of the process."""
+"""The entry point of the process.
+Run with --import-profile to print how long it takes to import the robot instead of running it.
+"""
+
+import sys
+
+if "--import-profile" in sys.argv:
+    from robot_framework import import_profile
+    import_profile.main()
+    sys.exit()
 
 # Remember to delete this error
 raise NotImplementedError("Remember to choose a framework to use.")
@@ -1,89 +1,344 @@
+from __future__ import annotations
+
 import os
-import pandas as pd
 import time
-import re
+import queue
+import threading
+from typing import IO, TYPE_CHECKING, Iterator
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from office365.runtime.auth.user_credential import UserCredential
-from office365.sharepoint.client_context import ClientContext
 
-from office365.sharepoint.client_context import ClientContext
-from office365.runtime.auth.user_credential import UserCredential
+from robot_framework import config
+from robot_framework import retry
+from robot_framework import sharepoint
+from robot_framework.classification_cache import ClassificationCache
+from robot_framework.crawl_policy import CompiledCrawlPolicy, CrawlPolicy
+from robot_framework.sharepoint import sharepoint_client
+
+# pandas, openpyxl and office365 are imported on first use to keep the start of the robot fast
+if TYPE_CHECKING:
+    from office365.sharepoint.client_context import ClientContext
+
+# Marks the end of the items on a queue in the pipelined traversal
+_PIPELINE_DONE = object()
 
 
 
-def tjek_for_aktindsigt(client: ClientContext, parent_folder_url: str, orchestrator_connection: OrchestratorConnection):
+def tjek_for_aktindsigt(client: ClientContext, parent_folder_url: str, orchestrator_connection: OrchestratorConnection, pipeline: bool = False, use_cache: bool = True,
+                        *, discovery: str | None = None, policy: CrawlPolicy | None = None):
     """
     Traverses folders under the specified parent folder in SharePoint, checks each Excel file for a specific column,
     and returns a dictionary with folder paths and their check results.
+    If pipeline is True listing, downloading and classification run concurrently as a pipeline.
+    Both modes produce the same results.
+    If use_cache is True files that are unchanged since an earlier run are neither downloaded nor checked again.
+    discovery is how the case folders are found: "crawl" lists every folder, "query" queries the library
+    for case folders and Excel files (see find_aktlister_by_query). Defaults to config.AKTINDSIGT_DISCOVERY.
+    policy decides which folders are case folders and which folders are pruned. Defaults to the policy in config.
     """
+    discovery = discovery or config.AKTINDSIGT_DISCOVERY
+    compiled_policy = (policy or CrawlPolicy.from_config()).compile()
     orchestrator_connection.log_trace("Running tjek_for_aktindsigt.")
     
     # Dictionary to store results for each folder
     results = {}
 
-    # Recursively traverse folders and check Excel files
-    traverse_and_check_folders(client, parent_folder_url, results, orchestrator_connection)
+    cache = None
+    if use_cache and config.CLASSIFICATION_CACHE_PATH:
+        cache = ClassificationCache(config.CLASSIFICATION_CACHE_PATH, config.CLASSIFICATION_CACHE_MAX_AGE_DAYS, config.CLASSIFICATION_CACHE_MAX_ENTRIES)
+
+    # Traverse the folders level by level and check Excel files
+    try:
+        if pipeline:
+            stats = traverse_and_check_folders_pipelined(client, parent_folder_url, results, orchestrator_connection, cache, discovery, compiled_policy)
+        else:
+            stats = traverse_and_check_folders(client, parent_folder_url, results, orchestrator_connection, cache, discovery, compiled_policy)
+    finally:
+        if cache:
+            cache.close()
+            orchestrator_connection.log_info(cache.summary())
+    orchestrator_connection.log_info(f"Found {stats.folders} folders by {discovery} in {stats.round_trips} round trips. Pruned {stats.pruned} folders.")
 
     return results
 
-def traverse_and_check_folders(client, folder_url, results, orchestrator_connection):
+def find_aktlister(client: ClientContext, folder_url: str, stats: sharepoint.CrawlStats, policy: CompiledCrawlPolicy) -> Iterator[tuple[str, str | None, dict | None]]:
+    """
+    Traverses through folders in SharePoint breadth-first and finds the folders matching the case folder pattern.
+    Each level of folders is listed in a single batched request. Subfolders rejected by the policy are never listed.
+    Yields the name of each matching folder and the url and properties of its first Excel file, or None if it has none.
+    """
+    for listing in sharepoint.walk_folders(client, folder_url, stats):
+        # The parent folder itself is never checked
+        is_case_folder = listing.depth > 0 and policy.is_case_folder(listing.name)
+
+        visited = [folder for folder in listing.folders if policy.should_visit(folder["Name"], listing.depth + 1, is_case_folder)]
+        stats.pruned += len(listing.folders) - len(visited)
+        listing.folders[:] = visited
+
+        # Only proceed if the folder name matches the case folder pattern
+        if not is_case_folder:
+            continue
+
+        # orchestrator_connection.log_info(f"Checking folder: {listing.url}") - springer log over
+
+        for file in listing.files:
+            if file["Name"].endswith(".xlsx"):
+                yield listing.name, f"{listing.url}/{file['Name']}", file
+                break  # Only the first Excel file in this folder is used
+        else:
+            yield listing.name, None, None
+
+def find_aktlister_by_query(client: ClientContext, folder_url: str, stats: sharepoint.CrawlStats, policy: CompiledCrawlPolicy) -> Iterator[tuple[str, str | None, dict | None]]:
     """
-    Recursively traverses through folders in SharePoint, filters by matching folder names,
+    Finds the same case folders and Excel files as find_aktlister, but with a paged, recursive
+    RenderListDataAsStream query instead of listing every folder. SharePoint only returns folders
+    and .xlsx files under the parent folder, so the round trips depend on the number of those
+    items and config.AKTINDSIGT_QUERY_PAGE_SIZE instead of the number of folders.
+    Case folders without an Excel file are yielded with None like in find_aktlister.
+    The policy is applied to the returned folders, so pruned folders cost no round trips but are still returned.
+    On libraries above the list view threshold (5000 items) the filtered columns must be indexed.
+    """
+    view_xml = (
+        '<View Scope="RecursiveAll"><ViewFields>'
+        + "".join(f'<FieldRef Name="{name}"/>' for name in _QUERY_FIELDS)
+        + '</ViewFields><Query><Where><Or>'
+        '<Eq><FieldRef Name="FSObjType"/><Value Type="Integer">1</Value></Eq>'
+        '<Eq><FieldRef Name="File_x0020_Type"/><Value Type="Text">xlsx</Value></Eq>'
+        '</Or></Where><OrderBy><FieldRef Name="ID"/></OrderBy></Query>'
+        f'<RowLimit Paged="TRUE">{config.AKTINDSIGT_QUERY_PAGE_SIZE}</RowLimit></View>'
+    )
+
+    # Folders by their lower case url, and the first Excel file found in each folder
+    folders = []
+    first_files = {}
+    for row in sharepoint.render_list_data(client, folder_url, view_xml, stats):
+        parent_url = row["FileDirRef"].lower()
+        if str(row["FSObjType"]) == "1":
+            folders.append(row)
+        elif row["FileLeafRef"].endswith(".xlsx") and parent_url not in first_files:
+            first_files[parent_url] = row
+
+    # Apply the policy top down like the crawl. Whether each visited folder is a case folder, by its lower case url.
+    # The rows have server relative urls, so the root must have one too.
+    root_url = sharepoint.server_relative_url(client, folder_url).rstrip("/")
+    root_depth = root_url.count("/")
+    visited = {root_url.lower(): False}
+    case_folders = {}
+    for row in sorted(folders, key=lambda row: row["FileRef"].count("/")):
+        url = row["FileRef"]
+        parent_is_case_folder = visited.get(row["FileDirRef"].lower())
+        if parent_is_case_folder is None:
+            continue  # Inside a pruned folder
+        if not policy.should_visit(row["FileLeafRef"], url.count("/") - root_depth, parent_is_case_folder):
+            stats.pruned += 1
+            continue
+        stats.folders += 1
+        visited[url.lower()] = policy.is_case_folder(row["FileLeafRef"])
+        if visited[url.lower()]:
+            case_folders[url.lower()] = url
+
+    # Level by level like the crawl, so the last of two case folders with the same name wins in both modes
+    for key, url in sorted(case_folders.items(), key=lambda item: (item[0].count("/"), item[0])):
+        name = url.rsplit("/", 1)[-1]
+        row = first_files.get(key)
+        if row:
+            yield name, row["FileRef"], _file_properties(row)
+        else:
+            yield name, None, None
+
+
+# The fields of the items returned by find_aktlister_by_query
+_QUERY_FIELDS = ("FileLeafRef", "FileRef", "FileDirRef", "FSObjType", "UniqueId", "Modified", "owshiddenversion")
+
+
+def _file_properties(row: dict) -> dict:
+    """Convert a row from RenderListDataAsStream to the file properties used by the classification cache."""
+    return {
+        "Name": row["FileLeafRef"],
+        "ServerRelativeUrl": row["FileRef"],
+        "UniqueId": row["UniqueId"].strip("{}").lower(),
+        # The version of the item changes on every edit, unlike Modified which is shown in minutes
+        "TimeLastModified": f"{row.get('Modified')};{row.get('owshiddenversion')}"
+    }
+
+
+def _discover(discovery: str):
+    """Get the function finding case folders and their Excel files for a discovery mode."""
+    if discovery == "crawl":
+        return find_aktlister
+    if discovery == "query":
+        return find_aktlister_by_query
+    raise ValueError(f"Unknown discovery mode: {discovery}")
+
+# pylint: disable-next = too-many-arguments, too-many-positional-arguments
+def traverse_and_check_folders(client, folder_url, results, orchestrator_connection, cache: ClassificationCache | None = None, discovery: str = "crawl",
+                               policy: CompiledCrawlPolicy | None = None) -> sharepoint.CrawlStats:
+    """
+    Traverses through folders in SharePoint breadth-first, filters by matching folder names,
     checks for Excel files, and saves check results in `results`.
+    Results of unchanged files are taken from the cache, if any.
+    Folders are visited according to the policy, by default the policy in config.
+    Returns the crawl statistics including the number of round trips used for listing.
+    """
+    stats = sharepoint.CrawlStats()
+    policy = policy or CrawlPolicy.from_config().compile()
+    for case_folder, file_url, file_properties in _discover(discovery)(client, folder_url, stats, policy):
+        # Setting the name for all to afvist so I dont loose them later
+        results[case_folder] = "Ingen filer"
+
+        if file_url:
+            result = cache.get(file_properties) if cache else None
+            if result is None:
+                # Download the Excel file into memory and process it
+                with retry.run_step("download", lambda file_url=file_url: sharepoint.download_file(client, file_url)) as excel_file:
+                    result = classify_excel_file(excel_file, orchestrator_connection)
+                _cache_result(cache, file_properties, result)
+
+            # Store result using only the folder name as the key
+            results[case_folder] = result
+
+    return stats
+
+# pylint: disable-next = too-many-arguments, too-many-positional-arguments
+def traverse_and_check_folders_pipelined(client, folder_url, results, orchestrator_connection, cache: ClassificationCache | None = None, discovery: str = "crawl",
+                                         policy: CompiledCrawlPolicy | None = None) -> sharepoint.CrawlStats:
+    """
+    Does the same as traverse_and_check_folders but as a pipeline of three overlapping stages:
+    Listing folders, downloading Excel files in a pool of threads and classifying them in another pool of threads.
+    The stages are connected by bounded queues so only a limited number of files are held in memory at any time.
+    Returns the crawl statistics including the number of round trips used for listing.
+    """
+    stats = sharepoint.CrawlStats()
+    policy = policy or CrawlPolicy.from_config().compile()
+    download_queue = queue.Queue(maxsize=config.AKTINDSIGT_PIPELINE_QUEUE_SIZE)
+    classify_queue = queue.Queue(maxsize=config.AKTINDSIGT_PIPELINE_QUEUE_SIZE)
+    stop = threading.Event()
+    lock = threading.Lock()
+    errors = []
+
+    # The listing order of each case folder. If the same folder name is found twice
+    # the last one wins, exactly like in the sequential traversal.
+    latest_sequence = {}
+    running_downloaders = config.AKTINDSIGT_DOWNLOAD_WORKERS
+
+    def fail(error: Exception):
+        with lock:
+            errors.append(error)
+        stop.set()
+
+    def list_stage():
+        try:
+            for sequence, (case_folder, file_url, file_properties) in enumerate(_discover(discovery)(client, folder_url, stats, policy)):
+                cached_result = cache.get(file_properties) if cache and file_url else None
+                with lock:
+                    latest_sequence[case_folder] = sequence
+                    results[case_folder] = cached_result or "Ingen filer"
+                if file_url and cached_result is None:
+                    _put_until_stopped(download_queue, (sequence, case_folder, file_properties, file_url), stop)
+        # Errors are passed on to the calling thread.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            fail(error)
+        finally:
+            for _ in range(config.AKTINDSIGT_DOWNLOAD_WORKERS):
+                _put_until_stopped(download_queue, _PIPELINE_DONE, stop)
+
+    def download_stage():
+        nonlocal running_downloaders
+        try:
+            # ClientContext is not thread safe so each thread gets its own clone sharing the authentication
+            worker_client = client.clone(client.base_url)
+            while (item := _get_until_stopped(download_queue, stop)) is not _PIPELINE_DONE:
+                sequence, case_folder, file_properties, file_url = item
+                excel_file = retry.run_step("download", lambda file_url=file_url: sharepoint.download_file(worker_client, file_url))
+                if not _put_until_stopped(classify_queue, (sequence, case_folder, file_properties, excel_file), stop):
+                    excel_file.close()
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            fail(error)
+        finally:
+            with lock:
+                running_downloaders -= 1
+                last_downloader = running_downloaders == 0
+            if last_downloader:
+                for _ in range(config.AKTINDSIGT_CLASSIFY_WORKERS):
+                    _put_until_stopped(classify_queue, _PIPELINE_DONE, stop)
+
+    def classify_stage():
+        try:
+            while (item := _get_until_stopped(classify_queue, stop)) is not _PIPELINE_DONE:
+                sequence, case_folder, file_properties, excel_file = item
+                with excel_file:
+                    result = classify_excel_file(excel_file, orchestrator_connection)
+                _cache_result(cache, file_properties, result)
+
+                with lock:
+                    if latest_sequence[case_folder] == sequence:
+                        results[case_folder] = result
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            fail(error)
+
+    threads = [threading.Thread(target=list_stage)]
+    threads += [threading.Thread(target=download_stage) for _ in range(config.AKTINDSIGT_DOWNLOAD_WORKERS)]
+    threads += [threading.Thread(target=classify_stage) for _ in range(config.AKTINDSIGT_CLASSIFY_WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Release any downloaded files left behind if the pipeline was stopped early
+    while not classify_queue.empty():
+        item = classify_queue.get_nowait()
+        if item is not _PIPELINE_DONE:
+            item[3].close()
+
+    if errors:
+        raise errors[0]
+
+    return stats
+
+
+def _cache_result(cache: ClassificationCache | None, file_properties: dict, result: str) -> None:
+    """Store a classification result in the cache, if any.
+    Errors reading the file might be temporary so they are not cached.
     """
-    # Define the regex pattern for folder names (e.g., "GEO-2024-123456")
-    pattern = re.compile(r"^[A-Z]{3}-\d{4}-\d{6}")
-
-    folder = client.web.get_folder_by_server_relative_url(folder_url)
-    client.load(folder)
-    client.execute_query()
-
-    # Load subfolders in the current folder
-    subfolders = folder.folders
-    client.load(subfolders)
-    client.execute_query()
-
-    # Process each subfolder if it matches the pattern
-    for subfolder in subfolders:
-        subfolder_name = subfolder.properties["Name"]
-        subfolder_url = f"{folder_url}/{subfolder_name}"
-
-        # Only proceed if the folder name matches the specified pattern
-        if pattern.match(subfolder_name):
-            # orchestrator_connection.log_info(f"Checking folder: {subfolder_url}") - springer log over
-
-            # Setting the name for all to afvist so I dont loose them later
-            results[subfolder_name] = "Ingen filer"
-            # Check each file in the matched folder
-            files = subfolder.files
-            client.load(files)
-            client.execute_query()
-
-            
-            for file in files:
-                if file.properties["Name"].endswith(".xlsx"):
-                    # Download and process the Excel file
-                    excel_fil_fundet = True
-                    file_url = f"{subfolder_url}/{file.properties['Name']}"
-                    local_file_path = download_file_from_sharepoint(client, file_url)
-                    result = check_excel_file(local_file_path, orchestrator_connection)
-                    
-                    # Store result using only the folder name as the key
-                    results[subfolder_name] = result
-                    
-                    os.remove(local_file_path)  # Clean up after processing
-                    break  # Stop after processing the first Excel file in this folder
-            
-
-        # Recursively traverse the subfolders to continue searching deeper
-        traverse_and_check_folders(client, subfolder_url, results, orchestrator_connection)
-
-
-
-def check_excel_file(file_path: str, orchestrator_connection: OrchestratorConnection) -> str:
+    if cache and result != "Error processing file":
+        cache.put(file_properties, result)
+
+
+def _put_until_stopped(pipeline_queue: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put an item on a bounded queue, waiting for room until the pipeline is stopped.
+    Returns whether the item was put on the queue.
+    """
+    while not stop.is_set():
+        try:
+            pipeline_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get_until_stopped(pipeline_queue: queue.Queue, stop: threading.Event):
+    """Get an item from a queue, waiting until one arrives or the pipeline is stopped.
+    Returns _PIPELINE_DONE if the pipeline was stopped.
+    """
+    while not stop.is_set():
+        try:
+            return pipeline_queue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _PIPELINE_DONE
+
+
+def check_excel_file(file_path: str | IO[bytes], orchestrator_connection: OrchestratorConnection) -> str:
     """
     Checks the 'Gives der aktindsigt?' column in the specified Excel file and returns the result.
+    The file can be given either as a path or as a binary file-like object.
     """
+    # pylint: disable-next = import-outside-toplevel
+    import pandas as pd
+
     try:
         df = pd.read_excel(file_path)
         
@@ -105,50 +360,109 @@ def check_excel_file(file_path: str, orchestrator_connection: OrchestratorConnec
         orchestrator_connection.log_error(f"Error reading Excel file at {file_path}: {e}")
         return "Error processing file"
 
-def sharepoint_client(username: str, password: str, sharepoint_site_url: str, orchestrator_connection: OrchestratorConnection) -> ClientContext:
+def check_excel_file_streaming(file_path: str | IO[bytes], orchestrator_connection: OrchestratorConnection) -> str:
     """
-    Creates and returns a SharePoint client context.
+    Does the same check as check_excel_file with identical results, but streams the workbook with openpyxl
+    in read-only mode instead of loading every cell into a DataFrame.
+    Only the 'Gives der aktindsigt?' column is compared and reading stops as soon as
+    the result is known to be 'Delvis aktindsigt'.
     """
-    # Authenticate to SharePoint
-    ctx = ClientContext(sharepoint_site_url).with_credentials(UserCredential(username, password))
+    # pylint: disable-next = import-outside-toplevel
+    import openpyxl
+
+    column_name = 'Gives der aktindsigt?'
+    try:
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            sheet = workbook.worksheets[0]
+            sheet.reset_dimensions()
+            rows = sheet.iter_rows(values_only=True)
+
+            # Like pandas the first row is the header even if it's empty
+            header = next(rows, None)
+            if header is None:
+                raise ValueError("The sheet is empty.")
+
+            # Strip any leading or trailing whitespace from column names
+            matches = [index for index, name in enumerate(header) if isinstance(name, str) and name.strip() == column_name]
+            if not matches:
+                # Pandas fails to strip the column names if none of them are text. Empty and duplicate
+                # header cells are renamed to text by pandas, and so are the extra columns of rows
+                # that are wider than the header.
+                names = header[:_row_length(header)]
+                if all(name is not None and not isinstance(name, str) for name in names) and \
+                        len(set(names)) == len(names) and \
+                        all(_row_length(row) <= len(names) for row in rows):
+                    raise ValueError("None of the column names are text.")
+                orchestrator_connection.log_error("Column 'Gives der aktindsigt?' not found in the file.")
+                return "Column 'Gives der aktindsigt?' not found"
+            if len({header[index] for index in matches}) > 1:
+                # Pandas can't compare two different columns with the same stripped name
+                raise ValueError(f"Column '{column_name}' found more than once.")
+            column = matches[0]
+
+            all_ja = True
+            all_nej = True
+            blank_rows_pending = False
+            for row in rows:
+                value = row[column] if column < len(row) else None
+                value = None if value == "" else value
+
+                if value is None:
+                    if _row_length(row) == 0:
+                        # Empty rows only count as empty values if any rows with data follow
+                        blank_rows_pending = True
+                        continue
+                    return 'Delvis aktindsigt'
+
+                if blank_rows_pending or value not in ("Ja", "Nej"):
+                    return 'Delvis aktindsigt'
 
-    # Load and verify connection
-    web = ctx.web
-    ctx.load(web)
-    ctx.execute_query()
+                all_ja = all_ja and value == "Ja"
+                all_nej = all_nej and value == "Nej"
+                if not all_ja and not all_nej:
+                    return 'Delvis aktindsigt'
+        finally:
+            workbook.close()
 
-    orchestrator_connection.log_info(f"Authenticated successfully. Site Title: {web.properties['Title']}")
-    return ctx
-def download_file_from_sharepoint(client: ClientContext, sharepoint_file_url: str) -> str:
+        if all_ja:
+            return 'Fuld aktindsigt'
+        return 'Afvist'
+    except Exception as e:
+        orchestrator_connection.log_error(f"Error reading Excel file at {file_path}: {e}")
+        return "Error processing file"
+
+def _row_length(row: tuple) -> int:
+    """The length of a row from openpyxl without trailing empty cells, like pandas reads it."""
+    length = len(row)
+    while length and (row[length - 1] is None or row[length - 1] == ""):
+        length -= 1
+    return length
+
+def classify_excel_file(file_path: str | IO[bytes], orchestrator_connection: OrchestratorConnection) -> str:
     """
-    Downloads a file from SharePoint and returns the local file path.
+    Checks the 'Gives der aktindsigt?' column in the specified Excel file using the classifier chosen in config.
     """
-    file_name = sharepoint_file_url.split("/")[-1]
-    download_path = os.path.join(os.getcwd(), file_name)
-
-    # Download the file
-    with open(download_path, "wb") as local_file:
-        file = client.web.get_file_by_server_relative_path(sharepoint_file_url).download(local_file).execute_query()
-    
-    print(f"[Ok] file has been downloaded into: {download_path}")
-    return download_path
+    if config.STREAMING_EXCEL_CLASSIFIER:
+        return check_excel_file_streaming(file_path, orchestrator_connection)
+    return check_excel_file(file_path, orchestrator_connection)
 
 # Example usage:
+if __name__ == "__main__":
+    # Get credentials from Orchestrator
+    orchestrator_connection = OrchestratorConnection("Test_Laura", os.getenv('OpenOrchestratorSQL'), os.getenv('OpenOrchestratorKey'), None)
+    RobotCredentials = orchestrator_connection.get_credential("RobotCredentials")
+    username = RobotCredentials.username
+    password = RobotCredentials.password
 
-# Get credentials from Orchestrator
-orchestrator_connection = OrchestratorConnection("Test_Laura", os.getenv('OpenOrchestratorSQL'), os.getenv('OpenOrchestratorKey'), None)
-RobotCredentials = orchestrator_connection.get_credential("RobotCredentials")
-username = RobotCredentials.username
-password = RobotCredentials.password
-
-# SharePoint site and parent folder URL
-SHAREPOINT_SITE_URL = "https://aarhuskommune.sharepoint.com/Teams/tea-teamsite10506"
-PARENT_FOLDER_URL = "/Teams/tea-teamsite10506/Delte Dokumenter/Aktindsigter/2070 - Test"
+    # SharePoint site and parent folder URL
+    SHAREPOINT_SITE_URL = "https://aarhuskommune.sharepoint.com/Teams/tea-teamsite10506"
+    PARENT_FOLDER_URL = "/Teams/tea-teamsite10506/Delte Dokumenter/Aktindsigter/2070 - Test"
 
-# Create the SharePoint client
-client = sharepoint_client(username, password, SHAREPOINT_SITE_URL, orchestrator_connection = orchestrator_connection)
+    # Create the SharePoint client
+    client = sharepoint_client(username, password, SHAREPOINT_SITE_URL, orchestrator_connection = orchestrator_connection)
 
-# Run tjek_for_aktindsigt to check each Excel file in subfolders
+    # Run tjek_for_aktindsigt to check each Excel file in subfolders
 
-results = tjek_for_aktindsigt(client, PARENT_FOLDER_URL, orchestrator_connection)
-print("Results:", results)
\ No newline at end of file
+    results = tjek_for_aktindsigt(client, PARENT_FOLDER_URL, orchestrator_connection)
+    print("Results:", results)
@@ -0,0 +1,109 @@
+"""This module contains a persistent cache of Excel file classifications keyed by the SharePoint file version."""
+
+import sqlite3
+import threading
+import time
+
+
+class ClassificationCache:
+    """A cache of classification results stored in an SQLite database.
+    Entries are keyed by the UniqueId of the file in SharePoint and are only used
+    while the ETag (or TimeLastModified) of the file is unchanged.
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, path: str, max_age_days: float, max_entries: int):
+        """Open or create the cache database.
+
+        Args:
+            path: The path of the SQLite database file.
+            max_age_days: Entries not used for this many days are evicted when the cache is closed.
+            max_entries: The maximum number of entries kept. The least recently used entries are evicted first.
+        """
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """CREATE TABLE IF NOT EXISTS classifications (
+                unique_id TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )"""
+        )
+
+    def get(self, file_properties: dict) -> str | None:
+        """Get the cached classification of a file if the file is unchanged since it was classified.
+
+        Args:
+            file_properties: The properties of the file as loaded from SharePoint.
+
+        Returns:
+            The cached result or None if the file isn't in the cache or has changed.
+        """
+        unique_id, version = _cache_key(file_properties)
+        with self._lock:
+            row = None
+            if unique_id and version:
+                row = self._connection.execute(
+                    "SELECT result FROM classifications WHERE unique_id = ? AND version = ?",
+                    (unique_id, version)
+                ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._connection.execute(
+                "UPDATE classifications SET last_used = ? WHERE unique_id = ?",
+                (time.time(), unique_id)
+            )
+            return row[0]
+
+    def put(self, file_properties: dict, result: str) -> None:
+        """Store the classification of a file.
+
+        Args:
+            file_properties: The properties of the file as loaded from SharePoint.
+            result: The classification result of the file.
+        """
+        unique_id, version = _cache_key(file_properties)
+        if not unique_id or not version:
+            return
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO classifications (unique_id, version, result, last_used) VALUES (?, ?, ?, ?)",
+                (unique_id, version, result, time.time())
+            )
+
+    def close(self) -> None:
+        """Evict old entries, save all changes and close the database."""
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM classifications WHERE last_used < ?",
+                (time.time() - self.max_age_days * 24 * 60 * 60,)
+            )
+            self._connection.execute(
+                """DELETE FROM classifications WHERE unique_id NOT IN (
+                    SELECT unique_id FROM classifications ORDER BY last_used DESC LIMIT ?
+                )""",
+                (self.max_entries,)
+            )
+            self._connection.commit()
+            self._connection.close()
+
+    def summary(self) -> str:
+        """A short description of the cache hits and misses."""
+        return f"Classification cache: {self.hits} hits, {self.misses} misses."
+
+
+def _cache_key(file_properties: dict) -> tuple[str | None, str | None]:
+    """Get the unique id and version of a file from its SharePoint properties."""
+    unique_id = file_properties.get("UniqueId")
+    version = file_properties.get("ETag") or file_properties.get("TimeLastModified")
+    return unique_id, version
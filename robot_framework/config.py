@@ -6,13 +6,150 @@ MAX_RETRY_COUNT = 3
 # Whether the robot should be marked as failed if MAX_RETRY_COUNT is reached.
 FAIL_ROBOT_ON_TOO_MANY_ERRORS = True
 
+# Retry policy config
+# Rules for retrying errors, matched in order against the qualified class names of an error and its base classes.
+# "status_codes" limits a rule to HTTP errors with those status codes.
+# A failing step (download, upload, query) is retried "step_retries" times before the error escalates to a full reset.
+# Waits are random up to "base_delay" seconds, doubling for each retry up to "max_delay" seconds.
+# The framework also waits according to the rule before retrying after a matching error.
+# Throttling (429 and 503) isn't listed, since every SharePoint request already goes through the governor
+# in throttling, which retries throttled requests THROTTLE_MAX_RETRIES times.
+RETRY_RULES = [
+    {"exception": "requests.exceptions.RequestException", "status_codes": (408, 500, 502, 504),
+     "step_retries": 3, "base_delay": 2, "max_delay": 60},
+    {"exception": "requests.exceptions.ConnectionError", "step_retries": 3, "base_delay": 2, "max_delay": 30},
+    {"exception": "requests.exceptions.Timeout", "step_retries": 2, "base_delay": 5, "max_delay": 30},
+    {"exception": "builtins.TimeoutError", "step_retries": 2, "base_delay": 5, "max_delay": 30},
+]
+
 # Error screenshot config
 SMTP_SERVER = "smtp.adm.aarhuskommune.dk"
 SMTP_PORT = 25
 SCREENSHOT_SENDER = "robot@friend.dk"
+# Errors are collected for this many seconds and sent as one digest email.
+# Repeated errors with the same signature within the window are only counted.
+ERROR_DIGEST_WINDOW = 60
+# Screenshots wider than this many pixels are downscaled before they are sent.
+SCREENSHOT_MAX_WIDTH = 1920
+# The image format of screenshots: "PNG", "JPEG" or "WEBP".
+SCREENSHOT_FORMAT = "JPEG"
+# The quality (1-95) used for JPEG and WEBP screenshots.
+SCREENSHOT_QUALITY = 70
+# Screenshots are compressed further until they are at most this many bytes. Larger screenshots are left out.
+SCREENSHOT_MAX_BYTES = 1024 * 1024
+
+# Reset config
+# Whether a reset is skipped when all registered applications pass their health checks.
+SKIP_HEALTHY_RESET = True
+# The number of seconds to wait for opened applications to pass their health checks.
+APP_READY_TIMEOUT = 60
+# The number of seconds between health checks while waiting for applications to open.
+APP_HEALTH_POLL_INTERVAL = 0.5
+
+# Refresh engine config
+# The engine refreshing workbooks: "com" uses Excel. "headless" recalculates formulas with pycel without Excel,
+# e.g. to benchmark on Linux. It needs the "headless" extra and refuses workbooks with data connections.
+REFRESH_ENGINE = "com"
+# The number of workbooks refreshed by one Excel instance before it is restarted.
+REFRESH_RECYCLE_AFTER = 25
+# The number of seconds Excel has to answer a health check or close before it is considered hung and killed.
+EXCEL_RESPONSE_TIMEOUT = 30
+
+# Tracing config
+# The JSON file the timing spans of a run are written to. Set to None to only log the summary.
+TRACE_FILE_PATH = "trace.json"
+
+# Logging config
+# Whether log lines are buffered and written to OpenOrchestrator in batches by a background thread.
+LOG_BUFFERING = True
+# Buffered log lines are written when this many are buffered,
+LOG_BATCH_SIZE = 50
+# when the oldest has been buffered for this many seconds, or when an error is logged.
+LOG_FLUSH_INTERVAL = 5
+# The fraction of log lines kept per level, e.g. {"trace": 0.1} keeps about every tenth trace line.
+# 0 suppresses the level. Errors are always kept, and only buffered log lines are sampled.
+LOG_SAMPLE_RATES = {"trace": 1.0, "info": 1.0}
 
 # Constant/Credential names
 ERROR_EMAIL = "Error Email"
+ROBOT_CREDENTIALS = "RobotCredentials"
+ROBOT_365_USER = "Robot365User"
+
+# OpenOrchestrator cache config
+# The number of seconds constants and credentials read from OpenOrchestrator are cached. 0 disables the cache.
+# Credentials rejected by SharePoint are read again regardless.
+ORCHESTRATOR_CACHE_TTL = 900
+# Constants and credentials read into the cache during initialize.
+WARM_UP_CONSTANTS = [ERROR_EMAIL]
+WARM_UP_CREDENTIALS = [ROBOT_365_USER]
+
+# SharePoint config
+# The maximum number of requests combined in a single $batch request to SharePoint.
+SHAREPOINT_BATCH_SIZE = 100
+# Downloaded files larger than this many bytes are kept in a temporary file instead of in memory.
+DOWNLOAD_SPOOL_MAX_SIZE = 50 * 1024 * 1024
+# Authenticated SharePoint clients are reused for this many seconds before authenticating again.
+SHAREPOINT_CLIENT_MAX_AGE = 45 * 60
+# Whether to verify new SharePoint clients by loading the site title. This costs an extra round trip.
+SHAREPOINT_VERIFY_CONNECTION = False
+# Files larger than this many bytes are uploaded in chunks in an upload session instead of a single request.
+CHUNKED_UPLOAD_THRESHOLD = 16 * 1024 * 1024
+# The size in bytes of each chunk in a chunked upload.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# The number of times a failed chunk is sent again before the upload fails.
+UPLOAD_CHUNK_RETRIES = 3
+# How files are downloaded, uploaded, copied and moved: "async" sends the requests with aiohttp
+# over a pool of keep-alive connections, "office365" uses ClientContext, and "auto" uses "async" when aiohttp is installed.
+SHAREPOINT_IO_BACKEND = "auto"
+# The maximum number of keep-alive connections per site in the asyncio backend.
+SHAREPOINT_ASYNC_CONNECTIONS = 32
+# The number of seconds a single request in the asyncio backend may take, including the transfer.
+SHAREPOINT_ASYNC_TIMEOUT = 600
+
+# SharePoint throttling config
+# The number of SharePoint requests allowed in flight at the start of a run.
+# The limit is increased while requests succeed and halved when SharePoint throttles.
+SHAREPOINT_INITIAL_CONCURRENCY = 4
+# The lowest and highest number of SharePoint requests allowed in flight.
+SHAREPOINT_MIN_CONCURRENCY = 1
+SHAREPOINT_MAX_CONCURRENCY = 16
+# The number of times a throttled request is sent again before the error is raised.
+THROTTLE_MAX_RETRIES = 5
+# The longest time in seconds to wait after a throttled request, whatever Retry-After says.
+THROTTLE_MAX_WAIT = 120
+
+# Aktindsigt pipeline config
+# The number of threads downloading Excel files in the pipelined traversal.
+AKTINDSIGT_DOWNLOAD_WORKERS = 4
+# The number of threads classifying downloaded Excel files in the pipelined traversal.
+AKTINDSIGT_CLASSIFY_WORKERS = 1
+# The maximum number of items waiting between two stages of the pipeline.
+AKTINDSIGT_PIPELINE_QUEUE_SIZE = 8
+# The regular expression matched against the start of folder names to find case folders.
+AKTINDSIGT_CASE_FOLDER_PATTERN = r"^[A-Z]{3}-\d{4}-\d{6}"
+# Whether subfolders of case folders (attachments, drafts etc.) are searched for more case folders.
+AKTINDSIGT_DESCEND_INTO_CASE_FOLDERS = False
+# The deepest folder level searched below the parent folder. None searches every level.
+AKTINDSIGT_MAX_DEPTH = None
+# Globs of the folder names searched, e.g. ["GEO-*"]. Empty searches all folders.
+AKTINDSIGT_INCLUDE_FOLDERS = []
+# Globs of the folder names never searched, e.g. ["Bilag*"].
+AKTINDSIGT_EXCLUDE_FOLDERS = []
+# How case folders are found: "crawl" lists every folder level by level,
+# "query" finds the folders and Excel files with paged RenderListDataAsStream queries.
+AKTINDSIGT_DISCOVERY = "crawl"
+# The number of items per page in query discovery. SharePoint returns at most 5000.
+AKTINDSIGT_QUERY_PAGE_SIZE = 5000
+# Whether aktlister are classified by streaming the workbook with openpyxl instead of loading it with pandas.
+STREAMING_EXCEL_CLASSIFIER = True
+
+# Classification cache config
+# The SQLite file caching Excel file classifications between runs. Set to None to disable the cache.
+CLASSIFICATION_CACHE_PATH = "classification_cache.sqlite3"
+# Entries not used for this many days are evicted.
+CLASSIFICATION_CACHE_MAX_AGE_DAYS = 30
+# The maximum number of entries in the cache. The least recently used entries are evicted first.
+CLASSIFICATION_CACHE_MAX_ENTRIES = 100_000
 
 
 # Queue specific configs
@@ -24,4 +161,12 @@ QUEUE_NAME = None
 # The limit on how many queue elements to process
 MAX_TASK_COUNT = 100
 
+# The number of queue elements claimed and prefetched in the background while another element is processed.
+# 0 disables the lookahead.
+PREFETCH_DEPTH = 0
+
+# The number of worker processes processing the queue. 1 processes the queue in the robot process itself.
+# With more workers MAX_TASK_COUNT and MAX_RETRY_COUNT apply to all workers together, and PREFETCH_DEPTH isn't used.
+QUEUE_WORKERS = 1
+
 # ----------------------
@@ -0,0 +1,88 @@
+"""This module contains the policy deciding which SharePoint folders are visited when looking for aktlister.
+
+A CrawlPolicy is a plain description of the rules, e.g. built from config with CrawlPolicy.from_config.
+It is compiled once per run into a CompiledCrawlPolicy, which matches folder names without
+compiling any patterns again. Folders below the root are pruned, i.e. neither listed nor
+descended into, when they are deeper than max_depth, match an exclude glob, don't match any
+include glob, or are inside a case folder when descend_into_case_folders is False.
+"""
+
+import fnmatch
+import re
+from dataclasses import dataclass
+
+from robot_framework import config
+
+
+@dataclass(frozen=True)
+class CrawlPolicy:
+    """The rules for crawling a folder tree for case folders.
+
+    Args:
+        case_folder_pattern: A regular expression matched against the start of folder names to find case folders.
+        descend_into_case_folders: Whether to visit the subfolders of case folders, e.g. attachments and drafts.
+        max_depth: The deepest level visited. The root has depth 0. None visits every level.
+        include: Globs of the folder names to visit, e.g. 'GEO-*'. Empty visits all folders.
+            The globs apply to every folder below the root, including the folders leading to the case folders.
+        exclude: Globs of the folder names never visited, e.g. 'Bilag*'. Globs are case insensitive like SharePoint.
+    """
+    case_folder_pattern: str = r"^[A-Z]{3}-\d{4}-\d{6}"
+    descend_into_case_folders: bool = False
+    max_depth: int | None = None
+    include: tuple[str, ...] = ()
+    exclude: tuple[str, ...] = ()
+
+    @classmethod
+    def from_config(cls) -> "CrawlPolicy":
+        """Create the policy described by the AKTINDSIGT_* settings in config."""
+        return cls(
+            case_folder_pattern=config.AKTINDSIGT_CASE_FOLDER_PATTERN,
+            descend_into_case_folders=config.AKTINDSIGT_DESCEND_INTO_CASE_FOLDERS,
+            max_depth=config.AKTINDSIGT_MAX_DEPTH,
+            include=tuple(config.AKTINDSIGT_INCLUDE_FOLDERS),
+            exclude=tuple(config.AKTINDSIGT_EXCLUDE_FOLDERS)
+        )
+
+    def compile(self) -> "CompiledCrawlPolicy":
+        """Compile the patterns of the policy for matching."""
+        return CompiledCrawlPolicy(self)
+
+
+class CompiledCrawlPolicy:
+    """A CrawlPolicy with its patterns compiled. Create it with CrawlPolicy.compile."""
+
+    def __init__(self, policy: CrawlPolicy):
+        self.policy = policy
+        self._case_folder = re.compile(policy.case_folder_pattern)
+        self._include = _compile_globs(policy.include)
+        self._exclude = _compile_globs(policy.exclude)
+
+    def is_case_folder(self, name: str) -> bool:
+        """Check if a folder name matches the case folder pattern."""
+        return self._case_folder.match(name) is not None
+
+    def should_visit(self, name: str, depth: int, parent_is_case_folder: bool) -> bool:
+        """Check if a folder below the root should be visited.
+
+        Args:
+            name: The name of the folder.
+            depth: The depth of the folder. Children of the root have depth 1.
+            parent_is_case_folder: Whether the parent of the folder is a case folder.
+
+        Returns:
+            Whether the folder should be listed and searched, as opposed to pruned.
+        """
+        if parent_is_case_folder and not self.policy.descend_into_case_folders:
+            return False
+        if self.policy.max_depth is not None and depth > self.policy.max_depth:
+            return False
+        if self._exclude and self._exclude.match(name):
+            return False
+        return not self._include or self._include.match(name) is not None
+
+
+def _compile_globs(globs: tuple[str, ...]) -> re.Pattern | None:
+    """Compile globs into a single case insensitive regular expression, or None if there are no globs."""
+    if not globs:
+        return None
+    return re.compile("|".join(fnmatch.translate(glob) for glob in globs), re.IGNORECASE)
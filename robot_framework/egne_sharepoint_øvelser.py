@@ -2,8 +2,11 @@ import pandas as pd
 import os
 from openpyxl import Workbook
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from office365.runtime.auth.user_credential import UserCredential
 from office365.sharepoint.client_context import ClientContext
+
+from robot_framework import sharepoint
+from robot_framework import throttling
+from robot_framework.sharepoint import sharepoint_client
 def create_excel_on_sharepoint(client: ClientContext, sharepoint_folder_url: str, file_name: str, sheet_data = None) -> str:
     """
     Creates a new Excel file with optional data and uploads it to a specified SharePoint folder.
@@ -33,60 +36,18 @@ def create_excel_on_sharepoint(client: ClientContext, sharepoint_folder_url: str
     #An excel file has now been created - either empty or optionally containing data. 
 
     try:
-        upload_file_to_sharepoint(client = client, local_file_path = local_file_path, sharepoint_folder_url= sharepoint_folder_url, new_file_name= None )
-    
+        upload = sharepoint.upload_file_to_sharepoint(client, f"{sharepoint_folder_url}/{file_name}", local_file_path)
+        print(f"[Ok] file has been uploaded to: {upload.url}")
+        return upload.url
+
     finally:
         if os.path.exists(local_file_path):
             os.remove(local_file_path)
-def sharepoint_client(username: str, password: str, sharepoint_site_url: str, orchestrator_connection: OrchestratorConnection) -> ClientContext:
-    """
-    Creates and returns a SharePoint client context.
-    """
-    # Authenticate to SharePoint
-    ctx = ClientContext(sharepoint_site_url).with_credentials(UserCredential(username, password))
-
-    # Load and verify connection
-    web = ctx.web
-    ctx.load(web)
-    ctx.execute_query()
-
-    orchestrator_connection.log_info(f"Authenticated successfully. Site Title: {web.properties['Title']}")
-    return ctx
-def download_file_from_sharepoint(client: ClientContext, sharepoint_file_url: str) -> str:
-    """
-    Downloads a file from SharePoint and returns the local file path.
-    """
-    file_name = sharepoint_file_url.split("/")[-1]
-    download_path = os.path.join(os.getcwd(), file_name)
-
-    # Download the file
-    with open(download_path, "wb") as local_file:
-        file = client.web.get_file_by_server_relative_path(sharepoint_file_url).download(local_file).execute_query()
-    
-    print(f"[Ok] file has been downloaded into: {download_path}")
-    return download_path
-def upload_file_to_sharepoint(client: ClientContext, local_file_path: str, sharepoint_folder_url: str, new_file_name: str) -> str:
-    """
-    Uploads file to sharepoint and returns URL of uploaded file
-    """
-
-    original_file_name = os.path.basename(local_file_path)
-    file_name = new_file_name if new_file_name else original_file_name
-    target_url = f"{sharepoint_folder_url}/{file_name}"
-
-    # The upload
-    with open(local_file_path, "rb") as local_file:
-        target_folder = client.web.get_folder_by_server_relative_url(sharepoint_folder_url)
-        target_folder.upload_file(file_name, local_file.read()).execute_query()
-
-    print(f"[Ok] file has been uploaded to: {target_url}")
-    return target_url
 def move_file_in_sharepoint(client: ClientContext, from_url: str, to_url: str) -> str:
     file_name = from_url.split('/')[-1]
     target_file_url = f"{to_url}/{file_name}"
 
-    file = client.web.get_file_by_server_relative_url(from_url)
-    file.moveto(to_url, 1).execute_query()
+    sharepoint.move_file(client, from_url, target_file_url)
 
     print(f"Filen er flyttelyttet til {to_url}")
 
@@ -117,7 +78,7 @@ def copy_file_in_sharepoint(client: ClientContext, from_url: str, to_folder_url:
 
     # Check if a file with the same name already exists in the destination folder
     try:
-        client.web.get_file_by_server_relative_url(target_file_url).get().execute_query()
+        throttling.call(lambda: client.web.get_file_by_server_relative_url(target_file_url).get().execute_query())
         raise FileExistsError(f"A file named '{new_file_name}' already exists in the folder '{to_folder_url}'.")
     except Exception as e:
         # If the exception is not a 404 (file not found), re-raise the exception
@@ -125,8 +86,7 @@ def copy_file_in_sharepoint(client: ClientContext, from_url: str, to_folder_url:
             raise
 
     # Perform the copy operation
-    file = client.web.get_file_by_server_relative_url(from_url)
-    file.copyto(target_file_url).execute_query()
+    sharepoint.copy_file(client, from_url, target_file_url, overwrite=False)
 
     print(f"Filen er kopireliret {target_file_url}")
     return target_file_url
@@ -0,0 +1,187 @@
+"""This module sends error screenshots by email from a background thread.
+Errors with the same signature within config.ERROR_DIGEST_WINDOW seconds are
+collected into a single digest email with a count instead of one email each.
+"""
+
+import atexit
+import smtplib
+import threading
+import time
+import traceback
+from email.message import EmailMessage
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+from robot_framework import error_screenshot
+from robot_framework import orchestrator_cache
+
+
+# pylint: disable-next = too-many-instance-attributes
+class ErrorReporter:
+    """Collects errors and sends them as digest emails from a worker thread
+    over a single SMTP connection that is kept open between emails.
+    """
+
+    def __init__(self, orchestrator_connection: OrchestratorConnection):
+        """Create the reporter and start its worker thread.
+
+        Args:
+            orchestrator_connection: The connection to OpenOrchestrator.
+        """
+        self.orchestrator_connection = orchestrator_connection
+        self.emails_sent = 0
+        self.errors_reported = 0
+        self._pending: dict[tuple, error_screenshot.ErrorSection] = {}
+        self._window_start: float | None = None
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._smtp: smtplib.SMTP | None = None
+        self._thread = threading.Thread(target=self._run, name="ErrorReporter", daemon=True)
+        self._thread.start()
+
+    def report(self, error: Exception) -> None:
+        """Queue an error to be sent by email.
+        A screenshot is only taken for the first error of each signature in a digest.
+
+        Args:
+            error: The exception to report.
+        """
+        signature = error_signature(error)
+        with self._condition:
+            self.errors_reported += 1
+            if signature in self._pending:
+                self._pending[signature].count += 1
+                return
+
+        # Take the screenshot outside the lock. Encoding and sending happens in the worker thread.
+        screenshot, capture_seconds = error_screenshot.capture_screenshot()
+        section = error_screenshot.ErrorSection(
+            type(error).__name__, str(error), "".join(traceback.format_exception(error)), screenshot,
+            capture_seconds=capture_seconds
+        )
+
+        with self._condition:
+            if signature in self._pending:
+                self._pending[signature].count += 1
+                return
+            self._pending[signature] = section
+            if self._window_start is None:
+                self._window_start = time.monotonic()
+            self._condition.notify()
+
+    def shutdown(self) -> None:
+        """Send all pending errors, close the SMTP connection and stop the worker thread."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Wait for a digest window to end and send its errors, until shutdown."""
+        while True:
+            with self._condition:
+                while not self._stopping and not self._window_elapsed():
+                    timeout = None if self._window_start is None else self._window_start + config.ERROR_DIGEST_WINDOW - time.monotonic()
+                    self._condition.wait(timeout)
+                errors = list(self._pending.values())
+                self._pending.clear()
+                self._window_start = None
+                stopping = self._stopping
+
+            if errors:
+                self._send(errors)
+
+            if stopping:
+                self._close_smtp()
+                return
+
+    def _window_elapsed(self) -> bool:
+        return self._window_start is not None and time.monotonic() - self._window_start >= config.ERROR_DIGEST_WINDOW
+
+    def _send(self, errors: list[error_screenshot.ErrorSection]) -> None:
+        """Build and send a digest email. Failures are logged instead of raised,
+        since there is no caller to raise them to.
+        """
+        try:
+            error_email = orchestrator_cache.get_constant(self.orchestrator_connection, config.ERROR_EMAIL).value
+            msg = error_screenshot.create_error_email(error_email, self.orchestrator_connection.process_name, errors)
+            for error in errors:
+                if error.screenshot:
+                    self.orchestrator_connection.log_trace(error.timing())
+            self._send_message(msg)
+            self.emails_sent += 1
+        # The worker thread must survive a failed email.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            self.orchestrator_connection.log_error(f"Failed to send error email: {repr(error)}")
+
+    def _send_message(self, msg: EmailMessage) -> None:
+        """Send a message over the open SMTP connection, reconnecting once if the server has closed it."""
+        for attempt in range(2):
+            try:
+                if self._smtp is None:
+                    self._smtp = smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT)
+                    self._smtp.starttls()
+                self._smtp.send_message(msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                self._smtp = None
+                if attempt:
+                    raise
+
+    def _close_smtp(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+
+def error_signature(error: Exception) -> tuple:
+    """Get a signature identifying repeated occurrences of the same error:
+    the exception type, its message and the line where it was raised.
+    """
+    frames = traceback.extract_tb(error.__traceback__)
+    location = (frames[-1].filename, frames[-1].lineno) if frames else None
+    return (type(error).__name__, str(error), location)
+
+
+# pylint: disable-next = invalid-name
+_reporter: ErrorReporter | None = None
+_reporter_lock = threading.Lock()
+
+
+def report_error(error: Exception, orchestrator_connection: OrchestratorConnection) -> None:
+    """Queue an error to be sent by email in the background.
+    The reporter is started on the first error.
+
+    Args:
+        error: The exception to report.
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    global _reporter  # pylint: disable=global-statement
+    with _reporter_lock:
+        if _reporter is None:
+            _reporter = ErrorReporter(orchestrator_connection)
+        reporter = _reporter
+    reporter.report(error)
+
+
+def shutdown() -> None:
+    """Send all pending error emails and stop the reporter.
+    Should be called before the robot exits.
+    """
+    global _reporter  # pylint: disable=global-statement
+    with _reporter_lock:
+        reporter, _reporter = _reporter, None
+    if reporter is not None:
+        reporter.shutdown()
+        reporter.orchestrator_connection.log_info(
+            f"Error reporter sent {reporter.emails_sent} emails for {reporter.errors_reported} errors."
+        )
+
+
+# Make sure pending errors are sent even if the robot exits without calling shutdown.
+atexit.register(shutdown)
@@ -1,45 +1,167 @@
-"""This module has functionality to send error screenshots via smtp."""
+"""This module has functionality to send error screenshots via smtp.
+PIL is only imported when a screenshot is taken, so it isn't loaded unless an error happens.
+"""
+
+from __future__ import annotations
 
 import smtplib
 from email.message import EmailMessage
-import base64
+from email.utils import make_msgid
+import time
 import traceback
+from dataclasses import dataclass
 from io import BytesIO
-
-from PIL import ImageGrab
+from typing import TYPE_CHECKING
 
 from robot_framework import config
 
+if TYPE_CHECKING:
+    from PIL import Image
 
-def send_error_screenshot(to_address: str | list[str], exception: Exception, process_name: str):
-    """Sends an email with an error report, including a screenshot, when an exception occurs.
-    Configuration details such as SMTP server, port, sender email, etc., should be set in 'config' module.
+
+@dataclass
+# pylint: disable-next = too-many-instance-attributes
+class ErrorSection:
+    """A single error to include in an error email.
+
+    Args:
+        error_type: The name of the exception type.
+        error_message: The exception message.
+        trace: The formatted traceback of the exception.
+        screenshot: A screenshot taken when the error happened, if any.
+        count: The number of times the error happened.
+        capture_seconds: The time spent taking the screenshot.
+        encode_seconds: The time spent encoding the screenshot. Set by create_error_email.
+        encoded_bytes: The size of the encoded screenshot. Set by create_error_email.
+    """
+    error_type: str
+    error_message: str
+    trace: str
+    screenshot: Image.Image | None
+    count: int = 1
+    capture_seconds: float = 0
+    encode_seconds: float = 0
+    encoded_bytes: int = 0
+
+    def timing(self) -> str:
+        """A short description of the time spent on the screenshot, used to tune the screenshot config."""
+        return (f"Screenshot of {self.error_type}: captured in {self.capture_seconds:.2f} s, "
+                f"encoded as {self.encoded_bytes} bytes {config.SCREENSHOT_FORMAT} in {self.encode_seconds:.2f} s.")
+
+
+# Screenshots are never compressed below this quality or width to fit SCREENSHOT_MAX_BYTES.
+_MIN_QUALITY = 30
+_MIN_WIDTH = 320
+
+
+def capture_screenshot() -> tuple[Image.Image, float]:
+    """Take a screenshot of all screens.
+
+    Returns:
+        The screenshot and the time in seconds it took to capture it.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from PIL import ImageGrab
+
+    start = time.perf_counter()
+    screenshot = ImageGrab.grab()
+    return screenshot, time.perf_counter() - start
+
+
+def encode_screenshot(screenshot: Image.Image) -> tuple[bytes, str] | None:
+    """Encode a screenshot according to the screenshot config.
+    The screenshot is downscaled to SCREENSHOT_MAX_WIDTH. If it is still larger than
+    SCREENSHOT_MAX_BYTES the quality and then the resolution is lowered until it fits.
+
+    Args:
+        screenshot: The screenshot to encode.
+
+    Returns:
+        The encoded image and its MIME subtype, or None if it couldn't fit in SCREENSHOT_MAX_BYTES.
+    """
+    image_format = config.SCREENSHOT_FORMAT.upper()
+    if image_format == "JPEG" and screenshot.mode != "RGB":
+        screenshot = screenshot.convert("RGB")
+    if screenshot.width > config.SCREENSHOT_MAX_WIDTH:
+        screenshot = _downscale(screenshot, config.SCREENSHOT_MAX_WIDTH)
+
+    quality = config.SCREENSHOT_QUALITY
+    while True:
+        buffer = BytesIO()
+        if image_format == "PNG":
+            screenshot.save(buffer, format=image_format, optimize=True)
+        else:
+            screenshot.save(buffer, format=image_format, quality=quality)
+
+        if buffer.tell() <= config.SCREENSHOT_MAX_BYTES:
+            return buffer.getvalue(), image_format.lower()
+
+        # Lower the quality first and then the resolution
+        if image_format != "PNG" and quality > _MIN_QUALITY:
+            quality = max(_MIN_QUALITY, quality - 20)
+        elif screenshot.width // 2 >= _MIN_WIDTH:
+            screenshot = _downscale(screenshot, screenshot.width // 2)
+        else:
+            return None
+
+
+def _downscale(screenshot: Image.Image, width: int) -> Image.Image:
+    # pylint: disable-next = import-outside-toplevel
+    from PIL.Image import Resampling
+
+    height = max(1, round(screenshot.height * width / screenshot.width))
+    return screenshot.resize((width, height), Resampling.BILINEAR, reducing_gap=2.0)
+
+
+def create_error_email(to_address: str | list[str], process_name: str, errors: list[ErrorSection]) -> EmailMessage:
+    """Create an email reporting one or more errors, each with its screenshot.
+    The screenshots are attached as related images referenced from the HTML body.
 
     Args:
         to_address: Email address or list of addresses to send the error report.
-        exception: The exception that triggered the error.
+        errors: The errors to report.
         process_name: Name of the process from OpenOrchestrator.
+
+    Returns:
+        The email message.
     """
-    # Create message
     msg = EmailMessage()
     msg['to'] = to_address
     msg['from'] = config.SCREENSHOT_SENDER
-    msg['subject'] = f"Error screenshot: {process_name}"
+    if len(errors) == 1 and errors[0].count == 1:
+        msg['subject'] = f"Error screenshot: {process_name}"
+    else:
+        msg['subject'] = f"Error digest: {process_name} ({sum(error.count for error in errors)} errors)"
 
-    # Take screenshot and convert to base64
-    screenshot = ImageGrab.grab()
-    buffer = BytesIO()
-    screenshot.save(buffer, format='PNG')
-    screenshot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    # Encode the screenshots
+    images = []
+    sections = []
+    for error in errors:
+        image = ""
+        if error.screenshot:
+            start = time.perf_counter()
+            encoded = encode_screenshot(error.screenshot)
+            error.encode_seconds = time.perf_counter() - start
+            if encoded:
+                error.encoded_bytes = len(encoded[0])
+                cid = make_msgid()
+                images.append((encoded, cid))
+                image = f'<img src="cid:{cid[1:-1]}" alt="Screenshot">'
+            else:
+                image = "<p>The screenshot was too large to send.</p>"
+
+        # Create an HTML section with the exception and screenshot
+        count = f"<p>Occurrences: {error.count}</p>" if error.count > 1 else ""
+        sections.append(f"""
+            <p>Error type: {error.error_type}</p>
+            <p>Error message: {error.error_message}</p>
+            {count}
+            <p>{error.trace}</p>
+            {image}""")
 
-    # Create an HTML message with the exception and screenshot
     html_message = f"""
     <html>
-        <body>
-            <p>Error type: {type(exception).__name__}</p>
-            <p>Error message: {exception}</p>
-            <p>{traceback.format_exc()}</p>
-            <img src="data:image/png;base64,{screenshot_base64}" alt="Screenshot">
+        <body>{"<hr>".join(sections)}
         </body>
     </html>
     """
@@ -47,6 +169,28 @@ def send_error_screenshot(to_address: str | list[str], exception: Exception, pro
     msg.set_content("Please enable HTML to view this message.")
     msg.add_alternative(html_message, subtype='html')
 
+    # Attach the screenshots to the HTML part
+    html_part = msg.get_payload()[1]
+    for (data, subtype), cid in images:
+        html_part.add_related(data, maintype='image', subtype=subtype, cid=cid)
+
+    return msg
+
+
+def send_error_screenshot(to_address: str | list[str], exception: Exception, process_name: str):
+    """Sends an email with an error report, including a screenshot, when an exception occurs.
+    Configuration details such as SMTP server, port, sender email, etc., should be set in 'config' module.
+    Use error_reporter to send the report in the background instead.
+
+    Args:
+        to_address: Email address or list of addresses to send the error report.
+        exception: The exception that triggered the error.
+        process_name: Name of the process from OpenOrchestrator.
+    """
+    screenshot, capture_seconds = capture_screenshot()
+    error = ErrorSection(type(exception).__name__, str(exception), traceback.format_exc(), screenshot, capture_seconds=capture_seconds)
+    msg = create_error_email(to_address, process_name, [error])
+
     # Send message
     with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as smtp:
         smtp.starttls()
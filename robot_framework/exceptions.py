@@ -5,8 +5,8 @@ import traceback
 from OpenOrchestrator.database.queues import QueueElement, QueueStatus
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
-from robot_framework import config
-from robot_framework import error_screenshot
+from robot_framework import error_reporter
+from robot_framework import log_buffer
 
 
 class BusinessError(Exception):
@@ -17,7 +17,8 @@ def handle_error(message: str, error: Exception, queue_element: QueueElement | N
     """Handles an error caught during the process.
     Logs an error to OpenOrchestrator.
     Marks the queue element (if any) as failed.
-    Sends an error screenshot by email.
+    Queues an error screenshot to be sent by email in the background.
+    Buffered log lines are written before returning, so they aren't lost if the robot crashes.
 
     Args:
         message: A message to prepend to the error message.
@@ -26,16 +27,17 @@ def handle_error(message: str, error: Exception, queue_element: QueueElement | N
         orchestrator_connection: A connection to OpenOrchestrator.
     """
     error_msg = f"{message}: {repr(error)}\n\nTrace:\n{traceback.format_exc()}"
-    error_email = orchestrator_connection.get_constant(config.ERROR_EMAIL).value
 
     orchestrator_connection.log_error(error_msg)
     if queue_element:
         orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.FAILED, error_msg)
-    error_screenshot.send_error_screenshot(error_email, error, orchestrator_connection.process_name)
+    log_buffer.flush(orchestrator_connection)
+    error_reporter.report_error(error, orchestrator_connection)
 
 
 def log_exception(orchestrator_connection: OrchestratorConnection) -> callable:
     """Creates a function to be used as an exception hook that logs any uncaught exception in OpenOrchestrator.
+    The log is written synchronously together with any buffered log lines.
 
     Args:
         orchestrator_connection: The connection to OpenOrchestrator.
@@ -45,4 +47,5 @@ def log_exception(orchestrator_connection: OrchestratorConnection) -> callable:
     """
     def inner(exception_type, value, traceback_string):
         orchestrator_connection.log_error(f"Uncaught Exception:\nType: {exception_type}\nValue: {value}\nTrace: {traceback_string}")
+        log_buffer.flush(orchestrator_connection)
     return inner
@@ -0,0 +1,113 @@
+"""This module reports how long it takes to import the robot, so startup regressions are visible.
+The imports are timed in a new interpreter with 'python -X importtime', since modules
+already imported in the current interpreter would be free.
+
+Run from the root of the repository:
+    python -m robot_framework --import-profile
+"""
+
+import subprocess
+import sys
+from dataclasses import dataclass
+
+# The modules imported when the robot starts
+PROFILED_MODULES = (
+    "robot_framework.linear_framework",
+    "robot_framework.queue_framework",
+    "robot_framework.process_laura",
+)
+
+# Imports the modules one by one and keeps going if one of them fails
+_IMPORT_SCRIPT = """
+import importlib, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+    except Exception as error:
+        print(f"FAILED {name}: {error!r}", file=sys.stderr)
+"""
+
+
+@dataclass
+class ImportTime:
+    """The import time of a single module as reported by -X importtime.
+
+    Args:
+        module: The name of the module.
+        depth: How deeply the import is nested. Modules imported directly by the script have depth 0.
+        self_us: The time spent in the module itself in microseconds.
+        cumulative_us: The time spent in the module and everything it imported in microseconds.
+    """
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def profile_imports(modules: tuple[str, ...] = PROFILED_MODULES) -> tuple[list[ImportTime], list[str]]:
+    """Import modules in a new interpreter and time each import.
+
+    Args:
+        modules: The names of the modules to import.
+
+    Returns:
+        The import times in the order reported and the messages of any failed imports.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _IMPORT_SCRIPT, *modules],
+        capture_output=True, text=True, check=False
+    )
+
+    times = []
+    failures = []
+    for line in result.stderr.splitlines():
+        if line.startswith("FAILED "):
+            failures.append(line.removeprefix("FAILED "))
+            continue
+
+        parts = line.removeprefix("import time:").split("|")
+        if not line.startswith("import time:") or len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append(ImportTime(name.strip(), depth, int(parts[0]), int(parts[1])))
+    return times, failures
+
+
+def format_report(times: list[ImportTime], failures: list[str], top: int = 25) -> str:
+    """Format import times as a report of the slowest imports.
+
+    Args:
+        times: The import times from profile_imports.
+        failures: The failed imports from profile_imports.
+        top: The number of entries in each list.
+
+    Returns:
+        The report.
+    """
+    # Time per top level package, e.g. everything in pandas.* counts as pandas
+    packages: dict[str, int] = {}
+    for import_time in times:
+        package = import_time.module.split(".")[0]
+        packages[package] = packages.get(package, 0) + import_time.self_us
+
+    total_us = sum(import_time.cumulative_us for import_time in times if import_time.depth == 0)
+    lines = [f"Total import time: {total_us / 1000:.1f} ms for {len(times)} modules.", ""]
+
+    lines.append("Slowest packages in ms (all modules of the package):")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"{self_us / 1000:>10.1f}  {package}")
+
+    lines.append("")
+    lines.append("Slowest modules in ms (cumulative, self):")
+    for import_time in sorted(times, key=lambda t: -t.cumulative_us)[:top]:
+        lines.append(f"{import_time.cumulative_us / 1000:>10.1f} {import_time.self_us / 1000:>8.1f}  {'  ' * import_time.depth}{import_time.module}")
+
+    for failure in failures:
+        lines.append(f"Import failed: {failure}")
+    return "\n".join(lines)
+
+
+def main() -> None:
+    """Print the import profile of the robot."""
+    print(format_report(*profile_imports()))
@@ -2,7 +2,23 @@
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
+from robot_framework import config
+from robot_framework import orchestrator_cache
+from robot_framework import refresh_engine
+from robot_framework import reset
+from robot_framework import tracing
 
+
+@tracing.traced()
 def initialize(orchestrator_connection: OrchestratorConnection) -> None:
     """Do all custom startup initializations of the robot."""
     orchestrator_connection.log_trace("Initializing.")
+    orchestrator_cache.warm_up(orchestrator_connection, config.WARM_UP_CONSTANTS, config.WARM_UP_CREDENTIALS)
+    # Register the applications used by the process with reset.register_application here.
+    # Excel is started by the refresh engine on the first refresh, so it has no open hook.
+    reset.register_application(reset.Application(
+        name="Excel",
+        close=lambda: refresh_engine.close_engine(orchestrator_connection),
+        kill=refresh_engine.kill_engine,
+        health_check=refresh_engine.engine_is_healthy
+    ))
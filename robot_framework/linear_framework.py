@@ -9,6 +9,13 @@ from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConn
 
 from robot_framework import initialize
 from robot_framework import reset
+from robot_framework import error_reporter
+from robot_framework import log_buffer
+from robot_framework import orchestrator_cache
+from robot_framework import retry
+from robot_framework import sharepoint
+from robot_framework import throttling
+from robot_framework import tracing
 from robot_framework.exceptions import BusinessError, handle_error, log_exception
 from test3.test4.robot_framework import process_laura
 from robot_framework import config
@@ -16,7 +23,7 @@ from robot_framework import config
 
 def main():
     """The entry point for the framework. Should be called as the first thing when running the robot."""
-    orchestrator_connection = OrchestratorConnection.create_connection_from_args()
+    orchestrator_connection = log_buffer.buffered(OrchestratorConnection.create_connection_from_args())
     sys.excepthook = log_exception(orchestrator_connection)
 
     orchestrator_connection.log_trace("Robot Framework started.")
@@ -39,10 +46,18 @@ def main():
         except Exception as error:
             error_count += 1
             handle_error(f"Process Error #{error_count}", error, None, orchestrator_connection)
+            retry.wait_before_reset(error, error_count)
 
     reset.clean_up(orchestrator_connection)
     reset.close_all(orchestrator_connection)
     reset.kill_all(orchestrator_connection)
+    sharepoint.close_connections()
+    error_reporter.shutdown()
+    retry.finish(orchestrator_connection)
+    orchestrator_cache.finish(orchestrator_connection)
+    throttling.finish(orchestrator_connection)
+    tracing.finish(orchestrator_connection)
+    log_buffer.finish(orchestrator_connection)
 
     if config.FAIL_ROBOT_ON_TOO_MANY_ERRORS and error_count == config.MAX_RETRY_COUNT:
         raise RuntimeError("Process failed too many times.")
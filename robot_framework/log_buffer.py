@@ -0,0 +1,252 @@
+"""This module buffers the logs of the robot and writes them to OpenOrchestrator in batches.
+
+OrchestratorConnection writes every log line to the database in its own session and transaction,
+which is several round trips per queue element just for logging. BufferedConnection wraps a
+connection and keeps its log lines in memory instead. A background thread writes them in one
+transaction when config.LOG_BATCH_SIZE lines are buffered, when the oldest line is
+config.LOG_FLUSH_INTERVAL seconds old or when an error is logged. Each line keeps the time it was
+logged, so batching doesn't change the timeline in OpenOrchestrator.
+Trace and info lines can be sampled or suppressed with config.LOG_SAMPLE_RATES. Errors are always kept.
+Code that must not lose its logs, e.g. the error handling, calls flush to write them synchronously.
+The batches are written with internals of OpenOrchestrator. If a version of OpenOrchestrator doesn't
+have them, the lines are written one by one through the connection instead.
+"""
+
+import atexit
+import random
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from OpenOrchestrator.database import db_util
+from OpenOrchestrator.database.logs import LogLevel
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+try:
+    from OpenOrchestrator.database.logs import Log
+except ImportError:
+    Log = None
+
+from robot_framework import config
+
+# Whether this version of OpenOrchestrator has the internals used to write a batch in one transaction
+BATCH_WRITES_SUPPORTED = Log is not None and hasattr(db_util, "_get_session") and hasattr(db_util, "truncate_message")
+
+
+@dataclass
+class LogStats:
+    """Counts the log lines of a run.
+
+    Args:
+        logged: The number of log lines written to OpenOrchestrator.
+        writes: The number of batches written.
+        sampled_out: The number of log lines left out by sampling, per level.
+        lost: The number of log lines that couldn't be written.
+    """
+    logged: int = 0
+    writes: int = 0
+    sampled_out: dict[str, int] = field(default_factory=dict)
+    lost: int = 0
+
+    def summary(self) -> str:
+        """A short description of the logging of the run."""
+        sampled = ", ".join(f"{level}: {count}" for level, count in sorted(self.sampled_out.items())) or "none"
+        return (f"Wrote {self.logged} log lines in {self.writes} batches. "
+                f"Sampled out ({sampled}). {self.lost} log lines lost.")
+
+
+# pylint: disable-next = too-many-instance-attributes
+class BufferedConnection:
+    """A connection to OpenOrchestrator buffering log_trace, log_info and log_error.
+    Everything else, e.g. constants, credentials and queues, is passed on to the wrapped connection.
+    """
+
+    def __init__(self, connection: OrchestratorConnection, batch_size: int, flush_interval: float, sample_rates: dict[str, float]):
+        """Wrap a connection and start the thread writing the logs.
+
+        Args:
+            connection: The connection to OpenOrchestrator.
+            batch_size: The number of buffered log lines that triggers a write.
+            flush_interval: The longest time in seconds a log line is buffered.
+            sample_rates: The fraction of log lines kept per level, e.g. {"trace": 0.1}. 0 suppresses a level.
+        """
+        self.connection = connection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.sample_rates = sample_rates
+        self.stats = LogStats()
+        self._pending: list[tuple[datetime, LogLevel, str]] = []
+        self._oldest = 0.0
+        self._error_pending = False
+        self._stopping = False
+        self._condition = threading.Condition()
+        # Held while a batch is taken and written, so batches are written in order
+        self._write_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="LogBuffer", daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self.connection, name)
+
+    def __repr__(self):
+        return f"Buffered{self.connection!r}"
+
+    def log_trace(self, message: str) -> None:
+        """Buffer a message with the level 'trace'. See OrchestratorConnection.log_trace."""
+        self._add(LogLevel.TRACE, message)
+
+    def log_info(self, message: str) -> None:
+        """Buffer a message with the level 'info'. See OrchestratorConnection.log_info."""
+        self._add(LogLevel.INFO, message)
+
+    def log_error(self, message: str) -> None:
+        """Buffer a message with the level 'error' and wake the thread to write it.
+        See OrchestratorConnection.log_error.
+        """
+        self._add(LogLevel.ERROR, message)
+
+    def flush(self) -> None:
+        """Write all buffered log lines and wait until they are written."""
+        with self._write_lock:
+            with self._condition:
+                batch, self._pending = self._pending, []
+                self._error_pending = False
+            self._write(batch)
+
+    def close(self) -> None:
+        """Stop the thread and write the remaining log lines. Log lines added later are written synchronously."""
+        with self._condition:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush()
+
+    def _add(self, level: LogLevel, message: str) -> None:
+        """Buffer a log line unless it is sampled out."""
+        name = level.value.lower()
+        rate = self.sample_rates.get(name, 1.0) if level != LogLevel.ERROR else 1.0
+        if rate < 1 and random.random() >= rate:
+            with self._condition:
+                self.stats.sampled_out[name] = self.stats.sampled_out.get(name, 0) + 1
+            return
+
+        with self._condition:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((datetime.now(), level, message))
+            stopping = self._stopping
+            if level == LogLevel.ERROR:
+                self._error_pending = True
+                self._condition.notify()
+            elif len(self._pending) >= self.batch_size:
+                self._condition.notify()
+        if stopping:
+            self.flush()
+
+    def _batch_due(self) -> bool:
+        """Check if the buffered log lines should be written. Must be called holding the condition."""
+        return bool(self._pending) and (
+            self._error_pending
+            or len(self._pending) >= self.batch_size
+            or time.monotonic() - self._oldest >= self.flush_interval
+        )
+
+    def _run(self) -> None:
+        """Wait for a batch to be due and write it, until the connection is closed."""
+        while True:
+            with self._condition:
+                while not self._stopping and not self._batch_due():
+                    timeout = self._oldest + self.flush_interval - time.monotonic() if self._pending else None
+                    self._condition.wait(timeout)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def _write(self, batch: list[tuple[datetime, LogLevel, str]]) -> None:
+        """Write log lines in one transaction.
+        If the batch fails, or OpenOrchestrator can't write batches, the lines are written one by one
+        through the connection with the time they are written, and lines that still fail are printed to stderr.
+        """
+        if not batch:
+            return
+
+        written, lost = 0, 0
+        if BATCH_WRITES_SUPPORTED:
+            try:
+                self._write_batch(batch)
+                written = len(batch)
+            # The logs are written one by one instead
+            # pylint: disable-next = broad-exception-caught
+            except Exception:
+                pass
+
+        if not written:
+            for log_time, level, message in batch:
+                try:
+                    getattr(self.connection, f"log_{level.value.lower()}")(message)
+                    written += 1
+                # There is nowhere else to log the error
+                # pylint: disable-next = broad-exception-caught
+                except Exception as error:
+                    lost += 1
+                    print(f"Couldn't write log ({log_time} {level.value}): {message}\n{error!r}", file=sys.stderr)
+
+        with self._condition:
+            self.stats.logged += written
+            self.stats.lost += lost
+            self.stats.writes += 1
+
+    def _write_batch(self, batch: list[tuple[datetime, LogLevel, str]]) -> None:
+        """Insert log lines with their log time in one transaction."""
+        process_name = self.connection.process_name
+        # OpenOrchestrator has no function creating several logs, so the session is used directly
+        # pylint: disable-next = protected-access
+        with db_util._get_session() as session:
+            session.add_all([
+                Log(log_time=log_time, log_level=level, process_name=process_name, log_message=db_util.truncate_message(message))
+                for log_time, level, message in batch
+            ])
+            session.commit()
+
+
+def buffered(connection: OrchestratorConnection) -> OrchestratorConnection | BufferedConnection:
+    """Wrap a connection to OpenOrchestrator in a BufferedConnection, if config.LOG_BUFFERING is enabled.
+    The buffered log lines are written when the interpreter exits, if finish hasn't been called.
+
+    Args:
+        connection: The connection to OpenOrchestrator.
+
+    Returns:
+        The buffered connection, or the connection itself if buffering is disabled.
+    """
+    if not config.LOG_BUFFERING:
+        return connection
+    buffered_connection = BufferedConnection(connection, config.LOG_BATCH_SIZE, config.LOG_FLUSH_INTERVAL, config.LOG_SAMPLE_RATES)
+    atexit.register(buffered_connection.close)
+    return buffered_connection
+
+
+def flush(orchestrator_connection: OrchestratorConnection | BufferedConnection) -> None:
+    """Write the buffered log lines of a connection synchronously. Does nothing for unbuffered connections.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    if isinstance(orchestrator_connection, BufferedConnection):
+        orchestrator_connection.flush()
+
+
+def finish(orchestrator_connection: OrchestratorConnection | BufferedConnection) -> None:
+    """Log the logging statistics of the run and write the remaining log lines.
+    Does nothing for unbuffered connections.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    if isinstance(orchestrator_connection, BufferedConnection):
+        orchestrator_connection.log_info(orchestrator_connection.stats.summary())
+        orchestrator_connection.close()
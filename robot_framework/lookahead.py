@@ -0,0 +1,80 @@
+"""This module handles claiming queue elements ahead of time and preparing them in the background."""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+
+class Lookahead:
+    """Claims up to 'depth' queue elements ahead of the one being processed and
+    runs a prefetch function for each of them in a background thread.
+    With a depth of 0 queue elements are simply claimed one at a time.
+    """
+
+    def __init__(self, orchestrator_connection: OrchestratorConnection, queue_name: str, depth: int,
+                 prefetch: Callable[[OrchestratorConnection, QueueElement], str],
+                 discard: Callable[[str], None]):
+        """Create a new lookahead on a queue.
+
+        Args:
+            orchestrator_connection: The connection to OpenOrchestrator.
+            queue_name: The name of the queue to claim elements from.
+            depth: The maximum number of elements claimed ahead of the one being processed.
+            prefetch: A function preparing a queue element in the background. Its return value is passed on to the process.
+            discard: A function cleaning up the return value of prefetch for elements that are released unprocessed.
+        """
+        self.orchestrator_connection = orchestrator_connection
+        self.queue_name = queue_name
+        self.depth = depth
+        self.prefetch = prefetch
+        self.discard = discard
+        self._pending: deque[tuple[QueueElement, Future]] = deque()
+        self._executor = ThreadPoolExecutor(max_workers=depth) if depth else None
+
+    def next_queue_element(self, max_lookahead: int) -> tuple[QueueElement | None, Future | None]:
+        """Get the next queue element to process and start prefetching the following ones.
+
+        Args:
+            max_lookahead: The maximum number of elements to claim ahead of the returned one.
+                Used to make sure no more elements than config.MAX_TASK_COUNT are claimed in total.
+
+        Returns:
+            The next queue element or None if the queue is empty, and a future with the result
+            of its prefetch or None if it wasn't prefetched.
+        """
+        if self._pending:
+            queue_element, prefetched = self._pending.popleft()
+        else:
+            queue_element, prefetched = self.orchestrator_connection.get_next_queue_element(self.queue_name), None
+
+        if queue_element:
+            while len(self._pending) < min(self.depth, max_lookahead):
+                next_element = self.orchestrator_connection.get_next_queue_element(self.queue_name)
+                if not next_element:
+                    break
+                self._pending.append((next_element, self._executor.submit(self.prefetch, self.orchestrator_connection, next_element)))
+
+        return queue_element, prefetched
+
+    def release_all(self) -> None:
+        """Put all claimed but unprocessed queue elements back in the queue and clean up their prefetched data."""
+        while self._pending:
+            queue_element, prefetched = self._pending.popleft()
+            if not prefetched.cancel():
+                try:
+                    self.discard(prefetched.result())
+                # The element is released anyway, so a failed prefetch doesn't matter.
+                # pylint: disable-next = broad-exception-caught
+                except Exception:
+                    pass
+            self.orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.NEW, "Released unprocessed by lookahead.")
+            self.orchestrator_connection.log_info(f"Released prefetched queue element {queue_element.id}.")
+
+    def close(self) -> None:
+        """Release all unprocessed queue elements and stop the background threads."""
+        self.release_all()
+        if self._executor:
+            self._executor.shutdown()
@@ -0,0 +1,162 @@
+"""This module caches constants and credentials from OpenOrchestrator for the whole process.
+
+Every call to get_constant or get_credential on an OrchestratorConnection is a round trip to the
+database, and credentials are decrypted each time. The functions in this module keep the values
+for config.ORCHESTRATOR_CACHE_TTL seconds instead. A credential is invalidated when it is rejected,
+e.g. by refresh_credential when SharePoint responds 401 Unauthorized, so a changed password is
+read again without waiting for the TTL. Known names can be read during initialize with warm_up.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+
+from OpenOrchestrator.database.constants import Constant, Credential
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+
+
+@dataclass
+class CacheStats:
+    """Counts the lookups in the cache.
+
+    Args:
+        hits: The number of lookups answered by the cache.
+        misses: The number of lookups read from OpenOrchestrator.
+        invalidations: The number of entries invalidated before their TTL.
+    """
+    hits: int = 0
+    misses: int = 0
+    invalidations: int = 0
+
+    def summary(self) -> str:
+        """A short description of the lookups in the cache."""
+        return (f"Constants and credentials: {self.hits} cache hits, {self.misses} reads from OpenOrchestrator, "
+                f"{self.invalidations} invalidations.")
+
+
+# Cached constants and credentials by (kind, name) with the time they expire
+_entries: dict[tuple[str, str], tuple[Constant | Credential, float]] = {}
+_stats = CacheStats()
+_lock = threading.Lock()
+
+
+def get_constant(orchestrator_connection: OrchestratorConnection, name: str) -> Constant:
+    """Get a constant from the cache, or from OpenOrchestrator if it isn't cached or has expired.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        name: The name of the constant.
+
+    Returns:
+        The constant with the given name.
+
+    Raises:
+        ValueError: If no constant with the given name exists.
+    """
+    return _get("constant", name, orchestrator_connection.get_constant)
+
+
+def get_credential(orchestrator_connection: OrchestratorConnection, name: str) -> Credential:
+    """Get a credential from the cache, or from OpenOrchestrator if it isn't cached or has expired.
+    The password of the credential is decrypted.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        name: The name of the credential.
+
+    Returns:
+        The credential with the given name.
+
+    Raises:
+        ValueError: If no credential with the given name exists.
+    """
+    return _get("credential", name, orchestrator_connection.get_credential)
+
+
+def refresh_credential(orchestrator_connection: OrchestratorConnection, name: str) -> Credential:
+    """Invalidate a credential and read it from OpenOrchestrator again.
+    Used when the credential is rejected, e.g. because the password has been changed.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        name: The name of the credential.
+
+    Returns:
+        The credential with the given name.
+    """
+    invalidate_credential(name)
+    return get_credential(orchestrator_connection, name)
+
+
+def invalidate_constant(name: str) -> None:
+    """Forget a cached constant so the next lookup reads it from OpenOrchestrator."""
+    _invalidate("constant", name)
+
+
+def invalidate_credential(name: str) -> None:
+    """Forget a cached credential so the next lookup reads it from OpenOrchestrator."""
+    _invalidate("credential", name)
+
+
+def warm_up(orchestrator_connection: OrchestratorConnection, constants: list[str], credentials: list[str]) -> None:
+    """Read constants and credentials into the cache, so the first queue element doesn't wait for them.
+    Names that don't exist in OpenOrchestrator are logged and skipped.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        constants: The names of the constants to read.
+        credentials: The names of the credentials to read.
+    """
+    for kind, names, lookup in (("constant", constants, get_constant), ("credential", credentials, get_credential)):
+        for name in names:
+            try:
+                lookup(orchestrator_connection, name)
+            except ValueError:
+                orchestrator_connection.log_trace(f"Skipped warm-up of the {kind} '{name}', which doesn't exist.")
+
+
+def stats() -> CacheStats:
+    """Get a copy of the counters of the cache."""
+    with _lock:
+        return CacheStats(_stats.hits, _stats.misses, _stats.invalidations)
+
+
+def finish(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the counters of the cache.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    orchestrator_connection.log_info(stats().summary())
+
+
+def _get(kind: str, name: str, read) -> Constant | Credential:
+    """Get an entry from the cache or read and cache it.
+    Threads missing the same entry at the same time each read it, which is harmless.
+
+    Args:
+        kind: 'constant' or 'credential'.
+        name: The name of the entry.
+        read: The function reading the entry from OpenOrchestrator by name.
+    """
+    key = (kind, name)
+    with _lock:
+        value, expires = _entries.get(key, (None, 0))
+        if value is not None and time.monotonic() < expires:
+            _stats.hits += 1
+            return value
+        _stats.misses += 1
+
+    value = read(name)
+    if config.ORCHESTRATOR_CACHE_TTL > 0:
+        with _lock:
+            _entries[key] = (value, time.monotonic() + config.ORCHESTRATOR_CACHE_TTL)
+    return value
+
+
+def _invalidate(kind: str, name: str) -> None:
+    with _lock:
+        if _entries.pop((kind, name), None) is not None:
+            _stats.invalidations += 1
@@ -1,21 +1,26 @@
-"""This module contains the main process of the robot."""
+"""This module contains the main process of the robot.
+pandas and office365 are imported on first use to keep the start of the robot fast.
+"""
+
+from __future__ import annotations
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 from OpenOrchestrator.database.queues import QueueElement
 import os
-import pandas as pd
-from office365.runtime.auth.user_credential import UserCredential
-from office365.sharepoint.client_context import ClientContext
-import time
 import json
 import datetime
 import locale
+from typing import IO, TYPE_CHECKING
 
-import pandas as pd
-import os
-from office365.sharepoint.client_context import ClientContext
-import json
+from robot_framework import config
+from robot_framework import orchestrator_cache
+from robot_framework import sharepoint
+from robot_framework import tracing
+from robot_framework import refresh_engine
+from robot_framework import retry
 
+if TYPE_CHECKING:
+    from office365.sharepoint.client_context import ClientContext
 
 
 def tjek_for_aktindsigt(orchestrator_connection: OrchestratorConnection, queue_element: QueueElement | None = None):
@@ -30,55 +35,47 @@ def tjek_for_aktindsigt(orchestrator_connection: OrchestratorConnection, queue_e
     sharepoint_site = data.get("SharePointSite")
     parent_folder_path = data.get("FolderPath")
 
-    # Authenticate with SharePoint
-    RobotCredentials = orchestrator_connection.get_credential("RobotCredentials")  ##- se om kodeord skal dekryptes
-    username = RobotCredentials.username
-    password = RobotCredentials.password
-    client = sharepoint_client(username, password, sharepoint_site, orchestrator_connection)
-
     # Dictionary to store results for each folder
     results = {}
 
-    # Traverse through each subfolder in the parent folder and check for Excel files
-    traverse_and_check_folder(client, parent_folder_path, results, orchestrator_connection)
+    def crawl(client):
+        # The crawl starts over if SharePoint rejects the credentials
+        results.clear()
+        return traverse_and_check_folder(client, parent_folder_path, results, orchestrator_connection)
+
+    # Traverse through the parent folder and its subfolders level by level and check for Excel files
+    stats = with_sharepoint_client(orchestrator_connection, sharepoint_site, crawl, config.ROBOT_CREDENTIALS)
+    orchestrator_connection.log_info(f"Crawled {stats.folders} folders in {stats.round_trips} round trips.")
 
     return results
 
-def traverse_and_check_folder(client, folder_path, results, orchestrator_connection):
+def traverse_and_check_folder(client, folder_path, results, orchestrator_connection) -> sharepoint.CrawlStats:
     """
-    Recursively traverses folders in SharePoint, checks for Excel files, and records results in `results`.
+    Traverses folders in SharePoint breadth-first, checks for Excel files, and records results in `results`.
+    Each level of folders is listed in a single batched request.
+    Returns the crawl statistics including the number of round trips used for listing.
     """
-    folder = client.web.get_folder_by_server_relative_url(folder_path)
-    client.load(folder)
-    client.execute_query()
-
-    # Load all files in the current folder
-    files = folder.files
-    client.load(files)
-    client.execute_query()
-
-    for file in files:
-        if file.properties["Name"].endswith(".xlsx"):
-            # Download and process the Excel file
-            local_file_path = download_file_from_sharepoint(client, f"{folder_path}/{file.properties['Name']}", orchestrator_connection)
-            result = check_excel_file(local_file_path, orchestrator_connection)
-            results[folder_path] = result
-            os.remove(local_file_path)  # Clean up the downloaded file after processing
-            break  # Stop after processing the first Excel file in this folder
-
-    # Now, check for subfolders within the current folder
-    subfolders = folder.folders
-    client.load(subfolders)
-    client.execute_query()
-
-    for subfolder in subfolders:
-        subfolder_path = f"{folder_path}/{subfolder.properties['Name']}"
-        traverse_and_check_folder(client, subfolder_path, results, orchestrator_connection)
-
-def check_excel_file(file_path: str, orchestrator_connection: OrchestratorConnection) -> str:
+    stats = sharepoint.CrawlStats()
+    for listing in sharepoint.walk_folders(client, folder_path, stats):
+        for file in listing.files:
+            if file["Name"].endswith(".xlsx"):
+                # Download the Excel file into memory and process it
+                file_url = f"{listing.url}/{file['Name']}"
+                with retry.run_step("download", lambda file_url=file_url: sharepoint.download_file(client, file_url)) as excel_file:
+                    result = check_excel_file(excel_file, orchestrator_connection)
+                results[listing.url] = result
+                break  # Stop after processing the first Excel file in this folder
+
+    return stats
+
+def check_excel_file(file_path: str | IO[bytes], orchestrator_connection: OrchestratorConnection) -> str:
     """
     Checks the 'svar' column in the specified Excel file and returns the result.
+    The file can be given either as a path or as a binary file-like object.
     """
+    # pylint: disable-next = import-outside-toplevel
+    import pandas as pd
+
     df = pd.read_excel(file_path)
 
     if 'Gives der aktindsigt' in df.columns:
@@ -94,8 +91,12 @@ def check_excel_file(file_path: str, orchestrator_connection: OrchestratorConnec
 
 
 
-def process(orchestrator_connection: OrchestratorConnection, queue_element: QueueElement | None = None) -> None:
-    """Do the primary process of the robot."""
+@tracing.traced()
+def process(orchestrator_connection: OrchestratorConnection, queue_element: QueueElement | None = None, prefetched_file_path: str | None = None) -> None:
+    """Do the primary process of the robot.
+    If the workbook of the queue element has already been downloaded by prefetch
+    its path is given as prefetched_file_path and the download is skipped.
+    """
     orchestrator_connection.log_trace("Running process.")
     data = json.loads(queue_element.data)
      # Assign each field to a named variable
@@ -103,167 +104,142 @@ def process(orchestrator_connection: OrchestratorConnection, queue_element: Queu
     folder_path = data.get("FolderPath")
     custom_function = data.get("CustomFunction")
 
-    RobotCredentials = orchestrator_connection.get_credential("Robot365User")
-    username = RobotCredentials.username
-    password = RobotCredentials.password
-
-        # 1. Create the SharePoint client
-    client = sharepoint_client(username, password, sharepoint_site, orchestrator_connection)
+    # 1. Reuse the SharePoint client of the site if an earlier queue element has authenticated already
+    def with_client(action):
+        return with_sharepoint_client(orchestrator_connection, sharepoint_site, action)
 
+    local_file_path = prefetched_file_path
     try:
         # 2. Download the file from SharePoint
-        local_file_path = download_file_from_sharepoint(client, folder_path, orchestrator_connection)
+        if not local_file_path:
+            local_file_name = unique_file_name(queue_element, folder_path)
+            local_file_path = retry.run_step("download", lambda: with_client(lambda client: download_file_from_sharepoint(client, folder_path, orchestrator_connection, local_file_name)))
 
         refresh_excel_file(local_file_path, orchestrator_connection)
 
-        upload_file_to_sharepoint(client, folder_path, local_file_path, custom_function, orchestrator_connection)
+        retry.run_step("upload", lambda: with_client(lambda client: upload_and_archive(client, folder_path, local_file_path, custom_function, orchestrator_connection)))
     except Exception as e:
-        os.remove(local_file_path)
+        if local_file_path and os.path.exists(local_file_path):
+            os.remove(local_file_path)
         orchestrator_connection.log_error(str(e))
         raise e
 
-def sharepoint_client(username: str, password: str, sharepoint_site_url: str, orchestrator_connection: OrchestratorConnection) -> ClientContext:
+def prefetch(orchestrator_connection: OrchestratorConnection, queue_element: QueueElement) -> str:
     """
-    Creates and returns a SharePoint client context.
+    Downloads the workbook of a queue element ahead of processing it and returns the local file path.
+    This runs in a background thread while another queue element is processed, so it uses its own
+    clone of the SharePoint client and a file name that is unique to the queue element.
     """
-    # Authenticate to SharePoint
-    ctx = ClientContext(sharepoint_site_url).with_credentials(UserCredential(username, password))
+    data = json.loads(queue_element.data)
+    sharepoint_site = data.get("SharePointSite")
+    folder_path = data.get("FolderPath")
 
-    # Load and verify connection
-    web = ctx.web
-    ctx.load(web)
-    ctx.execute_query()
+    local_file_name = unique_file_name(queue_element, folder_path)
+    # Runs in its own thread, so it isn't inside the span of the queue element
+    with tracing.span("process_laura.prefetch", queue_element_id=queue_element.id):
+        return with_sharepoint_client(
+            orchestrator_connection, sharepoint_site,
+            lambda client: download_file_from_sharepoint(client.clone(client.base_url), folder_path, orchestrator_connection, local_file_name)
+        )
 
-    orchestrator_connection.log_info(f"Authenticated successfully. Site Title: {web.properties['Title']}")
-    return ctx
+def unique_file_name(queue_element: QueueElement, folder_path: str) -> str:
+    """
+    Returns a local file name that is unique to the queue element, so workers processing
+    elements with the same file name in parallel don't overwrite each other's files.
+    """
+    return f"{queue_element.id}_{folder_path.split('/')[-1]}"
 
+def discard_prefetched(local_file_path: str) -> None:
+    """Deletes a prefetched workbook of a queue element that won't be processed in this run."""
+    if os.path.exists(local_file_path):
+        os.remove(local_file_path)
 
-def download_file_from_sharepoint(client: ClientContext, sharepoint_file_url: str, orchestrator_connection: OrchestratorConnection) -> str:
+def with_sharepoint_client(orchestrator_connection: OrchestratorConnection, sharepoint_site_url: str, action, credential_name: str | None = None):
     """
-    Downloads a file from SharePoint and returns the local file path.
-    Handles both cases where subfolders exist or only the root folder is used.
+    Runs an action with the SharePoint client of the site, authenticated with a cached credential, by default Robot365User.
+    If SharePoint rejects the credential it is read from OpenOrchestrator again, in case the password has changed.
     """
-    # Extract the root folder, folder path, and file name
-    path_parts = sharepoint_file_url.split('/')
-    DOCUMENT_LIBRARY = path_parts[0]  # Root folder name (document library)
-    FOLDER_PATH = '/'.join(path_parts[1:-1]) if len(path_parts) > 2 else ''  # Subfolders inside root, or empty if none
-    file_name = path_parts[-1]  # File name
-
-    # Construct the local folder path inside the Documents folder
-    documents_folder = os.path.join(os.path.expanduser("~"), "Documents", FOLDER_PATH) if FOLDER_PATH else os.path.join(os.path.expanduser("~"), "Documents", DOCUMENT_LIBRARY)
-
-    # Ensure the folder exists
-    if not os.path.exists(documents_folder):
-        os.makedirs(documents_folder)
-
-    # Define the download path inside the folder
-    download_path = os.path.join(os.getcwd(), file_name)
-
-    # Download the file from SharePoint
-    with open(download_path, "wb") as local_file:
-        file = (
-            client.web.get_file_by_server_relative_path(sharepoint_file_url)
-            .download(local_file)
-            .execute_query()
-        )
-    # Define the maximum wait time (60 seconds) and check interval (1 second)
-    wait_time = 60  # 60 seconds
-    elapsed_time = 0
-    check_interval = 1  # Check every 1 second
+    credential_name = credential_name or config.ROBOT_365_USER
+    RobotCredentials = orchestrator_cache.get_credential(orchestrator_connection, credential_name)
+
+    def refresh_credentials():
+        credential = orchestrator_cache.refresh_credential(orchestrator_connection, credential_name)
+        return credential.username, credential.password
 
+    return sharepoint.with_reauthentication(
+        sharepoint_site_url, RobotCredentials.username, RobotCredentials.password, action, refresh_credentials,
+        orchestrator_connection=orchestrator_connection, verify=config.SHAREPOINT_VERIFY_CONNECTION
+    )
+
+def sharepoint_client(username: str, password: str, sharepoint_site_url: str, orchestrator_connection: OrchestratorConnection) -> ClientContext:
+    """
+    Returns a SharePoint client context for the site.
+    The client is reused across queue elements, see sharepoint.get_client.
+    """
+    return sharepoint.sharepoint_client(username, password, sharepoint_site_url, orchestrator_connection, verify=config.SHAREPOINT_VERIFY_CONNECTION)
 
-    # While loop to check if the file exists at `file_path`
-    while not os.path.exists(download_path) and elapsed_time < wait_time:
-        time.sleep(check_interval)  # Wait 1 second
-        elapsed_time += check_interval
 
-    # After the loop, check if the file still doesn't exist and raise an error
-    if not os.path.exists(download_path):
-        raise FileNotFoundError(f"File not found at {download_path} after waiting for {wait_time} seconds.")
+@tracing.traced()
+def download_file_from_sharepoint(client: ClientContext, sharepoint_file_url: str, orchestrator_connection: OrchestratorConnection, local_file_name: str | None = None) -> str:
+    """
+    Downloads a file from SharePoint and returns the local file path.
+    The file keeps its name from SharePoint unless a local_file_name is given.
+    Only use this when the file is needed on disk, e.g. to open it in Excel.
+    Otherwise use sharepoint.download_file to keep the file in memory.
+    """
+    # Download the file from SharePoint. The file is complete when the download returns.
+    download_path = sharepoint.download_file_from_sharepoint(client, sharepoint_file_url, local_file_name)
 
     orchestrator_connection.log_info(f"[Ok] file has been downloaded into: {download_path}")
     return download_path
 
 
+@tracing.traced()
 def refresh_excel_file(file_path: str, orchestrator_connection: OrchestratorConnection):
     """
     Refreshes an Excel file at the specified file path.
+    The refresh engine (see config.REFRESH_ENGINE) keeps Excel running between queue elements.
     """
-
-    # Open an Instance of Application
-    xlapp = win32com.client.DispatchEx("Excel.Application")
-
-    # Optional, e.g., if you want to debug
-    xlapp.Visible = False
-
-    # Open File
-    Workbook = xlapp.Workbooks.Open(file_path)
-
-    # Refresh all  
-    Workbook.RefreshAll()
-
-    # Wait until Refresh is complete
-    xlapp.CalculateUntilAsyncQueriesDone()
-
-    # Save File  
-    Workbook.Save()
-    Workbook.Close(SaveChanges=True)
-
-    # Quit Instance of Application
-    xlapp.Quit()
-
-    # Delete Instance of Application
-    del Workbook
-    del xlapp
+    refresh_engine.get_engine().refresh(file_path)
 
     orchestrator_connection.log_info(f"[Ok] Excel file at {file_path} has been refreshed and saved.")
 
-def upload_file_to_sharepoint(client: ClientContext, sharepoint_file_url: str, local_file_path: str, custom_function, orchestrator_connection: OrchestratorConnection):
+@tracing.traced()
+def upload_and_archive(client: ClientContext, sharepoint_file_url: str, local_file_path: str, custom_function, orchestrator_connection: OrchestratorConnection):
     """
-    Uploads the specified local file back to SharePoint at the given URL.
-    Uses the folder path directly to upload files.
+    Uploads the specified local file back to SharePoint at the given URL with sharepoint.upload_file_to_sharepoint,
+    archives it when the custom function is "MonthlyFolder" and removes the local file.
     """
-    # Extract the root folder, folder path, and file name
-    path_parts = sharepoint_file_url.split('/')
-    DOCUMENT_LIBRARY = path_parts[0]  # Root folder name (document library)
-    FOLDER_PATH = '/'.join(path_parts[1:-1]) if len(path_parts) > 2 else ''  # Subfolders inside root, or empty if none
-    file_name = path_parts[-1]  # File name
-
-    # Construct the server-relative folder path (starting with the document library)
-    if FOLDER_PATH:
-        folder_path = f"{DOCUMENT_LIBRARY}/{FOLDER_PATH}"
-    else:
-        folder_path = f"{DOCUMENT_LIBRARY}"
+    upload = sharepoint.upload_file_to_sharepoint(client, sharepoint_file_url, local_file_path)
 
-    # Get the folder where the file should be uploaded
-    target_folder = client.web.get_folder_by_server_relative_url(folder_path)
-    client.load(target_folder)
-    client.execute_query()
+    orchestrator_connection.log_info(f"[Ok] file has been uploaded to: {upload.url} on SharePoint")
+    orchestrator_connection.log_info(upload.summary())
 
-    # Upload the file to the correct folder in SharePoint
-    with open(local_file_path, "rb") as file_content:
-        uploaded_file = target_folder.upload_file(file_name, file_content).execute_query()
+    if custom_function == "MonthlyFolder":
+        orchestrator_connection.log_info(f"Custom function: {custom_function}")
+        archive_to_monthly_folder(client, upload.url, orchestrator_connection)
 
+    os.remove(local_file_path)
 
-    orchestrator_connection.log_info(f"[Ok] file has been uploaded to: {uploaded_file.serverRelativeUrl} on SharePoint")
 
-    if custom_function == "MonthlyFolder":
-        orchestrator_connection.log_info(f"Custom function: {custom_function}")
+@tracing.traced()
+def archive_to_monthly_folder(client: ClientContext, sharepoint_file_url: str, orchestrator_connection: OrchestratorConnection) -> str:
+    """
+    Copies an uploaded file to Historik/<year>/<month> in the "Dokumenter" library and returns the url of the copy.
+    The copy is made by SharePoint instead of uploading the file again. The folders are
+    looked up and created once per run, so archiving usually costs a single request.
+    """
+    locale.setlocale(locale.LC_TIME, "da_DK")
+    current_month = datetime.datetime.now().strftime("%B").capitalize()
+    current_year = str(datetime.datetime.now().year)
 
-        library = client.web.lists.get_by_title("Dokumenter")
-        client.load(library).execute_query()
+    historik_url = f"{sharepoint.get_library_root_url(client, 'Dokumenter')}/Historik"
+    year_url = f"{historik_url}/{current_year}"
+    month_url = f"{year_url}/{current_month}"
+    sharepoint.ensure_folders(client, [year_url, month_url])
 
-        parent_folder = library.root_folder.folders.get_by_url("Historik")
-        client.load(parent_folder).execute_query()
-    
-        locale.setlocale(locale.LC_TIME, "da_DK")
-        current_month = datetime.datetime.now().strftime("%B").capitalize()
-        current_year = str(datetime.datetime.now().year)
-        year_folder = parent_folder.folders.add(current_year).execute_query()
-        month_folder = year_folder.folders.add(current_month).execute_query()
-
-        with open(local_file_path, "rb") as file_content:
-            uploaded_file_2 = month_folder.upload_file(f'DKPlan_{current_month}_{current_year}.xlsx', file_content).execute_query()
-        orchestrator_connection.log_info(f"[Ok] file has been uploaded to: {uploaded_file_2.serverRelativeUrl} on SharePoint")
-            
-    os.remove(local_file_path)
\ No newline at end of file
+    archive_url = f"{month_url}/DKPlan_{current_month}_{current_year}.xlsx"
+    sharepoint.copy_file(client, sharepoint_file_url, archive_url)
+
+    orchestrator_connection.log_info(f"[Ok] file has been copied to: {archive_url} on SharePoint")
+    return archive_url
@@ -10,22 +10,40 @@ from OpenOrchestrator.database.queues import QueueStatus
 
 from robot_framework import initialize
 from robot_framework import reset
+from robot_framework import error_reporter
+from robot_framework import log_buffer
+from robot_framework import orchestrator_cache
+from robot_framework import retry
+from robot_framework import sharepoint
+from robot_framework import throttling
+from robot_framework import tracing
+from robot_framework import worker_pool
 from robot_framework.exceptions import handle_error, BusinessError, log_exception
+from robot_framework.lookahead import Lookahead
 from test3.test4.robot_framework import process_laura
 from robot_framework import config
 
 
 def main():
     """The entry point for the framework. Should be called as the first thing when running the robot."""
-    orchestrator_connection = OrchestratorConnection.create_connection_from_args()
+    orchestrator_connection = log_buffer.buffered(OrchestratorConnection.create_connection_from_args())
     sys.excepthook = log_exception(orchestrator_connection)
 
     orchestrator_connection.log_trace("Robot Framework started.")
+
+    if worker_pool.use_workers(orchestrator_connection, config.QUEUE_WORKERS):
+        error_count = worker_pool.run(orchestrator_connection, config.QUEUE_WORKERS, config.QUEUE_NAME, process_laura.process)
+        log_buffer.finish(orchestrator_connection)
+        if config.FAIL_ROBOT_ON_TOO_MANY_ERRORS and error_count >= config.MAX_RETRY_COUNT:
+            raise RuntimeError("Process failed too many times.")
+        return
+
     initialize.initialize(orchestrator_connection)
 
     queue_element = None
     error_count = 0
     task_count = 0
+    lookahead = Lookahead(orchestrator_connection, config.QUEUE_NAME, config.PREFETCH_DEPTH, process_laura.prefetch, process_laura.discard_prefetched)
     # Retry loop
     for _ in range(config.MAX_RETRY_COUNT):
         try:
@@ -34,18 +52,22 @@ def main():
             # Queue loop
             while task_count < config.MAX_TASK_COUNT:
                 task_count += 1
-                queue_element = orchestrator_connection.get_next_queue_element(config.QUEUE_NAME)
+                queue_element, prefetched = lookahead.next_queue_element(config.MAX_TASK_COUNT - task_count)
 
                 if not queue_element:
                     orchestrator_connection.log_info("Queue empty.")
                     break  # Break queue loop
 
-                try:
-                    process_laura.process(orchestrator_connection, queue_element)
-                    orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE)
+                with tracing.span("queue_element", queue_element_id=queue_element.id):
+                    try:
+                        if prefetched:
+                            process_laura.process(orchestrator_connection, queue_element, prefetched.result())
+                        else:
+                            process_laura.process(orchestrator_connection, queue_element)
+                        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE)
 
-                except BusinessError as error:
-                    handle_error("Business Error", error, queue_element, orchestrator_connection)
+                    except BusinessError as error:
+                        handle_error("Business Error", error, queue_element, orchestrator_connection)
 
             break  # Break retry loop
 
@@ -54,10 +76,20 @@ def main():
         except Exception as error:
             error_count += 1
             handle_error(f"Process Error #{error_count}", error, queue_element, orchestrator_connection)
+            retry.wait_before_reset(error, error_count)
+            lookahead.release_all()
 
+    lookahead.close()
     reset.clean_up(orchestrator_connection)
     reset.close_all(orchestrator_connection)
     reset.kill_all(orchestrator_connection)
+    sharepoint.close_connections()
+    error_reporter.shutdown()
+    retry.finish(orchestrator_connection)
+    orchestrator_cache.finish(orchestrator_connection)
+    throttling.finish(orchestrator_connection)
+    tracing.finish(orchestrator_connection)
+    log_buffer.finish(orchestrator_connection)
 
     if config.FAIL_ROBOT_ON_TOO_MANY_ERRORS and error_count == config.MAX_RETRY_COUNT:
         raise RuntimeError("Process failed too many times.")
@@ -0,0 +1,384 @@
+"""This module contains the engines used to refresh Excel workbooks.
+
+The COM engine drives a real Excel instance, which is kept running between
+workbooks instead of being started and quit for every queue element.
+The headless engine needs neither Windows nor Excel, so the process can run
+and be benchmarked anywhere. It recalculates formula cells with pycel and writes
+the results into the workbook. It refuses workbooks with data connections,
+external links or pivot caches, which only Excel can refresh.
+"""
+
+import os
+import re
+import signal
+import xml.sax.saxutils
+import zipfile
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+
+
+class RefreshEngine(ABC):
+    """Refreshes and saves workbooks. Engines may keep resources between workbooks until closed."""
+
+    def __init__(self):
+        self.refreshed = 0
+
+    @abstractmethod
+    def refresh(self, file_path: str) -> None:
+        """Refresh all data and formulas in a workbook and save it in place.
+
+        Args:
+            file_path: The path of the workbook.
+        """
+
+    def close(self) -> None:
+        """Release any resources held by the engine. The engine can still be used afterwards."""
+
+    def kill(self) -> None:
+        """Forcefully release any resources held by the engine. The engine can still be used afterwards."""
+        self.close()
+
+    def is_healthy(self) -> bool:
+        """Check that the engine can refresh the next workbook."""
+        return True
+
+    def summary(self) -> str:
+        """A short description of the work done by the engine."""
+        return f"{type(self).__name__} refreshed {self.refreshed} workbooks."
+
+
+# pylint: disable-next = too-many-instance-attributes
+class ComRefreshEngine(RefreshEngine):
+    """Refreshes workbooks in Excel through COM.
+    A single Excel instance is reused for up to 'recycle_after' workbooks and then restarted,
+    to keep Excel from slowly leaking memory. The instance is also restarted after a failure.
+    COM objects belong to the thread that created them, so all calls to Excel are made in
+    one thread of the engine, and the reset hooks can call the engine from any thread.
+    """
+
+    def __init__(self, recycle_after: int, response_timeout: float):
+        """Create the engine. Excel is started on the first refresh.
+
+        Args:
+            recycle_after: The number of workbooks refreshed before Excel is restarted.
+            response_timeout: The number of seconds Excel has to answer a health check or close before it is considered hung.
+        """
+        super().__init__()
+        self.recycle_after = recycle_after
+        self.response_timeout = response_timeout
+        self.starts = 0
+        self._excel = None
+        self._pid: int | None = None
+        self._workbooks_since_start = 0
+        self._com_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="excel", initializer=_initialize_com)
+
+    def refresh(self, file_path: str) -> None:
+        self._com_thread.submit(self._refresh, file_path).result()
+
+    def close(self) -> None:
+        self._com_thread.submit(self._quit).result(timeout=self.response_timeout)
+
+    def kill(self) -> None:
+        """Kill the Excel process of the engine, e.g. when it is hung in a refresh."""
+        self._kill()
+        # The COM object is released in the thread owning it, once any hung call has failed
+        self._com_thread.submit(self._forget)
+
+    def is_healthy(self) -> bool:
+        """Check that Excel isn't running or answers within the response timeout with no workbooks left open."""
+        def check() -> bool:
+            return self._excel is None or (bool(self._excel.Ready) and self._excel.Workbooks.Count == 0)
+
+        try:
+            return self._com_thread.submit(check).result(timeout=self.response_timeout)
+        # A hung or crashed Excel just means the engine isn't healthy
+        # pylint: disable-next = broad-exception-caught
+        except Exception:
+            return False
+
+    def summary(self) -> str:
+        return f"{super().summary()} Excel was started {self.starts} times."
+
+    def _refresh(self, file_path: str) -> None:
+        if self._excel is None:
+            self._start()
+
+        try:
+            workbook = self._excel.Workbooks.Open(os.path.abspath(file_path))
+            try:
+                # Refresh all and wait until the refresh is complete
+                workbook.RefreshAll()
+                self._excel.CalculateUntilAsyncQueriesDone()
+                workbook.Save()
+            finally:
+                workbook.Close(SaveChanges=False)
+                del workbook
+        except Exception:
+            # Don't trust an Excel instance that has failed
+            self._quit()
+            raise
+
+        self.refreshed += 1
+        self._workbooks_since_start += 1
+        if self._workbooks_since_start >= self.recycle_after:
+            self._quit()
+
+    def _start(self) -> None:
+        # pywin32 only exists on Windows
+        # pylint: disable-next = import-outside-toplevel, import-error
+        import win32com.client
+        # pylint: disable-next = import-outside-toplevel, import-error
+        import win32process
+
+        self._excel = win32com.client.DispatchEx("Excel.Application")
+        self._excel.Visible = False
+        self._excel.DisplayAlerts = False
+        _, self._pid = win32process.GetWindowThreadProcessId(self._excel.Hwnd)
+        self._workbooks_since_start = 0
+        self.starts += 1
+
+    def _quit(self) -> None:
+        if self._excel is None:
+            return
+        try:
+            self._excel.Quit()
+            self._pid = None
+        # Excel may be hung or already gone, so its process is killed to be sure
+        # pylint: disable-next = broad-exception-caught
+        except Exception:
+            self._kill()
+        self._excel = None
+
+    def _kill(self) -> None:
+        pid, self._pid = self._pid, None
+        if pid is not None:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+    def _forget(self) -> None:
+        self._excel = None
+
+
+class HeadlessRefreshEngine(RefreshEngine):
+    """Recalculates workbooks without Excel, e.g. to benchmark the process on Linux.
+    Formula cells are evaluated with pycel, and the results are written into the cached values
+    of the cells in the workbook XML. Everything else in the file, e.g. charts, images and styles,
+    is left byte for byte as it was, since the workbook isn't loaded and saved with openpyxl.
+    Workbooks the engine can't refresh correctly, i.e. with data connections, external links,
+    pivot caches or formulas pycel can't evaluate, raise an error and are left unchanged.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.formula_cells = 0
+        self.formula_errors = 0
+
+    def refresh(self, file_path: str) -> None:
+        with zipfile.ZipFile(file_path) as archive:
+            names = archive.namelist()
+            unsupported = [name for name in names if name.startswith(_UNSUPPORTED_PARTS)]
+            if unsupported:
+                raise RuntimeError(f"The headless refresh engine can't refresh {file_path}, which contains {', '.join(unsupported)}. Use the COM engine.")
+            sheet_parts = _sheet_parts(archive)
+
+        values = self._evaluate(file_path)
+
+        cells_by_part: dict[str, dict[str, object]] = {}
+        for address, value in values.items():
+            sheet, cell = address.rsplit("!", 1)
+            cells_by_part.setdefault(sheet_parts[sheet.strip("'")], {})[cell.replace("$", "")] = value
+
+        # Write a copy next to the workbook and replace the workbook only when the copy is complete
+        temp_path = f"{file_path}.refresh"
+        with zipfile.ZipFile(file_path) as source, zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                data = source.read(info)
+                if info.filename in cells_by_part:
+                    data = _set_cached_values(data.decode("utf-8"), cells_by_part[info.filename]).encode("utf-8")
+                elif info.filename == "xl/workbook.xml":
+                    data = _set_full_calc_on_load(data.decode("utf-8")).encode("utf-8")
+                target.writestr(info, data)
+        os.replace(temp_path, file_path)
+        self.refreshed += 1
+
+    def summary(self) -> str:
+        return f"{super().summary()} Evaluated {self.formula_cells} formula cells, {self.formula_errors} of them Excel errors."
+
+    def _evaluate(self, file_path: str) -> dict[str, object]:
+        """Evaluate all formula cells of a workbook with pycel.
+
+        Returns:
+            The values by cell address, e.g. 'Sheet1!B2'.
+
+        Raises:
+            RuntimeError: If pycel isn't installed or can't evaluate a formula.
+        """
+        try:
+            # pylint: disable-next = import-outside-toplevel
+            from pycel import ExcelCompiler
+        except ImportError as error:
+            raise RuntimeError("The headless refresh engine needs pycel. Install the 'headless' extra.") from error
+        # pylint: disable-next = import-outside-toplevel
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            formula_cells = [
+                f"{sheet.title}!{cell.coordinate}"
+                for sheet in workbook.worksheets
+                for row in sheet.iter_rows()
+                for cell in row
+                if cell.data_type == "f"
+            ]
+        finally:
+            workbook.close()
+
+        compiler = ExcelCompiler(filename=file_path)
+        values = {}
+        failed = []
+        for address in formula_cells:
+            try:
+                values[address] = compiler.evaluate(address)
+            # pycel raises a range of exceptions for unsupported formulas
+            # pylint: disable-next = broad-exception-caught
+            except Exception as error:
+                failed.append(f"{address} ({error!r})")
+        if failed:
+            raise RuntimeError(f"pycel couldn't evaluate {len(failed)} formula cells: {', '.join(failed[:10])}")
+
+        self.formula_cells += len(values)
+        self.formula_errors += sum(1 for value in values.values() if _is_excel_error(value))
+        return values
+
+
+# Parts of a workbook only Excel can refresh
+_UNSUPPORTED_PARTS = ("xl/connections.xml", "xl/externalLinks/", "xl/pivotCache/")
+_EXCEL_ERRORS = ("#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A", "#GETTING_DATA")
+_RELATIONSHIP_NAMESPACE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+_CELL = re.compile(r"<c\b([^>]*?)(/>|>(.*?)</c>)", re.DOTALL)
+_CELL_REFERENCE = re.compile(r'\br="([A-Z]+[0-9]+)"')
+_CELL_TYPE = re.compile(r'\s+t="[^"]*"')
+_FORMULA = re.compile(r"<f\b[^>]*?(?:/>|>.*?</f>)", re.DOTALL)
+_VALUE = re.compile(r"<v\s*/>|<v>.*?</v>", re.DOTALL)
+
+
+def _sheet_parts(archive: zipfile.ZipFile) -> dict[str, str]:
+    """Get the paths in the archive of the worksheets of a workbook by sheet name."""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    relationships = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {relationship.get("Id"): relationship.get("Target") for relationship in relationships}
+    parts = {}
+    for sheet in workbook.iter():
+        if sheet.tag.endswith("}sheet"):
+            target = targets[sheet.get(f"{{{_RELATIONSHIP_NAMESPACE}}}id")]
+            parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+
+def _set_cached_values(sheet_xml: str, values: dict[str, object]) -> str:
+    """Set the cached values of formula cells in the XML of a worksheet, leaving the rest of the XML unchanged.
+
+    Args:
+        sheet_xml: The XML of the worksheet.
+        values: The values by cell reference, e.g. 'B2'.
+    """
+    def replace(match: re.Match) -> str:
+        attributes, content = match.group(1), match.group(3)
+        reference = _CELL_REFERENCE.search(attributes)
+        if content is None or reference is None or reference.group(1) not in values:
+            return match.group(0)
+        formula = _FORMULA.search(content)
+        if formula is None:
+            return match.group(0)
+
+        cell_type, text = _cached_value(values[reference.group(1)])
+        attributes = _CELL_TYPE.sub("", attributes) + (f' t="{cell_type}"' if cell_type else "")
+        content = _VALUE.sub("", content)
+        content = content[:formula.end()] + f"<v>{xml.sax.saxutils.escape(text)}</v>" + content[formula.end():]
+        return f"<c{attributes}>{content}</c>"
+
+    return _CELL.sub(replace, sheet_xml)
+
+
+def _cached_value(value) -> tuple[str | None, str]:
+    """Get the cell type and text of a cached value in the worksheet XML."""
+    if isinstance(value, bool):
+        return "b", "1" if value else "0"
+    if value is None:
+        return None, "0"
+    if isinstance(value, (int, float)):
+        return None, repr(value)
+    if _is_excel_error(value):
+        return "e", value
+    return "str", str(value)
+
+
+def _set_full_calc_on_load(workbook_xml: str) -> str:
+    """Mark the workbook to be fully recalculated when it is opened in Excel, if it has calculation properties."""
+    def replace(match: re.Match) -> str:
+        element = re.sub(r'\s+fullCalcOnLoad="[^"]*"', "", match.group(0))
+        return element.replace("<calcPr", '<calcPr fullCalcOnLoad="1"', 1)
+
+    return re.sub(r"<calcPr\b[^>]*>", replace, workbook_xml, count=1)
+
+
+def _is_excel_error(value) -> bool:
+    return isinstance(value, str) and value in _EXCEL_ERRORS
+
+
+# pylint: disable-next = invalid-name
+_engine: RefreshEngine | None = None
+
+
+def get_engine() -> RefreshEngine:
+    """Get the refresh engine of the run, creating it on first use.
+    The engine is chosen by config.REFRESH_ENGINE: 'com' or 'headless'.
+    """
+    global _engine  # pylint: disable=global-statement
+    if _engine is None:
+        if config.REFRESH_ENGINE == "com":
+            _engine = ComRefreshEngine(config.REFRESH_RECYCLE_AFTER, config.EXCEL_RESPONSE_TIMEOUT)
+        elif config.REFRESH_ENGINE == "headless":
+            _engine = HeadlessRefreshEngine()
+        else:
+            raise ValueError(f"Unknown refresh engine: {config.REFRESH_ENGINE}")
+    return _engine
+
+
+def close_engine(orchestrator_connection: OrchestratorConnection) -> None:
+    """Close the refresh engine, if it has been used, and log what it did.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    if _engine is not None:
+        _engine.close()
+        if _engine.refreshed:
+            orchestrator_connection.log_info(_engine.summary())
+
+
+def kill_engine() -> None:
+    """Forcefully close the refresh engine, if it has been used."""
+    if _engine is not None:
+        _engine.kill()
+
+
+def engine_is_healthy() -> bool:
+    """Check that the refresh engine, if it has been used, can refresh the next workbook."""
+    return _engine is None or _engine.is_healthy()
+
+
+def _initialize_com() -> None:
+    """Initialize COM in the thread calling Excel."""
+    # pywin32 only exists on Windows
+    # pylint: disable-next = import-outside-toplevel, import-error
+    import pythoncom
+
+    pythoncom.CoInitialize()
@@ -1,32 +1,210 @@
-"""This module handles resetting the state of the computer so the robot can work with a clean slate."""
+"""This module handles resetting the state of the computer so the robot can work with a clean slate.
+
+Applications used by the robot are registered with register_application together with
+hooks to close, kill, open and health check them. Independent applications are closed,
+killed and opened in parallel, and an application is ready when its health check passes.
+A reset is skipped when every application passes its health check, e.g. when the
+previous attempt failed because of a transient HTTP error, but never when no applications are registered.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
+from robot_framework import config
+from robot_framework import tracing
+
+
+@dataclass
+class Application:
+    """An application managed by the robot.
+    The hooks are run in worker threads, so hooks using COM must initialize it in the thread.
+
+    Args:
+        name: The name of the application, used in logs and in depends_on.
+        open: Starts the application. It doesn't need to wait until the application is ready.
+        close: Gracefully closes the application.
+        kill: Forcefully closes the application, e.g. by killing its process.
+        health_check: Returns whether the application is open and working.
+            Without a health check the application is never considered healthy
+            before it has been opened, so the reset is never skipped.
+        depends_on: The names of applications that must be opened before this one and closed after it.
+    """
+    name: str
+    open: Callable[[], None] | None = None
+    close: Callable[[], None] | None = None
+    kill: Callable[[], None] | None = None
+    health_check: Callable[[], bool] | None = None
+    depends_on: tuple[str, ...] = ()
+
+
+_applications: dict[str, Application] = {}
+# The duration of the last full reset, which is the time saved when a reset is skipped
+# pylint: disable-next = invalid-name
+_last_reset_seconds: float | None = None
+
+
+def register_application(application: Application) -> None:
+    """Register an application to be managed by the reset functions.
+
+    Args:
+        application: The application and its hooks.
+    """
+    for dependency in application.depends_on:
+        if dependency not in _applications:
+            raise ValueError(f"{application.name} depends on {dependency}, which isn't registered.")
+    _applications[application.name] = application
+
+
+def reset(orchestrator_connection: OrchestratorConnection, force: bool = False) -> None:
+    """Clean up, close/kill all programs and start them again.
+    The reset is skipped if a full reset has been done before and all applications pass their health checks.
+    It is never skipped when no applications are registered, since there is nothing to check.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        force: Whether to reset even if all applications are healthy.
+    """
+    if not force and config.SKIP_HEALTHY_RESET and _last_reset_seconds is not None and _applications:
+        with tracing.span("reset.health_check"):
+            unhealthy = _unhealthy_applications(list(_applications.values()))
+        if not unhealthy:
+            orchestrator_connection.log_info(f"Skipped reset since all applications are healthy. Saved about {_last_reset_seconds:.1f} seconds.")
+            return
+        orchestrator_connection.log_trace(f"Unhealthy applications: {', '.join(unhealthy)}")
+
+    _full_reset(orchestrator_connection)
+
+
+@tracing.traced("reset.reset")
+def _full_reset(orchestrator_connection: OrchestratorConnection) -> None:
+    global _last_reset_seconds  # pylint: disable=global-statement
 
-def reset(orchestrator_connection: OrchestratorConnection) -> None:
-    """Clean up, close/kill all programs and start them again. """
     orchestrator_connection.log_trace("Resetting.")
+    start = time.perf_counter()
     clean_up(orchestrator_connection)
     close_all(orchestrator_connection)
     kill_all(orchestrator_connection)
     open_all(orchestrator_connection)
+    _last_reset_seconds = time.perf_counter() - start
 
 
+@tracing.traced()
 def clean_up(orchestrator_connection: OrchestratorConnection) -> None:
     """Do any cleanup needed to leave a blank slate."""
     orchestrator_connection.log_trace("Doing cleanup.")
 
 
+@tracing.traced()
 def close_all(orchestrator_connection: OrchestratorConnection) -> None:
-    """Gracefully close all applications used by the robot."""
+    """Gracefully close all applications used by the robot.
+    Applications are closed before the applications they depend on. Errors are logged and ignored,
+    since kill_all takes care of applications that fail to close.
+    """
     orchestrator_connection.log_trace("Closing all applications.")
+    for wave in reversed(_dependency_waves()):
+        _run_hooks(orchestrator_connection, [(app.name, app.close) for app in wave if app.close], raise_errors=False)
 
 
+@tracing.traced()
 def kill_all(orchestrator_connection: OrchestratorConnection) -> None:
-    """Forcefully close all applications used by the robot."""
+    """Forcefully close all applications used by the robot. Errors are logged and ignored."""
     orchestrator_connection.log_trace("Killing all applications.")
+    applications = [(app.name, app.kill) for app in _applications.values() if app.kill]
+    _run_hooks(orchestrator_connection, applications, raise_errors=False)
 
 
+@tracing.traced()
 def open_all(orchestrator_connection: OrchestratorConnection) -> None:
-    """Open all programs used by the robot."""
+    """Open all programs used by the robot.
+    Applications are opened after the applications they depend on, and each wave of applications
+    is waited for until their health checks pass or config.APP_READY_TIMEOUT is exceeded.
+
+    Raises:
+        RuntimeError: If an application isn't ready before the timeout.
+    """
     orchestrator_connection.log_trace("Opening all applications.")
+    for wave in _dependency_waves():
+        _run_hooks(orchestrator_connection, [(app.name, app.open) for app in wave if app.open], raise_errors=True)
+        _wait_until_healthy(wave)
+
+
+def _dependency_waves() -> list[list[Application]]:
+    """Group the applications so each group only depends on the groups before it."""
+    waves = []
+    done = set()
+    remaining = dict(_applications)
+    while remaining:
+        wave = [app for app in remaining.values() if all(dependency in done for dependency in app.depends_on)]
+        if not wave:
+            raise ValueError(f"Circular dependencies between applications: {', '.join(remaining)}")
+        waves.append(wave)
+        for app in wave:
+            done.add(app.name)
+            del remaining[app.name]
+    return waves
+
+
+def _run_hooks(orchestrator_connection: OrchestratorConnection, hooks: list[tuple[str, Callable[[], None]]], raise_errors: bool) -> None:
+    """Run hooks in parallel and wait for all of them.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        hooks: The application names and hooks to run.
+        raise_errors: Whether to raise the first error after all hooks are done. Otherwise errors are only logged.
+    """
+    if not hooks:
+        return
+
+    with ThreadPoolExecutor(max_workers=len(hooks), thread_name_prefix="reset") as executor:
+        futures = [(name, executor.submit(hook)) for name, hook in hooks]
+
+    first_error = None
+    for name, future in futures:
+        error = future.exception()
+        if error:
+            orchestrator_connection.log_trace(f"{name}: {error!r}")
+            first_error = first_error or error
+    if first_error and raise_errors:
+        raise first_error
+
+
+def _wait_until_healthy(applications: list[Application]) -> None:
+    """Poll the health checks of the applications until they all pass.
+
+    Raises:
+        RuntimeError: If an application isn't healthy within config.APP_READY_TIMEOUT seconds.
+    """
+    deadline = time.monotonic() + config.APP_READY_TIMEOUT
+    waiting = [app for app in applications if app.health_check]
+    while waiting:
+        waiting = [_applications[name] for name in _unhealthy_applications(waiting)]
+        if waiting and time.monotonic() > deadline:
+            raise RuntimeError(f"Applications not ready after {config.APP_READY_TIMEOUT} seconds: {', '.join(app.name for app in waiting)}")
+        if waiting:
+            time.sleep(config.APP_HEALTH_POLL_INTERVAL)
+
+
+def _unhealthy_applications(applications: list[Application]) -> list[str]:
+    """Run the health checks of the applications in parallel.
+    Applications without a health check count as unhealthy, and so do health checks raising an error.
+
+    Returns:
+        The names of the unhealthy applications.
+    """
+    def is_healthy(app: Application) -> bool:
+        try:
+            return bool(app.health_check and app.health_check())
+        # A failing health check just means the application isn't healthy
+        # pylint: disable-next = broad-exception-caught
+        except Exception:
+            return False
+
+    if not applications:
+        return []
+    with ThreadPoolExecutor(max_workers=len(applications), thread_name_prefix="health_check") as executor:
+        results = list(executor.map(is_healthy, applications))
+    return [app.name for app, healthy in zip(applications, results) if not healthy]
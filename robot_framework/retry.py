@@ -0,0 +1,159 @@
+"""This module applies the retry policy in config.RETRY_RULES.
+
+A rule matches an exception by the qualified name of its class or one of its base classes,
+and optionally by the HTTP status code of its response. Steps like a download or an upload
+are run with run_step, which retries a failing step according to the rule matching the error
+before the error escalates to the framework and a full reset. The framework waits with
+wait_before_reset between its attempts, so a struggling server isn't hit again immediately.
+Waits grow exponentially and use full jitter, so robots running in parallel don't retry in step.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+from robot_framework import tracing
+
+T = TypeVar("T")
+
+
+@dataclass
+class RetryRule:
+    """A rule for retrying errors. See config.RETRY_RULES.
+
+    Args:
+        exception: The qualified name of the exception class the rule applies to, including subclasses.
+        status_codes: The HTTP status codes the rule applies to. Empty means any error of the class.
+        step_retries: The number of times a failing step is retried before the error escalates.
+        base_delay: The maximum wait in seconds before the first retry.
+        max_delay: The maximum wait in seconds before any retry.
+    """
+    exception: str
+    status_codes: tuple[int, ...] = ()
+    step_retries: int = 0
+    base_delay: float = 0
+    max_delay: float = 0
+
+    def matches(self, error: BaseException) -> bool:
+        """Check if the rule applies to an error."""
+        class_names = {f"{cls.__module__}.{cls.__qualname__}" for cls in type(error).__mro__}
+        if self.exception not in class_names:
+            return False
+        if not self.status_codes:
+            return True
+        response = getattr(error, "response", None)
+        return response is not None and response.status_code in self.status_codes
+
+    def delay(self, attempt: int) -> float:
+        """Get a random wait in seconds before a retry.
+
+        Args:
+            attempt: The number of the retry, starting at 1.
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+@dataclass
+class RetryStats:
+    """Counts the retries of a run.
+
+    Args:
+        step_retries: The number of retries per step name.
+        escalations: The number of errors that escalated to the framework after the step retries were used.
+        resets: The number of times the framework waited before a new attempt.
+        backoff_seconds: The total time spent waiting before retries.
+    """
+    step_retries: dict[str, int] = field(default_factory=dict)
+    escalations: int = 0
+    resets: int = 0
+    backoff_seconds: float = 0
+
+    def summary(self) -> str:
+        """A short description of the retries of the run."""
+        steps = ", ".join(f"{name}: {count}" for name, count in sorted(self.step_retries.items())) or "none"
+        return (f"Step retries ({steps}). {self.escalations} errors escalated, "
+                f"{self.resets} framework retries, {self.backoff_seconds:.1f} seconds of backoff.")
+
+
+_rules = [RetryRule(**rule) for rule in config.RETRY_RULES]
+_stats = RetryStats()
+_stats_lock = threading.Lock()
+
+
+def find_rule(error: BaseException) -> RetryRule | None:
+    """Get the first rule in config.RETRY_RULES matching an error, if any."""
+    for rule in _rules:
+        if rule.matches(error):
+            return rule
+    return None
+
+
+def run_step(name: str, step: Callable[[], T]) -> T:
+    """Run a step, retrying it according to the rule matching any error it raises.
+
+    Args:
+        name: The name of the step, e.g. 'download'. Used for the statistics.
+        step: The function to run. It must be safe to call again after it has failed.
+
+    Returns:
+        The return value of the step.
+    """
+    attempt = 0
+    while True:
+        try:
+            return step()
+        # Errors not matching a rule are raised again
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            rule = find_rule(error)
+            if rule is None or attempt >= rule.step_retries:
+                if rule is not None and rule.step_retries:
+                    with _stats_lock:
+                        _stats.escalations += 1
+                raise
+
+            attempt += 1
+            delay = rule.delay(attempt)
+            with _stats_lock:
+                _stats.step_retries[name] = _stats.step_retries.get(name, 0) + 1
+                _stats.backoff_seconds += delay
+            with tracing.span("retry.backoff", step=name):
+                time.sleep(delay)
+
+
+def wait_before_reset(error: BaseException, error_count: int) -> None:
+    """Wait before the framework makes a new attempt after an error, if the error matches a rule.
+    Nothing is waited after the last attempt.
+
+    Args:
+        error: The error that ended the attempt.
+        error_count: The number of errors so far in the run, used as the attempt of the backoff.
+    """
+    if error_count >= config.MAX_RETRY_COUNT:
+        return
+
+    rule = find_rule(error)
+    delay = rule.delay(error_count) if rule else 0
+    with _stats_lock:
+        _stats.resets += 1
+        _stats.backoff_seconds += delay
+    if delay:
+        with tracing.span("retry.backoff", step="reset"):
+            time.sleep(delay)
+
+
+def finish(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the retry statistics of the run and reset them.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    global _stats  # pylint: disable=global-statement
+    with _stats_lock:
+        stats, _stats = _stats, RetryStats()
+    orchestrator_connection.log_info(stats.summary())
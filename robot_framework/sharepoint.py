@@ -0,0 +1,747 @@
+"""This module contains the shared helpers for working with SharePoint through a ClientContext.
+All requests are sent through the governor in throttling, which honours throttling by SharePoint.
+Downloads, uploads, copies and moves go through the asyncio backend in sharepoint_async
+when config.SHAREPOINT_IO_BACKEND allows it, and these functions are its blocking facade.
+download_files and upload_files run many transfers concurrently.
+office365 is imported on first use, so importing the module doesn't slow down the start of the robot.
+"""
+
+from __future__ import annotations
+
+import functools
+import math
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import IO, TYPE_CHECKING, Callable, Iterator, TypeVar
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from requests import RequestException
+
+from robot_framework import config
+from robot_framework import retry
+from robot_framework import throttling
+from robot_framework import tracing
+
+if TYPE_CHECKING:
+    from office365.sharepoint.client_context import ClientContext
+    from office365.sharepoint.files.file import File
+
+T = TypeVar("T")
+
+# Authenticated clients by (site url, username) with the time they were created
+_clients: dict[tuple[str, str], tuple[ClientContext, float]] = {}
+_clients_lock = threading.Lock()
+
+# Server relative urls of document library root folders by (site url, library title)
+_library_roots: dict[tuple[str, str], str] = {}
+# Folders known to exist by (site url, server relative url)
+_ensured_folders: set[tuple[str, str]] = set()
+
+
+def get_client(sharepoint_site_url: str, username: str, password: str,
+               orchestrator_connection: OrchestratorConnection | None = None, verify: bool = False) -> ClientContext:
+    """Get an authenticated client for a SharePoint site.
+    Clients are kept for the rest of the run and reused together with their cached tokens,
+    so the robot only authenticates again when a client is older than config.SHAREPOINT_CLIENT_MAX_AGE
+    or has been invalidated.
+
+    Args:
+        sharepoint_site_url: The url of the SharePoint site.
+        username: The username to authenticate with.
+        password: The password to authenticate with.
+        orchestrator_connection: The connection to OpenOrchestrator used to log the verification.
+        verify: Whether to verify a new client by loading the site title. This costs an extra round trip.
+            Reused clients aren't verified again.
+
+    Returns:
+        The client for the site.
+    """
+    # pylint: disable-next = import-outside-toplevel, redefined-outer-name
+    from office365.sharepoint.client_context import ClientContext
+    # pylint: disable-next = import-outside-toplevel
+    from office365.runtime.auth.user_credential import UserCredential
+
+    key = (sharepoint_site_url, username)
+    with _clients_lock:
+        client, created = _clients.get(key, (None, 0))
+        is_new = client is None or time.monotonic() - created > config.SHAREPOINT_CLIENT_MAX_AGE
+        if is_new:
+            client = ClientContext(sharepoint_site_url).with_credentials(UserCredential(username, password))
+            _clients[key] = (client, time.monotonic())
+
+    if verify and is_new:
+        web = throttling.call(lambda: client.web.get().execute_query())
+        if orchestrator_connection:
+            orchestrator_connection.log_info(f"Authenticated successfully. Site Title: {web.properties['Title']}")
+
+    return client
+
+
+def invalidate_client(sharepoint_site_url: str, username: str) -> None:
+    """Forget the client of a site so the next call to get_client authenticates again.
+
+    Args:
+        sharepoint_site_url: The url of the SharePoint site.
+        username: The username the client was authenticated with.
+    """
+    with _clients_lock:
+        _clients.pop((sharepoint_site_url, username), None)
+
+
+def is_unauthorized(error: Exception) -> bool:
+    """Check if an error is a 401 Unauthorized response from SharePoint, from ClientContext or the asyncio backend."""
+    response = getattr(error, "response", None)
+    return isinstance(error, RequestException) and response is not None and response.status_code == 401
+
+
+def with_reauthentication(sharepoint_site_url: str, username: str, password: str, action: Callable[[ClientContext], T],
+                          refresh_credentials: Callable[[], tuple[str, str]] | None = None, *,
+                          orchestrator_connection: OrchestratorConnection | None = None, verify: bool = False) -> T:
+    """Run an action with the client of a site.
+    If SharePoint responds 401 Unauthorized the client is replaced by a newly
+    authenticated one and the action is run once more.
+
+    Args:
+        sharepoint_site_url: The url of the SharePoint site.
+        username: The username to authenticate with.
+        password: The password to authenticate with.
+        action: A function taking the client as its only argument.
+        refresh_credentials: A function reading the username and password again after a 401 response,
+            e.g. from OpenOrchestrator bypassing orchestrator_cache. If None the same credentials are used.
+        orchestrator_connection: The connection to OpenOrchestrator used to log the verification.
+        verify: Whether to verify new clients, see get_client.
+
+    Returns:
+        The return value of the action.
+    """
+    try:
+        return action(get_client(sharepoint_site_url, username, password, orchestrator_connection, verify))
+    except RequestException as error:
+        if not is_unauthorized(error):
+            raise
+        invalidate_client(sharepoint_site_url, username)
+        if refresh_credentials:
+            username, password = refresh_credentials()
+        return action(get_client(sharepoint_site_url, username, password, orchestrator_connection, verify))
+
+
+def sharepoint_client(username: str, password: str, sharepoint_site_url: str,
+                      orchestrator_connection: OrchestratorConnection, verify: bool = True) -> ClientContext:
+    """Get an authenticated client for a SharePoint site with the arguments in the order the processes use.
+    The client is reused across calls, see get_client.
+
+    Args:
+        username: The username to authenticate with.
+        password: The password to authenticate with.
+        sharepoint_site_url: The url of the SharePoint site.
+        orchestrator_connection: The connection to OpenOrchestrator used to log the verification.
+        verify: Whether to verify a new client by loading the site title.
+
+    Returns:
+        The client for the site.
+    """
+    return get_client(sharepoint_site_url, username, password, orchestrator_connection, verify)
+
+
+def close_connections() -> None:
+    """Close the connections of the asyncio backend, if it has been used. Called at the end of the run."""
+    # pylint: disable-next = import-outside-toplevel
+    from robot_framework import sharepoint_async
+
+    sharepoint_async.close()
+
+
+def _use_async_backend() -> bool:
+    """Check if transfers, copies and moves go through the asyncio backend, see config.SHAREPOINT_IO_BACKEND."""
+    # pylint: disable-next = import-outside-toplevel
+    from robot_framework import sharepoint_async
+
+    if config.SHAREPOINT_IO_BACKEND == "auto":
+        return sharepoint_async.is_available()
+    if config.SHAREPOINT_IO_BACKEND not in ("async", "office365"):
+        raise ValueError(f"Unknown SharePoint I/O backend: {config.SHAREPOINT_IO_BACKEND}")
+    return config.SHAREPOINT_IO_BACKEND == "async"
+
+
+@dataclass
+class CrawlStats:
+    """Counters collected while crawling a folder tree in SharePoint."""
+    round_trips: int = 0
+    folders: int = 0
+    pruned: int = 0
+
+
+@dataclass
+class FolderListing:
+    """The content of a single SharePoint folder as seen by walk_folders.
+
+    Args:
+        url: The server relative url of the folder.
+        depth: The depth of the folder relative to the root of the walk. The root has depth 0.
+        files: The properties of each file in the folder.
+        folders: The properties of each subfolder in the folder.
+    """
+    url: str
+    depth: int
+    files: list[dict] = field(default_factory=list)
+    folders: list[dict] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        """The name of the folder."""
+        return self.url.rsplit("/", 1)[-1]
+
+
+def walk_folders(client: ClientContext, root_url: str, stats: CrawlStats | None = None) -> Iterator[FolderListing]:
+    """Walks a folder tree in SharePoint breadth-first.
+    All folders on the same level are loaded together with their files and subfolders
+    in a single $batch request, instead of several requests per folder.
+
+    Like os.walk the caller can remove entries from the 'folders' list of a listing
+    to avoid descending into those subfolders.
+
+    Args:
+        client: The SharePoint client to use.
+        root_url: The server relative url of the folder to start from.
+        stats: An optional CrawlStats object to count round trips and folders in.
+
+    Yields:
+        A FolderListing for each folder in the tree, level by level.
+    """
+    if stats is None:
+        stats = CrawlStats()
+
+    walk_client = client
+    failed = False
+
+    def send_level(level: list[tuple[str, int]]) -> list:
+        nonlocal walk_client, failed
+        # A failed batch can leave its queries in the client, so after a failure the rest of the walk uses a clean clone
+        if failed:
+            walk_client = client.clone(client.base_url)
+        failed = True
+
+        loaded = []
+        for url, depth in level:
+            folder = walk_client.web.get_folder_by_server_relative_url(url).expand(["Files", "Folders"]).get()
+            loaded.append((url, depth, folder))
+
+        walk_client.execute_batch(config.SHAREPOINT_BATCH_SIZE)
+        failed = False
+        return loaded
+
+    def load_level(level: list[tuple[str, int]]) -> list:
+        # The queries are built inside the action, since a throttled batch is sent again by the governor
+        loaded = throttling.call(lambda: send_level(level))
+        stats.round_trips += math.ceil(len(level) / config.SHAREPOINT_BATCH_SIZE)
+        return loaded
+
+    level = [(root_url, 0)]
+    while level:
+        loaded = retry.run_step("query", lambda level=level: load_level(level))
+
+        next_level = []
+        for url, depth, folder in loaded:
+            listing = FolderListing(
+                url=url,
+                depth=depth,
+                files=[file.properties for file in folder.files],
+                folders=[subfolder.properties for subfolder in folder.folders]
+            )
+            stats.folders += 1
+            yield listing
+
+            next_level.extend((f"{url}/{subfolder['Name']}", depth + 1) for subfolder in listing.folders)
+
+        level = next_level
+
+
+def server_relative_url(client: ClientContext, url: str) -> str:
+    """Get the server relative url of a url that is server relative or relative to the site of the client.
+
+    Args:
+        client: The SharePoint client of the site.
+        url: The url, e.g. "/sites/site/Delte dokumenter/folder" or "Delte dokumenter/folder".
+    """
+    if url.startswith("/"):
+        return url
+    site_path = urllib.parse.urlsplit(client.base_url).path.rstrip("/")
+    return f"{site_path}/{url}"
+
+
+def render_list_data(client: ClientContext, folder_url: str, view_xml: str, stats: CrawlStats | None = None) -> Iterator[dict]:
+    """Query the items under a folder with RenderListDataAsStream, one page at a time.
+    The view is run with the folder as its root, so a view with Scope="RecursiveAll"
+    returns all items in the subtree and its Where clause is evaluated by SharePoint.
+    The number of items per page is set by the RowLimit of the view.
+
+    Args:
+        client: The SharePoint client to use.
+        folder_url: The url of the folder to query, server relative or relative to the site.
+            Its first segment after the site is the document library.
+        view_xml: The CAML view to run, e.g. '<View Scope="RecursiveAll">...<RowLimit Paged="TRUE">5000</RowLimit></View>'.
+        stats: An optional CrawlStats object to count round trips in.
+
+    Yields:
+        The row of each item with the fields of the view, e.g. FileRef and FSObjType.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from office365.runtime.http.http_method import HttpMethod
+    # pylint: disable-next = import-outside-toplevel
+    from office365.runtime.http.request_options import RequestOptions
+
+    site_path = urllib.parse.urlsplit(client.base_url).path.rstrip("/")
+    folder_url = server_relative_url(client, folder_url)
+    library_url = "/".join(folder_url.split("/")[:site_path.count("/") + 2])
+    list_path = urllib.parse.quote(library_url.replace("'", "''"))
+    request_url = f"{client.base_url.rstrip('/')}/_api/web/GetList('{list_path}')/RenderListDataAsStream"
+
+    paging = None
+    while True:
+        parameters = {
+            "__metadata": {"type": "SP.RenderListDataParameters"},
+            "ViewXml": view_xml,
+            "FolderServerRelativeUrl": folder_url,
+            "RenderOptions": 2,  # ListData: only the rows and the paging information
+        }
+        if paging:
+            parameters["Paging"] = paging
+
+        request = RequestOptions(request_url)
+        request.method = HttpMethod.Post
+        request.set_header("Accept", "application/json;odata=verbose")
+        request.set_header("Content-Type", "application/json;odata=verbose")
+        request.data = {"parameters": parameters}
+        page = throttling.call(functools.partial(client.pending_request().execute_request_direct, request)).json()
+        if stats:
+            stats.round_trips += 1
+        yield from page.get("Row", [])
+
+        paging = page.get("NextHref", "").lstrip("?")
+        if not paging:
+            return
+
+
+def download_file(client: ClientContext, sharepoint_file_url: str) -> tempfile.SpooledTemporaryFile:
+    """Downloads a file from SharePoint into memory.
+    Files larger than config.DOWNLOAD_SPOOL_MAX_SIZE are moved to a temporary file on disk
+    which is deleted when the buffer is closed.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The server relative url of the file.
+
+    Returns:
+        A binary file-like object with the content of the file, positioned at the start.
+    """
+    # The buffer is closed by the caller
+    # pylint: disable-next = consider-using-with
+    buffer = tempfile.SpooledTemporaryFile(max_size=config.DOWNLOAD_SPOOL_MAX_SIZE)
+
+    def download():
+        # Start over if the download is sent again
+        buffer.seek(0)
+        buffer.truncate()
+        client.web.get_file_by_server_relative_path(sharepoint_file_url).download(buffer).execute_query()
+        tracing.add_bytes(buffer.tell())
+
+    try:
+        if _use_async_backend():
+            _run_async(client, lambda backend: backend.download(sharepoint_file_url, buffer))
+        else:
+            throttling.call(download)
+    except Exception:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
+
+
+def download_file_to_path(client: ClientContext, sharepoint_file_url: str, local_file_path: str) -> str:
+    """Downloads a file from SharePoint directly to a path on disk.
+    Only use this when the consumer of the file needs a path, otherwise use download_file.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The server relative url of the file.
+        local_file_path: The path to save the file at.
+
+    Returns:
+        The path of the downloaded file.
+    """
+    def download():
+        with open(local_file_path, "wb") as local_file:
+            client.web.get_file_by_server_relative_path(sharepoint_file_url).download(local_file).execute_query()
+            tracing.add_bytes(local_file.tell())
+
+    if _use_async_backend():
+        return _run_async(client, lambda backend: backend.download_to_path(sharepoint_file_url, local_file_path))
+    throttling.call(download)
+    return local_file_path
+
+
+def download_file_from_sharepoint(client: ClientContext, sharepoint_file_url: str, local_file_name: str | None = None) -> str:
+    """Downloads a file from SharePoint into the working directory and returns the local file path.
+    The file keeps its name from SharePoint unless a local_file_name is given.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The server relative url of the file.
+        local_file_name: The name of the local file. An absolute path saves the file outside the working directory.
+
+    Returns:
+        The path of the downloaded file.
+    """
+    file_name = local_file_name or sharepoint_file_url.split("/")[-1]
+    return download_file_to_path(client, sharepoint_file_url, os.path.join(os.getcwd(), file_name))
+
+
+def upload_file_to_sharepoint(client: ClientContext, sharepoint_file_url: str, local_file_path: str) -> UploadStats:
+    """Uploads a local file to a url in SharePoint, replacing any existing file, and returns the statistics of the upload.
+    The counterpart of download_file_from_sharepoint, see upload_file.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The url of the file in SharePoint, including its folder and name.
+        local_file_path: The path of the file to upload.
+
+    Returns:
+        The statistics of the upload.
+    """
+    sharepoint_folder_url, file_name = sharepoint_file_url.rsplit("/", 1)
+    return upload_file(client, sharepoint_folder_url, file_name, local_file_path)
+
+
+def download_files(client: ClientContext, files: list[tuple[str, str]]) -> list[str]:
+    """Downloads many files from SharePoint to paths on disk concurrently.
+    With the asyncio backend all downloads are started at once and sent as the governor allows.
+    Otherwise they are spread over threads with a clone of the client each, limited by the governor.
+    All downloads are finished or failed before the first error, if any, is raised.
+
+    Args:
+        client: The SharePoint client to use.
+        files: The server relative url of each file and the path to save it at.
+
+    Returns:
+        The paths of the downloaded files in the order of files.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from robot_framework import sharepoint_async
+
+    if _use_async_backend():
+        return _run_async(client, lambda backend: sharepoint_async.gather_all([backend.download_to_path(url, path) for url, path in files]))
+    return _run_in_threads(client, lambda worker_client, item: download_file_to_path(worker_client, *item), files)
+
+
+@dataclass
+class UploadStats:
+    """The result of an upload with sharepoint.upload_file.
+
+    Args:
+        url: The server relative url of the uploaded file.
+        size: The size of the file in bytes.
+        chunks: The number of requests the content was sent in.
+        retries: The number of chunks that had to be sent again.
+        seconds: The time the upload took.
+    """
+    url: str
+    size: int
+    chunks: int = 0
+    retries: int = 0
+    seconds: float = 0
+
+    def summary(self) -> str:
+        """A short description of the upload and its throughput."""
+        throughput = self.size / 1024 / 1024 / self.seconds if self.seconds else 0
+        return (f"Uploaded {self.size} bytes to {self.url} in {self.chunks} chunks with {self.retries} retries "
+                f"in {self.seconds:.1f} s ({throughput:.2f} MB/s).")
+
+
+def upload_file(client: ClientContext, sharepoint_folder_url: str, file_name: str, local_file_path: str) -> UploadStats:
+    """Uploads a local file to a folder in SharePoint, replacing any existing file with the same name.
+    Files up to config.CHUNKED_UPLOAD_THRESHOLD bytes are sent in a single request.
+    Larger files are sent in chunks of config.UPLOAD_CHUNK_SIZE bytes in an upload session,
+    so a failed request only means sending that chunk again instead of the whole file.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_folder_url: The server relative url of the folder to upload to.
+        file_name: The name of the file in SharePoint.
+        local_file_path: The path of the file to upload.
+
+    Returns:
+        The statistics of the upload.
+    """
+    if _use_async_backend():
+        return _run_async(client, lambda backend: backend.upload(sharepoint_folder_url, file_name, local_file_path))
+
+    stats = UploadStats(url=f"{sharepoint_folder_url}/{file_name}", size=os.path.getsize(local_file_path))
+    start = time.perf_counter()
+
+    with open(local_file_path, "rb") as local_file:
+        if stats.size <= max(config.CHUNKED_UPLOAD_THRESHOLD, config.UPLOAD_CHUNK_SIZE):
+            content = local_file.read()
+            target_folder = client.web.get_folder_by_server_relative_url(sharepoint_folder_url)
+            uploaded_file = throttling.call(lambda: target_folder.upload_file(file_name, content).execute_query())
+            stats.chunks = 1
+        else:
+            uploaded_file = _upload_in_chunks(client, sharepoint_folder_url, file_name, local_file, stats)
+
+    stats.url = uploaded_file.properties.get("ServerRelativeUrl") or stats.url
+    stats.seconds = time.perf_counter() - start
+    tracing.add_bytes(stats.size)
+    return stats
+
+
+def upload_files(client: ClientContext, uploads: list[tuple[str, str, str]]) -> list[UploadStats]:
+    """Uploads many local files to SharePoint concurrently, like download_files.
+
+    Args:
+        client: The SharePoint client to use.
+        uploads: The server relative url of the folder, the file name in SharePoint and the local path of each file.
+
+    Returns:
+        The statistics of each upload in the order of uploads.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from robot_framework import sharepoint_async
+
+    if _use_async_backend():
+        return _run_async(client, lambda backend: sharepoint_async.gather_all([backend.upload(*upload) for upload in uploads]))
+    return _run_in_threads(client, lambda worker_client, upload: upload_file(worker_client, *upload), uploads)
+
+
+def _upload_in_chunks(client: ClientContext, sharepoint_folder_url: str, file_name: str, local_file: IO[bytes], stats: UploadStats) -> File:
+    """Upload a file with StartUpload, ContinueUpload and FinishUpload.
+    The content of an existing file is only replaced when the last chunk is committed.
+    If the upload fails the session is cancelled and a file created for it is deleted.
+    """
+    target_file, created = _get_or_create_file(client, sharepoint_folder_url, file_name)
+    upload_id = str(uuid.uuid4())
+    offset = 0
+
+    try:
+        chunk = local_file.read(config.UPLOAD_CHUNK_SIZE)
+        while True:
+            next_chunk = local_file.read(config.UPLOAD_CHUNK_SIZE)
+            if offset == 0:
+                _send_chunk(client, lambda c=chunk: target_file.start_upload(upload_id, c), stats)
+            elif next_chunk:
+                _send_chunk(client, lambda c=chunk, o=offset: target_file.continue_upload(upload_id, o, c), stats)
+            else:
+                _send_chunk(client, lambda c=chunk, o=offset: target_file.finish_upload(upload_id, o, c), stats)
+                return target_file
+
+            offset += len(chunk)
+            chunk = next_chunk
+    except Exception:
+        # Clean up as well as possible. The original error is the interesting one.
+        def clean_up():
+            target_file.cancel_upload(upload_id)
+            if created:
+                target_file.delete_object()
+            client.execute_query()
+
+        try:
+            throttling.call(clean_up)
+        except RequestException:
+            pass
+        raise
+
+
+def _get_or_create_file(client: ClientContext, sharepoint_folder_url: str, file_name: str) -> tuple[File, bool]:
+    """Get a file in SharePoint, creating it empty if it doesn't exist.
+
+    Returns:
+        The file and whether it was created.
+    """
+    file_url = f"{sharepoint_folder_url}/{file_name}"
+    try:
+        return throttling.call(lambda: client.web.get_file_by_server_relative_url(file_url).get().execute_query()), False
+    except RequestException as error:
+        if error.response is None or error.response.status_code != 404:
+            raise
+
+    target_folder = client.web.get_folder_by_server_relative_url(sharepoint_folder_url)
+    return throttling.call(lambda: target_folder.upload_file(file_name, b"").execute_query()), True
+
+
+def _send_chunk(client: ClientContext, add_query: Callable[[], object], stats: UploadStats) -> None:
+    """Send a single chunk of an upload session.
+    Throttling is only retried by the governor. Other transient errors are retried
+    up to config.UPLOAD_CHUNK_RETRIES times with exponential backoff.
+
+    Args:
+        client: The SharePoint client to use.
+        add_query: A function adding the upload query of the chunk to the client.
+        stats: The statistics of the upload.
+    """
+    for attempt in range(config.UPLOAD_CHUNK_RETRIES + 1):
+        try:
+            throttling.call(lambda: (add_query(), client.execute_query()))
+            stats.chunks += 1
+            return
+        except RequestException as error:
+            if attempt == config.UPLOAD_CHUNK_RETRIES or not is_transient(error):
+                raise
+            stats.retries += 1
+            time.sleep(2 ** attempt)
+
+
+def is_transient(error: RequestException) -> bool:
+    """Check if a failed request is worth sending again: no response, a timeout or a server error.
+    Throttled responses aren't, since the governor in throttling has already sent them again.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    if response.status_code in throttling.THROTTLED_STATUS_CODES:
+        return False
+    return response.status_code == 408 or response.status_code >= 500
+
+
+def get_library_root_url(client: ClientContext, library_title: str) -> str:
+    """Get the server relative url of the root folder of a document library.
+    The url is looked up once per run and then cached.
+
+    Args:
+        client: The SharePoint client to use.
+        library_title: The title of the document library, e.g. "Dokumenter".
+
+    Returns:
+        The server relative url of the root folder of the library.
+    """
+    key = (client.base_url, library_title)
+    if key not in _library_roots:
+        root_folder = throttling.call(lambda: client.web.lists.get_by_title(library_title).root_folder.get().execute_query())
+        _library_roots[key] = root_folder.properties["ServerRelativeUrl"]
+    return _library_roots[key]
+
+
+def ensure_folders(client: ClientContext, folder_urls: list[str]) -> None:
+    """Make sure folders exist, creating the missing ones.
+    All folders are added in a single batched request, and folders ensured
+    earlier in the run are skipped without contacting SharePoint.
+
+    Args:
+        client: The SharePoint client to use.
+        folder_urls: The server relative urls of the folders. Parent folders must come before their subfolders.
+    """
+    missing = [url for url in folder_urls if (client.base_url, url) not in _ensured_folders]
+    if not missing:
+        return
+
+    def add_folders():
+        # Adding a folder that already exists returns the existing folder
+        for url in missing:
+            client.web.folders.add(url)
+        client.execute_batch(config.SHAREPOINT_BATCH_SIZE)
+
+    throttling.call(add_folders)
+
+    _ensured_folders.update((client.base_url, url) for url in missing)
+
+
+def copy_file(client: ClientContext, sharepoint_file_url: str, target_file_url: str, overwrite: bool = True) -> None:
+    """Copies a file to another location on the same site.
+    The copy is done by SharePoint, so the content isn't transferred by the robot.
+    Uses a single request, unlike File.copyto which resolves the urls first.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The server relative url of the file to copy.
+        target_file_url: The server relative url of the copy, including the file name.
+        overwrite: Whether to overwrite an existing file at the target url.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from office365.runtime.queries.service_operation import ServiceOperationQuery
+
+    if _use_async_backend():
+        _run_async(client, lambda backend: backend.copy(sharepoint_file_url, target_file_url, overwrite))
+        return
+
+    def copy():
+        source_file = client.web.get_file_by_server_relative_url(sharepoint_file_url)
+        client.add_query(ServiceOperationQuery(source_file, "CopyTo", {"strNewUrl": target_file_url, "bOverWrite": overwrite}))
+        client.execute_query()
+
+    throttling.call(copy)
+
+
+def move_file(client: ClientContext, sharepoint_file_url: str, target_file_url: str, overwrite: bool = True) -> None:
+    """Moves a file to another location on the same site.
+    Uses a single request like copy_file, unlike File.moveto which resolves the urls first.
+
+    Args:
+        client: The SharePoint client to use.
+        sharepoint_file_url: The server relative url of the file to move.
+        target_file_url: The server relative url to move the file to, including the file name.
+        overwrite: Whether to overwrite an existing file at the target url.
+    """
+    # pylint: disable-next = import-outside-toplevel
+    from office365.runtime.queries.service_operation import ServiceOperationQuery
+
+    if _use_async_backend():
+        _run_async(client, lambda backend: backend.move(sharepoint_file_url, target_file_url, overwrite))
+        return
+
+    def move():
+        source_file = client.web.get_file_by_server_relative_url(sharepoint_file_url)
+        # MoveOperations: 1 is Overwrite, 0 is None
+        client.add_query(ServiceOperationQuery(source_file, "MoveTo", {"newurl": target_file_url, "flags": int(overwrite)}))
+        client.execute_query()
+
+    throttling.call(move)
+
+
+def list_folder(client: ClientContext, folder_url: str) -> FolderListing:
+    """Lists the files and subfolders of a single folder. Use walk_folders to list a tree.
+
+    Args:
+        client: The SharePoint client to use.
+        folder_url: The server relative url of the folder.
+
+    Returns:
+        The listing of the folder with depth 0.
+    """
+    if _use_async_backend():
+        return _run_async(client, lambda backend: backend.list_folder(folder_url))
+
+    folder = throttling.call(lambda: client.web.get_folder_by_server_relative_url(folder_url).expand(["Files", "Folders"]).get().execute_query())
+    return FolderListing(
+        url=folder_url,
+        depth=0,
+        files=[file.properties for file in folder.files],
+        folders=[subfolder.properties for subfolder in folder.folders]
+    )
+
+
+def _run_async(client: ClientContext, operation: Callable) -> T:
+    """Run an operation on the asyncio backend of the site of a client and wait for it, see sharepoint_async.run."""
+    # pylint: disable-next = import-outside-toplevel
+    from robot_framework import sharepoint_async
+
+    return sharepoint_async.run(client, operation)
+
+
+def _run_in_threads(client: ClientContext, action: Callable[[ClientContext, object], T], items: list) -> list[T]:
+    """Run an action for each item in a pool of threads, each with its own clone of the client.
+    All actions are finished or failed before the first error, if any, is raised.
+    """
+    local = threading.local()
+
+    def run(item):
+        if not hasattr(local, "client"):
+            # ClientContext is not thread safe so each thread gets its own clone sharing the authentication
+            local.client = client.clone(client.base_url)
+        return action(local.client, item)
+
+    with ThreadPoolExecutor(max_workers=config.SHAREPOINT_MAX_CONCURRENCY, thread_name_prefix="sharepoint") as executor:
+        futures = [executor.submit(run, item) for item in items]
+    return [future.result() for future in futures]
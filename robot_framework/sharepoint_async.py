@@ -0,0 +1,486 @@
+"""This module contains the asyncio backend for SharePoint I/O.
+
+AsyncSharePoint sends REST requests to a site with aiohttp over a pool of keep-alive
+connections, so thousands of downloads, uploads, copies and moves can be in flight on
+a few sockets. Every request takes a slot of the governor in throttling, so the requests
+in flight follow its adaptive limit and its pause after throttled responses, together with
+the requests of ClientContext. It authenticates with the credentials of a ClientContext,
+so it shares the tokens or cookies of the clients from sharepoint.get_client. A backend
+only ever authenticates as one user: the shared backends are kept per site and
+authentication context, see run.
+
+Errors are raised as requests exceptions with the response attached, like the errors of
+ClientContext, so config.RETRY_RULES and the throttling and retry code treat both alike.
+
+The blocking functions in sharepoint are the facade for code that isn't async. They run
+the operations on shared backends in a background event loop, see run.
+aiohttp is imported on first use and is only needed when the backend is used.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import importlib.util
+import os
+import threading
+import time
+import urllib.parse
+import uuid
+from typing import IO, TYPE_CHECKING, Any, Awaitable, Callable, Coroutine, TypeVar
+
+import requests
+
+from robot_framework import config
+# sharepoint only imports this module on first use, so the cycle is harmless
+# pylint: disable-next = cyclic-import
+from robot_framework import sharepoint
+from robot_framework import throttling
+from robot_framework import tracing
+
+if TYPE_CHECKING:
+    import aiohttp
+    from office365.sharepoint.client_context import ClientContext
+
+T = TypeVar("T")
+
+# Files are streamed in chunks of this many bytes
+STREAM_CHUNK_SIZE = 1024 * 1024
+# The form digest is renewed this many seconds before it expires
+FORM_DIGEST_MARGIN = 60
+
+
+def is_available() -> bool:
+    """Check if aiohttp is installed, so the backend can be used."""
+    return importlib.util.find_spec("aiohttp") is not None
+
+
+# pylint: disable-next = too-many-instance-attributes
+class AsyncSharePoint:
+    """Sends SharePoint REST requests to a site with aiohttp.
+    Use it as an async context manager, or through the shared backends of run.
+    """
+
+    def __init__(self, client: ClientContext, connections: int | None = None):
+        """Create a backend for the site of a client. The connections are opened by open.
+
+        Args:
+            client: The authenticated client of the site.
+            connections: The maximum number of connections. Defaults to config.SHAREPOINT_ASYNC_CONNECTIONS.
+        """
+        self.client = client
+        self.base_url = client.base_url.rstrip("/")
+        self.connections = connections or config.SHAREPOINT_ASYNC_CONNECTIONS
+        self._session: aiohttp.ClientSession | None = None
+        self._auth_lock: asyncio.Lock | None = None
+        self._digest_lock: asyncio.Lock | None = None
+        self._auth_headers: dict[str, str] | None = None
+        # The form digest and the time.monotonic() it expires at
+        self._form_digest: tuple[str, float] | None = None
+
+    async def open(self) -> None:
+        """Open the pool of connections. Must be called in the event loop the backend is used in."""
+        # pylint: disable-next = import-outside-toplevel, redefined-outer-name
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.connections)
+        timeout = aiohttp.ClientTimeout(total=config.SHAREPOINT_ASYNC_TIMEOUT)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        self._auth_lock = asyncio.Lock()
+        self._digest_lock = asyncio.Lock()
+
+    async def close(self) -> None:
+        """Close the pool of connections."""
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> AsyncSharePoint:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def request(self, method: str, path: str, data: bytes | None = None,
+                      handler: Callable[[aiohttp.ClientResponse], Awaitable[T]] | None = None) -> T:
+        """Send a REST request in a slot of the governor in throttling.
+        Throttled responses pause all requests and are sent again like in throttling,
+        and a 401 Unauthorized response makes the backend authenticate again once.
+
+        Args:
+            method: The HTTP method.
+            path: The path of the REST call after /_api/, e.g. "web/GetFolderByServerRelativeUrl('...')".
+            data: The body of the request.
+            handler: An async function reading a successful response. Defaults to reading the JSON result.
+
+        Returns:
+            The return value of the handler.
+
+        Raises:
+            requests.HTTPError: If SharePoint responds with an error.
+            requests.ConnectionError: If the connection fails.
+            requests.Timeout: If the request takes longer than config.SHAREPOINT_ASYNC_TIMEOUT.
+        """
+        # pylint: disable-next = import-outside-toplevel, redefined-outer-name
+        import aiohttp
+
+        url = f"{self.base_url}/_api/{path}"
+        attempt = 0
+        reauthenticated = False
+        while True:
+            headers = {"Accept": "application/json;odata=verbose", **await self._headers()}
+            # The form digest is itself requested with a POST to contextinfo, which doesn't need one
+            if method != "GET" and path != "contextinfo":
+                headers["X-RequestDigest"] = await self._digest()
+
+            await throttling.acquire_async()
+            success = False
+            throttled_wait = None
+            try:
+                async with self._session.request(method, url, data=data, headers=headers) as response:
+                    if response.status in throttling.THROTTLED_STATUS_CODES and attempt < config.THROTTLE_MAX_RETRIES:
+                        throttled_wait = throttling.retry_after(response.headers, attempt, config.THROTTLE_MAX_WAIT)
+                        attempt += 1
+                        continue
+                    if response.status == 401 and not reauthenticated:
+                        reauthenticated = True
+                        await self._headers(refresh=True)
+                        continue
+                    if response.status >= 400:
+                        raise await _http_error(method, url, response)
+                    result = await (handler or _read_json)(response)
+                    success = True
+                    return result
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError) as error:
+                raise requests.ConnectionError(f"{method} {url}: {error!r}") from error
+            except asyncio.TimeoutError as error:
+                raise requests.Timeout(f"{method} {url} timed out after {config.SHAREPOINT_ASYNC_TIMEOUT} seconds.") from error
+            finally:
+                if throttled_wait is not None:
+                    throttling.release_throttled(throttled_wait)
+                else:
+                    throttling.release(success)
+
+    async def download(self, file_url: str, target: IO[bytes]) -> int:
+        """Download a file into a binary file object, starting over if the request is sent again.
+
+        Args:
+            file_url: The server relative url of the file.
+            target: The file object to write to.
+
+        Returns:
+            The size of the file in bytes.
+        """
+        async def write(response: aiohttp.ClientResponse) -> int:
+            # The file is written in a worker thread, so a slow disk doesn't block the other transfers
+            await asyncio.to_thread(target.seek, 0)
+            await asyncio.to_thread(target.truncate)
+            async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                await asyncio.to_thread(target.write, chunk)
+            return target.tell()
+
+        size = await self.request("GET", f"web/GetFileByServerRelativePath(DecodedUrl='{_quote(file_url)}')/$value", handler=write)
+        tracing.add_bytes(size)
+        return size
+
+    async def download_to_path(self, file_url: str, local_file_path: str) -> str:
+        """Download a file to a path on disk. The local file is only opened once the download starts.
+
+        Args:
+            file_url: The server relative url of the file.
+            local_file_path: The path to save the file at.
+
+        Returns:
+            The path of the downloaded file.
+        """
+        async def write(response: aiohttp.ClientResponse) -> int:
+            # The file is opened and written in a worker thread, so a slow disk doesn't block the other transfers
+            local_file = await asyncio.to_thread(open, local_file_path, "wb")
+            try:
+                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await asyncio.to_thread(local_file.write, chunk)
+                return local_file.tell()
+            finally:
+                await asyncio.to_thread(local_file.close)
+
+        size = await self.request("GET", f"web/GetFileByServerRelativePath(DecodedUrl='{_quote(file_url)}')/$value", handler=write)
+        tracing.add_bytes(size)
+        return local_file_path
+
+    async def list_folder(self, folder_url: str) -> sharepoint.FolderListing:
+        """List the files and subfolders of a folder.
+
+        Args:
+            folder_url: The server relative url of the folder.
+
+        Returns:
+            The listing of the folder with depth 0.
+        """
+        folder = await self.request("GET", f"web/GetFolderByServerRelativeUrl('{_quote(folder_url)}')?$expand=Files,Folders")
+        return sharepoint.FolderListing(
+            url=folder_url,
+            depth=0,
+            files=[_properties(file) for file in folder["Files"]["results"]],
+            folders=[_properties(subfolder) for subfolder in folder["Folders"]["results"]]
+        )
+
+    async def upload(self, folder_url: str, file_name: str, local_file_path: str) -> sharepoint.UploadStats:
+        """Upload a local file to a folder, replacing any existing file with the same name.
+        Like sharepoint.upload_file, files larger than config.CHUNKED_UPLOAD_THRESHOLD are sent in chunks.
+
+        Args:
+            folder_url: The server relative url of the folder to upload to.
+            file_name: The name of the file in SharePoint.
+            local_file_path: The path of the file to upload.
+
+        Returns:
+            The statistics of the upload.
+        """
+        stats = sharepoint.UploadStats(url=f"{folder_url}/{file_name}", size=os.path.getsize(local_file_path))
+        start = time.perf_counter()
+
+        with open(local_file_path, "rb") as local_file:
+            if stats.size <= max(config.CHUNKED_UPLOAD_THRESHOLD, config.UPLOAD_CHUNK_SIZE):
+                content = await asyncio.to_thread(local_file.read)
+                uploaded = await self.request("POST", f"{_files_path(folder_url)}/add(url='{_quote(file_name)}',overwrite=true)", content)
+                stats.chunks = 1
+            else:
+                uploaded = await self._upload_in_chunks(folder_url, file_name, local_file, stats)
+
+        stats.url = uploaded.get("ServerRelativeUrl") or stats.url
+        stats.seconds = time.perf_counter() - start
+        tracing.add_bytes(stats.size)
+        return stats
+
+    async def copy(self, file_url: str, target_file_url: str, overwrite: bool = True) -> None:
+        """Copy a file to another location on the site. The copy is made by SharePoint.
+
+        Args:
+            file_url: The server relative url of the file.
+            target_file_url: The server relative url of the copy, including the file name.
+            overwrite: Whether to overwrite an existing file at the target url.
+        """
+        await self.request("POST", f"{_file_path(file_url)}/CopyTo(strNewUrl='{_quote(target_file_url)}',bOverWrite={str(overwrite).lower()})")
+
+    async def move(self, file_url: str, target_file_url: str, overwrite: bool = True) -> None:
+        """Move a file to another location on the site.
+
+        Args:
+            file_url: The server relative url of the file.
+            target_file_url: The server relative url to move the file to, including the file name.
+            overwrite: Whether to overwrite an existing file at the target url.
+        """
+        # MoveOperations: 1 is Overwrite, 0 is None
+        await self.request("POST", f"{_file_path(file_url)}/MoveTo(newurl='{_quote(target_file_url)}',flags={int(overwrite)})")
+
+    async def _upload_in_chunks(self, folder_url: str, file_name: str, local_file: IO[bytes], stats: sharepoint.UploadStats) -> dict:
+        """Upload a file with StartUpload, ContinueUpload and FinishUpload like sharepoint._upload_in_chunks."""
+        file_url = f"{folder_url}/{file_name}"
+        created = False
+        try:
+            await self.request("GET", _file_path(file_url))
+        except requests.HTTPError as error:
+            if error.response.status_code != 404:
+                raise
+            await self.request("POST", f"{_files_path(folder_url)}/add(url='{_quote(file_name)}',overwrite=true)", b"")
+            created = True
+
+        upload_id = uuid.uuid4()
+        offset = 0
+        try:
+            chunk = await asyncio.to_thread(local_file.read, config.UPLOAD_CHUNK_SIZE)
+            while True:
+                next_chunk = await asyncio.to_thread(local_file.read, config.UPLOAD_CHUNK_SIZE)
+                if offset == 0:
+                    await self._send_chunk(f"{_file_path(file_url)}/StartUpload(uploadId=guid'{upload_id}')", chunk, stats)
+                elif next_chunk:
+                    await self._send_chunk(f"{_file_path(file_url)}/ContinueUpload(uploadId=guid'{upload_id}',fileOffset={offset})", chunk, stats)
+                else:
+                    return await self._send_chunk(f"{_file_path(file_url)}/FinishUpload(uploadId=guid'{upload_id}',fileOffset={offset})", chunk, stats)
+
+                offset += len(chunk)
+                chunk = next_chunk
+        except Exception:
+            # Clean up as well as possible. The original error is the interesting one.
+            try:
+                await self.request("POST", f"{_file_path(file_url)}/CancelUpload(uploadId=guid'{upload_id}')")
+                if created:
+                    await self.request("DELETE", _file_path(file_url))
+            except requests.RequestException:
+                pass
+            raise
+
+    async def _send_chunk(self, path: str, chunk: bytes, stats: sharepoint.UploadStats) -> dict:
+        """Send a chunk of an upload session, retrying transient errors like sharepoint._send_chunk."""
+        attempt = 0
+        while True:
+            try:
+                result = await self.request("POST", path, chunk)
+                stats.chunks += 1
+                return result
+            except requests.RequestException as error:
+                if attempt == config.UPLOAD_CHUNK_RETRIES or not sharepoint.is_transient(error):
+                    raise
+                stats.retries += 1
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+
+    async def _headers(self, refresh: bool = False) -> dict[str, str]:
+        """Get the authentication headers of the client, authenticating in a worker thread when needed."""
+        async with self._auth_lock:
+            if self._auth_headers is None or refresh:
+                self._auth_headers = await asyncio.to_thread(self._authenticate)
+                self._form_digest = None
+            return self._auth_headers
+
+    def _authenticate(self) -> dict[str, str]:
+        """Let the client authenticate a request and get its headers."""
+        # pylint: disable-next = import-outside-toplevel
+        from office365.runtime.http.request_options import RequestOptions
+
+        request = RequestOptions(self.base_url)
+        self.client.authentication_context.authenticate_request(request)
+        return dict(request.headers)
+
+    async def _digest(self) -> str:
+        """Get the form digest required by requests changing the site, renewing it before it expires.
+        The digest is requested through request, so a throttled response is handled like for any other request.
+        """
+        async with self._digest_lock:
+            if self._form_digest is None or time.monotonic() > self._form_digest[1]:
+                information = (await self.request("POST", "contextinfo"))["GetContextWebInformation"]
+                expires = time.monotonic() + information["FormDigestTimeoutSeconds"] - FORM_DIGEST_MARGIN
+                self._form_digest = (information["FormDigestValue"], expires)
+            return self._form_digest[0]
+
+
+def _quote(url: str) -> str:
+    """Quote a url or name as a string argument of a REST call."""
+    return urllib.parse.quote(url.replace("'", "''"))
+
+
+def _file_path(file_url: str) -> str:
+    return f"web/GetFileByServerRelativeUrl('{_quote(file_url)}')"
+
+
+def _files_path(folder_url: str) -> str:
+    return f"web/GetFolderByServerRelativeUrl('{_quote(folder_url)}')/Files"
+
+
+def _properties(entity: dict) -> dict:
+    """Get the properties of an entity in a verbose JSON response, leaving out metadata and deferred properties."""
+    return {key: value for key, value in entity.items() if key != "__metadata" and not isinstance(value, dict)}
+
+
+async def _read_json(response: aiohttp.ClientResponse) -> dict:
+    """Read the result of a verbose JSON response."""
+    content = await response.json(content_type=None)
+    return content.get("d", content) if isinstance(content, dict) else content
+
+
+async def _http_error(method: str, url: str, response: aiohttp.ClientResponse) -> requests.HTTPError:
+    """Convert an error response to a requests.HTTPError with a requests.Response attached."""
+    body = await response.read()
+    http_response = requests.Response()
+    http_response.status_code = response.status
+    http_response.reason = response.reason
+    http_response.headers = requests.structures.CaseInsensitiveDict(response.headers)
+    http_response.url = url
+    # requests.Response has no public way to set the body
+    # pylint: disable-next = protected-access
+    http_response._content = body
+    return requests.HTTPError(f"{response.status} {response.reason} for {method} {url}: {body[:500]!r}", response=http_response)
+
+
+# The event loop running the shared backends in a background thread, and the backends by site url and authentication context
+# pylint: disable-next = invalid-name
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+_backends: dict[tuple[str, int], AsyncSharePoint] = {}
+
+
+def run(client: ClientContext, operation: Callable[[AsyncSharePoint], Coroutine[Any, Any, T]]) -> T:
+    """Run an operation with the shared backend of the site of a client and wait for its result.
+    The backends and their connections are kept in a background event loop until close is called,
+    so operations from any number of threads share the keep-alive connections.
+    Each authentication context has its own backend, so clients of different users of a site, or a client
+    that has authenticated again, never send requests with each other's credentials. Clones of a client
+    share its authentication context and so its backend.
+    The operation runs in the context of the caller, so its spans and bytes count in the current span.
+
+    Args:
+        client: The authenticated client of the site.
+        operation: An async function taking the backend, e.g. lambda backend: backend.copy(a, b).
+
+    Returns:
+        The return value of the operation.
+    """
+    async def with_backend() -> T:
+        # The backend keeps a reference to the authentication context, so its id isn't reused while the backend exists
+        key = (client.base_url.rstrip("/"), id(client.authentication_context))
+        backend = _backends.get(key)
+        if backend is None:
+            backend = AsyncSharePoint(client)
+            await backend.open()
+            _backends[key] = backend
+        return await operation(backend)
+
+    result: concurrent.futures.Future = concurrent.futures.Future()
+
+    def start() -> None:
+        # The task copies the context of the callback, which is the context of the caller
+        task = asyncio.get_running_loop().create_task(with_backend())
+        task.add_done_callback(lambda task: _copy_outcome(task, result))
+
+    _get_loop().call_soon_threadsafe(start, context=contextvars.copy_context())
+    return result.result()
+
+
+def _copy_outcome(task: asyncio.Task, result: concurrent.futures.Future) -> None:
+    """Copy the result, error or cancellation of a finished task to a future of another thread."""
+    if task.cancelled():
+        result.cancel()
+    elif task.exception() is not None:
+        result.set_exception(task.exception())
+    else:
+        result.set_result(task.result())
+
+
+async def gather_all(awaitables: list[Awaitable[T]]) -> list[T]:
+    """Wait for all awaitables and raise the first error, if any, once all of them are done.
+    Unlike asyncio.gather no transfer is left running in the background when one fails.
+    """
+    results = await asyncio.gather(*awaitables, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def close() -> None:
+    """Close the connections of the shared backends and stop the event loop, if it has been started."""
+    global _loop  # pylint: disable=global-statement
+    with _loop_lock:
+        loop, _loop = _loop, None
+    if loop is None:
+        return
+
+    async def close_backends() -> None:
+        for backend in _backends.values():
+            await backend.close()
+        _backends.clear()
+
+    asyncio.run_coroutine_threadsafe(close_backends(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get the background event loop, starting it on first use."""
+    global _loop  # pylint: disable=global-statement
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="sharepoint_async", daemon=True).start()
+        return _loop
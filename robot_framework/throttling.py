@@ -0,0 +1,275 @@
+"""This module contains the governor all SharePoint requests of the robot go through.
+
+SharePoint Online throttles clients with 429 Too Many Requests and 503 Server Too Busy
+responses, usually with a Retry-After header. The governor honours Retry-After by pausing
+all requests, not only the throttled one, and sends the throttled request again.
+It limits the number of requests in flight and adapts the limit with additive increase
+and multiplicative decrease (AIMD): the limit grows slowly while requests succeed and is
+halved when SharePoint throttles, so concurrent crawls and transfers settle near the
+limit of the tenant.
+The asyncio backend in sharepoint_async takes its slots with acquire_async, so its requests
+count against the same limit as the requests sent through call.
+"""
+
+import asyncio
+import email.utils
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, TypeVar
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from requests import RequestException
+
+from robot_framework import config
+from robot_framework import tracing
+
+T = TypeVar("T")
+
+# The status codes SharePoint throttles with
+THROTTLED_STATUS_CODES = (429, 503)
+
+
+@dataclass
+class GovernorStats:
+    """Counts the requests sent through a governor.
+
+    Args:
+        requests: The number of requests sent, including requests sent again.
+        throttled: The number of responses throttled by SharePoint.
+        throttle_wait_seconds: The time requests were paused because of throttling, summed over all requests.
+        slot_wait_seconds: The time requests waited for a free slot below the limit, summed over all requests.
+        min_limit_seen: The lowest concurrency limit during the run.
+    """
+    requests: int = 0
+    throttled: int = 0
+    throttle_wait_seconds: float = 0
+    slot_wait_seconds: float = 0
+    min_limit_seen: float = 0
+
+    def summary(self, limit: float) -> str:
+        """A short description of the requests and the current concurrency limit."""
+        return (f"SharePoint requests: {self.requests}, throttled: {self.throttled}. "
+                f"Waited {self.throttle_wait_seconds:.1f} s for throttling and {self.slot_wait_seconds:.1f} s for a free slot. "
+                f"Concurrency limit {limit:.1f} (lowest {self.min_limit_seen:.1f}).")
+
+
+# pylint: disable-next = too-many-instance-attributes
+class RequestGovernor:
+    """Limits and paces requests to SharePoint. Safe to use from several threads."""
+
+    def __init__(self, initial_limit: float, min_limit: float, max_limit: float, max_retries: int, max_wait: float):
+        """Create a governor.
+
+        Args:
+            initial_limit: The number of requests allowed in flight at the start.
+            min_limit: The lowest the limit is decreased to.
+            max_limit: The highest the limit is increased to.
+            max_retries: The number of times a throttled request is sent again before the error is raised.
+            max_wait: The longest time in seconds to pause after a throttled response.
+        """
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_retries = max_retries
+        self.max_wait = max_wait
+        self.stats = GovernorStats(min_limit_seen=initial_limit)
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+        # The futures of coroutines waiting in acquire_async, with their event loops
+        self._async_waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def call(self, action: Callable[[], T]) -> T:
+        """Run an action sending a request to SharePoint, e.g. a function calling execute_query.
+        The action is run again if SharePoint throttles it, so it must build its query itself.
+
+        Args:
+            action: The function sending the request.
+
+        Returns:
+            The return value of the action.
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                result = action()
+            except RequestException as error:
+                status_code = error.response.status_code if error.response is not None else None
+                if status_code not in THROTTLED_STATUS_CODES:
+                    self._release(success=False)
+                    raise
+                self._release_throttled(retry_after(error.response.headers, attempt, self.max_wait))
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                continue
+            except BaseException:
+                self._release(success=False)
+                raise
+
+            self._release(success=True)
+            return result
+
+    def summary(self) -> str:
+        """A short description of the requests sent through the governor."""
+        with self._condition:
+            return self.stats.summary(self.limit)
+
+    def _acquire(self) -> None:
+        """Wait until requests aren't paused and a slot is free, and take the slot."""
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    start = time.monotonic()
+                    with tracing.span("throttling.pause"):
+                        self._condition.wait(pause)
+                    self.stats.throttle_wait_seconds += time.monotonic() - start
+                elif self._in_flight >= max(1, int(self.limit)):
+                    start = time.monotonic()
+                    self._condition.wait()
+                    self.stats.slot_wait_seconds += time.monotonic() - start
+                else:
+                    break
+            self._in_flight += 1
+            self.stats.requests += 1
+
+    async def acquire_async(self) -> None:
+        """Wait until requests aren't paused and a slot is free, and take the slot, without blocking the event loop.
+        Used by the asyncio backend, which gives the slot back with release or release_throttled.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                pause = self._paused_until - time.monotonic()
+                if pause <= 0 and self._in_flight < max(1, int(self.limit)):
+                    self._in_flight += 1
+                    self.stats.requests += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+
+            start = time.monotonic()
+            if pause > 0:
+                with tracing.span("throttling.pause"):
+                    await asyncio.wait([waiter], timeout=pause)
+            else:
+                await waiter
+            with self._condition:
+                if pause > 0:
+                    self.stats.throttle_wait_seconds += time.monotonic() - start
+                else:
+                    self.stats.slot_wait_seconds += time.monotonic() - start
+
+    def release(self, success: bool) -> None:
+        """Give back a slot taken with acquire_async. See _release."""
+        self._release(success)
+
+    def release_throttled(self, wait: float) -> None:
+        """Give back a slot taken with acquire_async after a throttled response. See _release_throttled."""
+        self._release_throttled(wait)
+
+    def _release(self, success: bool) -> None:
+        """Give the slot back. Successful requests increase the limit by about one per limit requests."""
+        with self._condition:
+            self._in_flight -= 1
+            if success:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._notify_all()
+
+    def record_throttled(self, wait: float) -> None:
+        """Pause all requests and halve the limit after a throttled response.
+        Throttled responses arriving during a pause belong to the same episode and only extend the pause.
+        """
+        with self._condition:
+            self.stats.throttled += 1
+            now = time.monotonic()
+            if now >= self._paused_until:
+                self.limit = max(self.min_limit, self.limit / 2)
+                self.stats.min_limit_seen = min(self.stats.min_limit_seen, self.limit)
+            self._paused_until = max(self._paused_until, now + wait)
+            self._notify_all()
+
+    def _release_throttled(self, wait: float) -> None:
+        """Give the slot of a throttled request back, pause all requests and halve the limit."""
+        # The condition uses a reentrant lock, so the slot is released and the pause starts atomically
+        with self._condition:
+            self._in_flight -= 1
+            self.record_throttled(wait)
+
+    def _notify_all(self) -> None:
+        """Wake the threads and coroutines waiting for a slot. Must be called holding the condition."""
+        self._condition.notify_all()
+        for loop, waiter in self._async_waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+        self._async_waiters.clear()
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    """Wake a coroutine waiting in acquire_async, unless it has stopped waiting."""
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def retry_after(headers, attempt: int, max_wait: float) -> float:
+    """Get the time in seconds to wait after a throttled response.
+    Uses the Retry-After header in seconds or as a date, and otherwise waits 2^attempt seconds.
+
+    Args:
+        headers: The headers of the response, a case insensitive mapping.
+        attempt: The number of times the request has been throttled before.
+        max_wait: The longest time to wait.
+    """
+    header = headers.get("Retry-After")
+    wait = 2.0 ** attempt
+    if header:
+        if header.strip().isdigit():
+            wait = float(header)
+        else:
+            try:
+                wait = email.utils.parsedate_to_datetime(header).timestamp() - time.time()
+            except (TypeError, ValueError):
+                pass
+    return min(max(wait, 0), max_wait)
+
+
+_governor = RequestGovernor(
+    config.SHAREPOINT_INITIAL_CONCURRENCY,
+    config.SHAREPOINT_MIN_CONCURRENCY,
+    config.SHAREPOINT_MAX_CONCURRENCY,
+    config.THROTTLE_MAX_RETRIES,
+    config.THROTTLE_MAX_WAIT
+)
+
+
+def call(action: Callable[[], T]) -> T:
+    """Run an action sending a request to SharePoint through the governor of the robot.
+    See RequestGovernor.call.
+    """
+    return _governor.call(action)
+
+
+async def acquire_async() -> None:
+    """See RequestGovernor.acquire_async."""
+    await _governor.acquire_async()
+
+
+def release(success: bool) -> None:
+    """See RequestGovernor.release."""
+    _governor.release(success)
+
+
+def release_throttled(wait: float) -> None:
+    """See RequestGovernor.release_throttled."""
+    _governor.release_throttled(wait)
+
+
+def finish(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log the counters of the governor of the robot.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+    """
+    orchestrator_connection.log_info(_governor.summary())
@@ -0,0 +1,194 @@
+"""This module records timing spans of the stages of a run.
+Spans are nested per thread and inherit the tags of their parent span, so tagging
+the span of a queue element with its id tags everything done for that element.
+At the end of the run the spans are written to a JSON trace file in the Chrome
+trace event format (viewable in chrome://tracing or Perfetto) and summarized
+per stage in OpenOrchestrator.
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, TypeVar
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+
+T = TypeVar("T")
+
+
+@dataclass
+# pylint: disable-next = too-many-instance-attributes
+class Span:
+    """A single timed stage.
+
+    Args:
+        name: The name of the stage.
+        span_id: A number identifying the span in the run.
+        parent_id: The span_id of the enclosing span, if any.
+        thread: The name of the thread the span ran in.
+        start: The wall clock time the span started at.
+        wall_seconds: The elapsed time of the span.
+        cpu_seconds: The CPU time used by the thread during the span.
+        bytes_transferred: The number of bytes transferred during the span, as reported with add_bytes.
+        tags: Tags describing the span, e.g. the id of the queue element.
+    """
+    name: str
+    span_id: int
+    parent_id: int | None
+    thread: str
+    start: float
+    wall_seconds: float = 0
+    cpu_seconds: float = 0
+    bytes_transferred: int = 0
+    tags: dict = field(default_factory=dict)
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar("current_span", default=None)
+_span_ids = itertools.count(1)
+_finished_spans: list[Span] = []
+_finished_spans_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, **tags) -> Iterator[Span]:
+    """Time the enclosed block as a span.
+
+    Args:
+        name: The name of the stage.
+        **tags: Tags to add to the span and all spans inside it.
+
+    Yields:
+        The span, which is recorded when the block exits.
+    """
+    parent = _current_span.get()
+    new_span = Span(
+        name=name,
+        span_id=next(_span_ids),
+        parent_id=parent.span_id if parent else None,
+        thread=threading.current_thread().name,
+        start=time.time(),
+        tags={**(parent.tags if parent else {}), **tags}
+    )
+    token = _current_span.set(new_span)
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    try:
+        yield new_span
+    finally:
+        new_span.wall_seconds = time.perf_counter() - wall_start
+        new_span.cpu_seconds = time.thread_time() - cpu_start
+        _current_span.reset(token)
+        with _finished_spans_lock:
+            _finished_spans.append(new_span)
+
+
+def traced(name: str | None = None) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorate a function to time each call as a span.
+
+    Args:
+        name: The name of the stage. Defaults to '<module>.<function>'.
+
+    Returns:
+        The decorator.
+    """
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        span_name = name or f"{function.__module__.rsplit('.', 1)[-1]}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs) -> T:
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add_bytes(byte_count: int) -> None:
+    """Add to the number of bytes transferred in the current span, if any.
+
+    Args:
+        byte_count: The number of bytes transferred.
+    """
+    current = _current_span.get()
+    if current:
+        current.bytes_transferred += byte_count
+
+
+def write_trace(path: str) -> None:
+    """Write all finished spans to a JSON file in the Chrome trace event format.
+
+    Args:
+        path: The path of the trace file.
+    """
+    with _finished_spans_lock:
+        spans = list(_finished_spans)
+
+    thread_ids = {}
+    events = []
+    for s in sorted(spans, key=lambda s: s.start):
+        events.append({
+            "name": s.name,
+            "ph": "X",
+            "ts": s.start * 1_000_000,
+            "dur": s.wall_seconds * 1_000_000,
+            "pid": os.getpid(),
+            "tid": thread_ids.setdefault(s.thread, len(thread_ids)),
+            "args": {
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "thread": s.thread,
+                "cpu_seconds": s.cpu_seconds,
+                "bytes": s.bytes_transferred,
+                **{key: str(value) for key, value in s.tags.items()}
+            }
+        })
+
+    with open(path, "w", encoding="utf-8") as trace_file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+def summary() -> str:
+    """Summarize the wall time of all finished spans per stage."""
+    with _finished_spans_lock:
+        spans = list(_finished_spans)
+
+    stages: dict[str, list[Span]] = {}
+    for s in spans:
+        stages.setdefault(s.name, []).append(s)
+
+    lines = ["Stage timings in seconds (count, p50, p95, max, cpu total, bytes total):"]
+    for name, stage_spans in sorted(stages.items(), key=lambda item: -sum(s.wall_seconds for s in item[1])):
+        times = sorted(s.wall_seconds for s in stage_spans)
+        lines.append(
+            f"{name}: {len(times)}, {_percentile(times, 0.5):.3f}, {_percentile(times, 0.95):.3f}, {times[-1]:.3f}, "
+            f"{sum(s.cpu_seconds for s in stage_spans):.3f}, {sum(s.bytes_transferred for s in stage_spans)}"
+        )
+    return "\n".join(lines)
+
+
+def finish(orchestrator_connection: OrchestratorConnection, file_path: str | None = None) -> None:
+    """Write the trace file (if config.TRACE_FILE_PATH is set), log the summary and forget all spans.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        file_path: The trace file to write instead of config.TRACE_FILE_PATH, e.g. one per worker process.
+    """
+    file_path = file_path or config.TRACE_FILE_PATH
+    if file_path:
+        write_trace(file_path)
+    orchestrator_connection.log_info(summary())
+    with _finished_spans_lock:
+        _finished_spans.clear()
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    """Get a percentile of sorted values by the nearest-rank method."""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
@@ -0,0 +1,374 @@
+"""This module runs the queue loop of the queue framework in several worker processes.
+
+A supervisor in the robot process starts config.QUEUE_WORKERS worker processes. Each worker has
+its own connection to OpenOrchestrator, initializes and resets its own applications, and claims
+queue elements until the queue is empty. Elements are claimed with a compare-and-set update, so two
+workers never process the same element. config.MAX_TASK_COUNT and config.MAX_RETRY_COUNT count the
+elements and errors of all workers together: when the process errors reach MAX_RETRY_COUNT, all
+workers stop after their current element. Each worker records the element it is processing in
+shared memory before processing it. A worker process that crashes fails that element, counts as a
+process error and is started again.
+Workers don't use the lookahead, since running several workers already overlaps their waits.
+The claim uses internals of OpenOrchestrator. If a version of OpenOrchestrator doesn't have them,
+ATOMIC_CLAIM_SUPPORTED is False and run refuses to start the workers.
+"""
+
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+
+from OpenOrchestrator.database import db_util
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+from sqlalchemy import select, update
+
+from robot_framework import config
+from robot_framework import error_reporter
+from robot_framework import initialize
+from robot_framework import log_buffer
+from robot_framework import orchestrator_cache
+from robot_framework import reset
+from robot_framework import retry
+from robot_framework import sharepoint
+from robot_framework import throttling
+from robot_framework import tracing
+from robot_framework.exceptions import BusinessError, handle_error, log_exception
+
+# The number of seconds the supervisor waits for events before checking the worker processes
+_POLL_INTERVAL = 0.5
+# The length of a queue element id, a uuid, as a string
+_ELEMENT_ID_LENGTH = 36
+
+# Whether this version of OpenOrchestrator has the internals used to claim queue elements atomically
+ATOMIC_CLAIM_SUPPORTED = hasattr(db_util, "_get_session")
+
+
+def claim_next_queue_element(queue_name: str) -> QueueElement | None:
+    """Claim the oldest new element of a queue and set it 'in progress'.
+    Unlike OrchestratorConnection.get_next_queue_element the element is only claimed if its status
+    is still 'new' when it is updated, so workers claiming at the same time get different elements.
+
+    Args:
+        queue_name: The name of the queue to claim from.
+
+    Returns:
+        The claimed queue element, or None if the queue has no new elements.
+    """
+    while True:
+        # OpenOrchestrator has no atomic claim, so the session is used directly
+        # pylint: disable-next = protected-access
+        with db_util._get_session() as session:
+            queue_element = session.scalar(
+                select(QueueElement)
+                .where(QueueElement.queue_name == queue_name)
+                .where(QueueElement.status == QueueStatus.NEW)
+                .order_by(QueueElement.created_date)
+                .limit(1)
+            )
+            if queue_element is None:
+                return None
+
+            result = session.execute(
+                update(QueueElement)
+                .where(QueueElement.id == queue_element.id)
+                .where(QueueElement.status == QueueStatus.NEW)
+                .values(status=QueueStatus.IN_PROGRESS, start_date=datetime.now())
+            )
+            session.commit()
+            # Otherwise another worker claimed the element first, and the next one is tried
+            if result.rowcount == 1:
+                session.refresh(queue_element)
+                return queue_element
+
+
+# pylint: disable-next = too-many-instance-attributes
+class SharedState:
+    """The counters and signals shared by the supervisor and the workers. Safe to use from several processes."""
+
+    def __init__(self, context, worker_count: int, max_task_count: int, max_error_count: int):
+        """Create the shared state in a multiprocessing context.
+
+        Args:
+            context: The multiprocessing context the workers are started in.
+            worker_count: The number of workers.
+            max_task_count: The number of queue elements claimed by all workers together.
+            max_error_count: The number of process errors of all workers together that stops the workers.
+        """
+        self.max_task_count = max_task_count
+        self.max_error_count = max_error_count
+        self.stop = context.Event()
+        self.events = context.Queue()
+        self._lock = context.Lock()
+        self._task_count = context.RawValue("i", 0)
+        self._error_count = context.RawValue("i", 0)
+        # The id of the queue element each worker is processing. Only the worker writes its own id.
+        self._current = {worker_id: context.RawArray("c", _ELEMENT_ID_LENGTH) for worker_id in range(1, worker_count + 1)}
+
+    @property
+    def error_count(self) -> int:
+        """The number of process errors of all workers."""
+        with self._lock:
+            return self._error_count.value
+
+    def reserve_task(self) -> bool:
+        """Reserve one of the MAX_TASK_COUNT queue elements before claiming it.
+
+        Returns:
+            False if the workers are stopping or all queue elements have been reserved.
+        """
+        with self._lock:
+            if self.stop.is_set() or self._task_count.value >= self.max_task_count:
+                return False
+            self._task_count.value += 1
+            return True
+
+    def release_task(self) -> None:
+        """Give back a reservation that didn't get a queue element."""
+        with self._lock:
+            self._task_count.value -= 1
+
+    def set_current(self, worker_id: int, queue_element_id: uuid.UUID | None) -> None:
+        """Record the queue element a worker is processing, or None when it is done with it.
+        The id is in shared memory as soon as this returns, so it survives a crash of the worker.
+        """
+        self._current[worker_id].value = str(queue_element_id).encode() if queue_element_id else b""
+
+    def current(self, worker_id: int) -> uuid.UUID | None:
+        """Get the queue element a worker is processing, if any."""
+        value = self._current[worker_id].value
+        return uuid.UUID(value.decode()) if value else None
+
+    def add_error(self) -> int:
+        """Count a process error and stop the workers if there are too many.
+
+        Returns:
+            The number of process errors of all workers, including this one.
+        """
+        with self._lock:
+            self._error_count.value += 1
+            if self._error_count.value >= self.max_error_count:
+                self.stop.set()
+            return self._error_count.value
+
+
+@dataclass
+class WorkerStats:
+    """Counts the queue elements of a worker, across restarts.
+
+    Args:
+        elements: The number of queue elements processed, including failed ones.
+        failed: The number of queue elements that failed.
+        active_seconds: The time the worker processes have been running.
+        restarts: The number of times the worker has been started again after a crash.
+        started: The time the current worker process was started.
+    """
+    elements: int = 0
+    failed: int = 0
+    active_seconds: float = 0
+    restarts: int = 0
+    started: float = 0
+
+    def summary(self, worker_id: int) -> str:
+        """A short description of the throughput of the worker."""
+        rate = self.elements / self.active_seconds if self.active_seconds else 0
+        return (f"Worker {worker_id}: {self.elements} queue elements ({self.failed} failed) in {self.active_seconds:.1f} s, "
+                f"{rate:.2f} elements/s, {self.restarts} restarts.")
+
+
+def use_workers(orchestrator_connection: OrchestratorConnection, worker_count: int) -> bool:
+    """Check if the queue should be processed by worker processes.
+    Falls back to processing the queue in the robot process, with a log line, if OpenOrchestrator can't claim atomically.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        worker_count: The number of workers configured, config.QUEUE_WORKERS.
+    """
+    if worker_count <= 1:
+        return False
+    if not ATOMIC_CLAIM_SUPPORTED:
+        orchestrator_connection.log_info(f"{worker_count} workers are configured, but this version of OpenOrchestrator "
+                                         "can't claim queue elements atomically. The queue is processed by a single worker.")
+        return False
+    return True
+
+
+def run(orchestrator_connection: OrchestratorConnection, worker_count: int, queue_name: str,
+        process: Callable[[OrchestratorConnection, QueueElement], None]) -> int:
+    """Process a queue with worker processes and wait until they are done.
+
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator of the supervisor.
+        worker_count: The number of worker processes.
+        queue_name: The name of the queue to process.
+        process: The function processing a queue element. It must be a module level function,
+            since it is sent to the worker processes by reference.
+
+    Returns:
+        The number of process errors of all workers.
+
+    Raises:
+        RuntimeError: If this version of OpenOrchestrator doesn't support claiming queue elements atomically.
+    """
+    if not ATOMIC_CLAIM_SUPPORTED:
+        raise RuntimeError("The installed version of OpenOrchestrator has no db_util._get_session, "
+                           "so queue elements can't be claimed atomically by several workers.")
+
+    # Workers are spawned rather than forked on every platform, since the robot process runs background threads
+    context = multiprocessing.get_context("spawn")
+    shared = SharedState(context, worker_count, config.MAX_TASK_COUNT, config.MAX_RETRY_COUNT)
+    stats = {worker_id: WorkerStats() for worker_id in range(1, worker_count + 1)}
+    processes = {}
+    orchestrator_connection.log_info(f"Starting {worker_count} workers on the queue {queue_name}.")
+
+    start = time.perf_counter()
+    try:
+        for worker_id, worker in stats.items():
+            processes[worker_id] = _start_worker(context, worker_id, worker, shared=shared, queue_name=queue_name, process=process)
+
+        while processes:
+            _handle_events(shared, stats, _POLL_INTERVAL)
+            for worker_id, worker_process in list(processes.items()):
+                if worker_process.is_alive():
+                    continue
+                worker_process.join()
+                # The events the worker sent before it exited
+                _handle_events(shared, stats, None)
+                worker = stats[worker_id]
+                worker.active_seconds += time.perf_counter() - worker.started
+                del processes[worker_id]
+
+                if worker_process.exitcode != 0:
+                    _handle_crash(orchestrator_connection, shared, worker_id, worker, worker_process.exitcode)
+                    if not shared.stop.is_set():
+                        worker.restarts += 1
+                        processes[worker_id] = _start_worker(context, worker_id, worker, shared=shared, queue_name=queue_name, process=process)
+    finally:
+        for worker_process in processes.values():
+            worker_process.terminate()
+
+    elapsed = time.perf_counter() - start
+    total = sum(worker.elements for worker in stats.values())
+    for worker_id, worker in stats.items():
+        orchestrator_connection.log_info(worker.summary(worker_id))
+    orchestrator_connection.log_info(
+        f"Workers processed {total} queue elements in {elapsed:.1f} s, {total / elapsed if elapsed else 0:.2f} elements/s. "
+        f"{shared.error_count} process errors."
+    )
+    return shared.error_count
+
+
+def _start_worker(context, worker_id: int, worker: WorkerStats, *, shared: SharedState, queue_name: str,
+                  process: Callable[[OrchestratorConnection, QueueElement], None]):
+    """Start a worker process."""
+    worker_process = context.Process(target=_worker_main, args=(worker_id, shared, queue_name, process), name=f"Worker{worker_id}")
+    worker.started = time.perf_counter()
+    worker_process.start()
+    return worker_process
+
+
+def _handle_events(shared: SharedState, stats: dict[int, WorkerStats], timeout: float | None) -> None:
+    """Update the worker statistics with the events sent by the workers.
+
+    Args:
+        shared: The shared state of the workers.
+        stats: The statistics per worker id.
+        timeout: The number of seconds to wait for the first event. None doesn't wait.
+    """
+    try:
+        event = shared.events.get(timeout=timeout) if timeout else shared.events.get_nowait()
+        while True:
+            kind, worker_id = event[:2]
+            worker = stats[worker_id]
+            worker.elements += 1
+            if kind == "failed":
+                worker.failed += 1
+            event = shared.events.get_nowait()
+    except queue.Empty:
+        pass
+
+
+def _handle_crash(orchestrator_connection: OrchestratorConnection, shared: SharedState, worker_id: int, worker: WorkerStats, exitcode: int) -> None:
+    """Fail the queue element of a crashed worker and count the crash as a process error."""
+    error_count = shared.add_error()
+    orchestrator_connection.log_error(f"Process Error #{error_count}: Worker {worker_id} crashed with exit code {exitcode}.")
+    queue_element_id = shared.current(worker_id)
+    if queue_element_id:
+        orchestrator_connection.set_queue_element_status(queue_element_id, QueueStatus.FAILED, f"Worker {worker_id} crashed with exit code {exitcode}.")
+        shared.set_current(worker_id, None)
+        worker.elements += 1
+        worker.failed += 1
+
+
+def _worker_main(worker_id: int, shared: SharedState, queue_name: str, process: Callable[[OrchestratorConnection, QueueElement], None]) -> None:
+    """The entry point of a worker process. Mirrors queue_framework.main with global limits.
+    multiprocessing passes sys.argv on to spawned processes, so the worker connects like the robot itself.
+    """
+    orchestrator_connection = log_buffer.buffered(OrchestratorConnection.create_connection_from_args())
+    sys.excepthook = log_exception(orchestrator_connection)
+
+    orchestrator_connection.log_trace(f"Worker {worker_id} started.")
+    initialize.initialize(orchestrator_connection)
+
+    queue_element = None
+    while not shared.stop.is_set():
+        try:
+            reset.reset(orchestrator_connection)
+
+            # Queue loop
+            while shared.reserve_task():
+                queue_element = claim_next_queue_element(queue_name)
+                if not queue_element:
+                    shared.release_task()
+                    orchestrator_connection.log_info("Queue empty.")
+                    break
+
+                shared.set_current(worker_id, queue_element.id)
+                with tracing.span("queue_element", queue_element_id=queue_element.id, worker=worker_id):
+                    try:
+                        process(orchestrator_connection, queue_element)
+                        orchestrator_connection.set_queue_element_status(queue_element.id, QueueStatus.DONE)
+                        shared.events.put(("done", worker_id, queue_element.id))
+
+                    except BusinessError as error:
+                        handle_error("Business Error", error, queue_element, orchestrator_connection)
+                        shared.events.put(("failed", worker_id, queue_element.id))
+                shared.set_current(worker_id, None)
+                queue_element = None
+
+            break  # Break retry loop
+
+        # We actually want to catch all exceptions possible here.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            error_count = shared.add_error()
+            handle_error(f"Process Error #{error_count} (worker {worker_id})", error, queue_element, orchestrator_connection)
+            if queue_element:
+                shared.events.put(("failed", worker_id, queue_element.id))
+                shared.set_current(worker_id, None)
+                queue_element = None
+            retry.wait_before_reset(error, error_count)
+
+    reset.clean_up(orchestrator_connection)
+    reset.close_all(orchestrator_connection)
+    reset.kill_all(orchestrator_connection)
+    sharepoint.close_connections()
+    error_reporter.shutdown()
+    retry.finish(orchestrator_connection)
+    orchestrator_cache.finish(orchestrator_connection)
+    throttling.finish(orchestrator_connection)
+    tracing.finish(orchestrator_connection, _worker_trace_path(worker_id))
+    log_buffer.finish(orchestrator_connection)
+
+
+def _worker_trace_path(worker_id: int) -> str | None:
+    """Get the trace file of a worker, e.g. trace.worker2.json, so the workers don't overwrite each other's traces."""
+    if not config.TRACE_FILE_PATH:
+        return None
+    root, extension = os.path.splitext(config.TRACE_FILE_PATH)
+    return f"{root}.worker{worker_id}{extension}"